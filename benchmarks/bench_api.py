@@ -0,0 +1,274 @@
+"""Benchmark reproducible de la API CRUD y de la capa de almacenamiento.
+
+Genera tablas sintéticas del tamaño pedido, levanta la app en proceso (httpx
+sobre ASGI, sin red) y ejecuta mezclas de operaciones. Informa ops/s y
+latencias p50/p99 por ruta y por función de almacenamiento, y guarda el
+resultado en JSON para comparar corridas.
+
+Uso:
+    python -m benchmarks.bench_api --players 10000 --enemies 2000 --mix mixed
+    python -m benchmarks.bench_api --output base.json
+    python -m benchmarks.bench_api --output new.json --compare base.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import tempfile
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Tuple
+
+from benchmarks.datasets import ENEMY_TYPES, sample_enemy, sample_player, write_dataset
+
+# Peso relativo de cada operación en cada mezcla.
+MIXES: Dict[str, Dict[str, int]] = {
+    "read": {"get_player": 6, "get_enemy": 4},
+    "create": {"create_player": 6, "create_enemy": 4},
+    "update": {"update_player": 6, "update_enemy": 4},
+    "delete": {"delete_player": 6, "delete_enemy": 4},
+    "filter": {"query_players": 4, "filter_players": 2, "search_players": 2, "query_enemies": 2},
+    "list": {"list_players_ndjson": 1, "list_enemies": 1},
+    "mixed": {
+        "get_player": 30, "get_enemy": 20, "query_players": 15, "query_enemies": 5,
+        "create_player": 10, "update_player": 10, "delete_player": 5, "list_enemies": 5,
+    },
+}
+
+
+# ------------------------ OPERACIONES ------------------------
+
+class Workload:
+    def __init__(self, client, players: int, enemies: int, rng: random.Random):
+        self.client = client
+        self.rng = rng
+        self.player_ids = list(range(1, players + 1))
+        self.enemy_ids = list(range(1, enemies + 1))
+
+    def _pick(self, ids: List[int]) -> int:
+        return self.rng.choice(ids) if ids else 1
+
+    def _take(self, ids: List[int]) -> int:
+        if not ids:
+            return 1
+        position = self.rng.randrange(len(ids))
+        ids[position], ids[-1] = ids[-1], ids[position]
+        return ids.pop()
+
+    async def get_player(self):
+        return "GET /players/{player_id}", await self.client.get(f"/players/{self._pick(self.player_ids)}")
+
+    async def get_enemy(self):
+        return "GET /enemies/{enemy_id}", await self.client.get(f"/enemies/{self._pick(self.enemy_ids)}")
+
+    async def create_player(self):
+        response = await self.client.post("/players_create/", json=sample_player(self.rng))
+        if response.status_code == 200:
+            self.player_ids.append(response.json()["id"])
+        return "POST /players_create/", response
+
+    async def create_enemy(self):
+        response = await self.client.post("/enemies/", json=sample_enemy(self.rng))
+        if response.status_code == 200:
+            self.enemy_ids.append(response.json()["id"])
+        return "POST /enemies/", response
+
+    async def update_player(self):
+        player_id = self._pick(self.player_ids)
+        return "PUT /players/{player_id}", await self.client.put(f"/players/{player_id}", json=sample_player(self.rng))
+
+    async def update_enemy(self):
+        enemy_id = self._pick(self.enemy_ids)
+        return "PUT /enemies/{enemy_id}", await self.client.put(f"/enemies/{enemy_id}", json=sample_enemy(self.rng))
+
+    async def delete_player(self):
+        return "DELETE /players/{player_id}", await self.client.delete(f"/players/{self._take(self.player_ids)}")
+
+    async def delete_enemy(self):
+        return "DELETE /enemies/{enemy_id}", await self.client.delete(f"/enemies/{self._take(self.enemy_ids)}")
+
+    async def query_players(self):
+        low = self.rng.randint(0, 180)
+        params = {"min_health": low, "max_health": low + 20, "sort": "-armor", "limit": 50}
+        return "GET /players/query/", await self.client.get("/players/query/", params=params)
+
+    async def filter_players(self):
+        return "GET /players/filter/", await self.client.get("/players/filter/", params={"is_dead": True})
+
+    async def search_players(self):
+        params = {"min_health": self.rng.randint(150, 200)}
+        return "GET /players/search/", await self.client.get("/players/search/", params=params)
+
+    async def query_enemies(self):
+        params = {"type": self.rng.choice(ENEMY_TYPES), "min_probability_spawn": 0.5, "limit": 50}
+        return "GET /enemies/query/", await self.client.get("/enemies/query/", params=params)
+
+    async def list_players_ndjson(self):
+        return "GET /players_add/ (ndjson)", await self.client.get("/players_add/", params={"format": "ndjson"})
+
+    async def list_enemies(self):
+        return "GET /enemies/", await self.client.get("/enemies/")
+
+
+# ------------------------ ESTADISTICAS ------------------------
+
+def percentile(samples: List[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    position = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[position]
+
+
+def summarize(samples: List[float], elapsed: float) -> dict:
+    return {
+        "count": len(samples),
+        "ops_per_sec": round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(statistics.fmean(samples) * 1000, 4) if samples else 0.0,
+        "p50_ms": round(percentile(samples, 0.50) * 1000, 4),
+        "p99_ms": round(percentile(samples, 0.99) * 1000, 4),
+    }
+
+
+def histogram_summary(histogram) -> Dict[str, dict]:
+    """p50/p99 aproximados (cota superior de la cubeta) de un ``utils.metrics.Histogram``."""
+    summary = {}
+    for labels, series in histogram.series.items():
+        count = series[-1]
+        if not count:
+            continue
+
+        def bucket_quantile(q: float) -> float:
+            for position, bound in enumerate(histogram.buckets):
+                if series[position] >= q * count:
+                    return bound
+            return float("inf")
+
+        name = ",".join(value for _, value in labels)
+        summary[name] = {
+            "count": int(count),
+            "mean_ms": round(series[-2] / count * 1000, 4),
+            "p50_ms_le": bucket_quantile(0.50) * 1000,
+            "p99_ms_le": bucket_quantile(0.99) * 1000,
+        }
+    return summary
+
+
+# ------------------------ EJECUCION ------------------------
+
+async def run_mix(workload: Workload, mix: Dict[str, int], operations: int, concurrency: int) -> Tuple[dict, dict]:
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    plan: List[Callable] = [getattr(workload, name) for name in workload.rng.choices(names, weights, k=operations)]
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+
+    async def worker(share: List[Callable]):
+        for operation in share:
+            start = time.perf_counter()
+            route, response = await operation()
+            latencies[route].append(time.perf_counter() - start)
+            if response.status_code >= 500:
+                errors[route] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(plan[offset::concurrency]) for offset in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    all_samples = [sample for samples in latencies.values() for sample in samples]
+    routes = {route: {**summarize(samples, elapsed), "errors": errors[route]} for route, samples in sorted(latencies.items())}
+    return summarize(all_samples, elapsed), routes
+
+
+async def benchmark(args) -> dict:
+    # Los módulos de la app leen DATA_DIR al importarse.
+    import main
+    from httpx import ASGITransport, AsyncClient
+    from operations.operations_enemy import enemies_storage
+    from operations.operations_player import players_storage
+    from utils.metrics import STORAGE_SECONDS
+
+    start = time.perf_counter()
+    await players_storage.startup()
+    await enemies_storage.startup()
+    load_seconds = time.perf_counter() - start
+
+    rng = random.Random(args.seed)
+    results = {"load_seconds": round(load_seconds, 4), "mixes": {}}
+    transport = ASGITransport(app=main.app)
+    async with AsyncClient(transport=transport, base_url="http://bench") as client:
+        workload = Workload(client, args.players, args.enemies, rng)
+        for mix_name in args.mix:
+            operations = args.list_operations if mix_name == "list" else args.operations
+            overall, routes = await run_mix(workload, MIXES[mix_name], operations, args.concurrency)
+            results["mixes"][mix_name] = {"overall": overall, "routes": routes}
+            print(f"[{mix_name}] {overall['ops_per_sec']:.0f} ops/s  p50={overall['p50_ms']:.3f} ms  p99={overall['p99_ms']:.3f} ms")
+            for route, stats in routes.items():
+                print(f"    {route:<32} {stats['ops_per_sec']:>10.0f} ops/s  p50={stats['p50_ms']:.3f}  p99={stats['p99_ms']:.3f}")
+    results["storage"] = histogram_summary(STORAGE_SECONDS)
+    await players_storage.shutdown()
+    await enemies_storage.shutdown()
+    return results
+
+
+def compare(current: dict, baseline: dict) -> None:
+    print("\nComparación con la línea base (ops/s, p99):")
+    for mix_name, mix in current["mixes"].items():
+        base = baseline.get("mixes", {}).get(mix_name)
+        if not base:
+            continue
+        for route, stats in mix["routes"].items():
+            base_stats = base["routes"].get(route)
+            if not base_stats or not base_stats["ops_per_sec"]:
+                continue
+            ratio = stats["ops_per_sec"] / base_stats["ops_per_sec"]
+            print(f"  [{mix_name}] {route:<32} x{ratio:5.2f}  p99 {base_stats['p99_ms']:.3f} -> {stats['p99_ms']:.3f} ms")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", type=int, default=10_000, help="Filas de jugadores (1k a 1M).")
+    parser.add_argument("--enemies", type=int, default=2_000, help="Filas de enemigos.")
+    parser.add_argument("--operations", type=int, default=2_000, help="Operaciones por mezcla.")
+    parser.add_argument("--list-operations", type=int, default=20, help="Operaciones de la mezcla 'list'.")
+    parser.add_argument("--mix", nargs="+", choices=sorted(MIXES), default=["read", "filter", "create", "update", "delete", "list", "mixed"])
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--data-dir", help="Directorio de datos (por defecto uno temporal).")
+    parser.add_argument("--output", help="Archivo JSON donde guardar los resultados.")
+    parser.add_argument("--compare", help="JSON de una corrida anterior para comparar.")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = args.data_dir or tmp
+        os.environ["DATA_DIR"] = data_dir
+        os.environ.setdefault("STORAGE_BACKEND", "csv")
+        write_dataset(data_dir, args.players, args.enemies, args.seed)
+        results = asyncio.run(benchmark(args))
+
+    report = {
+        "config": {
+            "players": args.players, "enemies": args.enemies, "operations": args.operations,
+            "concurrency": args.concurrency, "seed": args.seed, "mixes": args.mix,
+            "backend": os.environ["STORAGE_BACKEND"],
+        },
+        "environment": {"python": platform.python_version(), "platform": platform.platform()},
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        **results,
+    }
+    if args.output:
+        with open(args.output, mode="w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResultados guardados en {args.output}")
+    if args.compare:
+        with open(args.compare, mode="r", encoding="utf-8") as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Compara CSVBackend y SQLBackend (aiosqlite) sobre la misma carga.
+
+Uso: python -m benchmarks.bench_backends --rows 5000
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.datasets import sample_player
+from models import PlayerWithID
+from operations.backends import CSVBackend, StorageBackend
+from operations.operations_player import read_players_from_csv, write_players_to_csv
+from operations.repository import Repository
+
+
+def build_csv(directory: str) -> StorageBackend:
+    repository = Repository(
+        PlayerWithID,
+        path=os.path.join(directory, "players.csv"),
+        loader=read_players_from_csv,
+        writer=write_players_to_csv,
+        log_path=os.path.join(directory, "players.log"),
+        indexes=("name", "is_dead"),
+        sorted_indexes=("health", "armor", "speed", "jump", "hit_speed"),
+    )
+    return CSVBackend(repository)
+
+
+def build_sql(directory: str) -> StorageBackend:
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlmodel.ext.asyncio.session import AsyncSession
+
+    from modelos.player_sql import PlayerModel
+    from operations.sql_backend import SQLBackend
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(directory, 'players.db')}")
+    session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    return SQLBackend(
+        PlayerModel, PlayerWithID,
+        equal_fields=("name", "is_dead"),
+        range_fields=("health", "armor", "speed", "jump", "hit_speed"),
+        engine=engine, session_factory=session_factory,
+    )
+
+
+async def timed(label: str, count: int, action) -> None:
+    start = time.perf_counter()
+    await action()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<28} {count / elapsed:>12.0f} ops/s  ({elapsed * 1000:.1f} ms)")
+
+
+async def run(backend: StorageBackend, rows: int, operations: int, seed: int) -> None:
+    rng = random.Random(seed)
+    await backend.startup()
+    print(f"[{backend.name}] rows={rows} operations={operations}")
+
+    items = [sample_player(rng) for _ in range(rows)]
+    await timed("insert_many", rows, lambda: backend.insert_many(items))
+
+    async def inserts():
+        for _ in range(operations):
+            await backend.insert(sample_player(rng))
+    await timed("insert", operations, inserts)
+
+    total = rows + operations
+    ids = [rng.randint(1, total) for _ in range(operations)]
+
+    async def gets():
+        for row_id in ids:
+            await backend.get(row_id)
+    await timed("get", operations, gets)
+
+    async def queries():
+        for _ in range(operations):
+            low = rng.randint(0, 150)
+            await backend.query(ranges={"health": (low, low + 20)}, sort="armor", limit=50)
+    await timed("query (range+sort, 50)", operations, queries)
+
+    async def updates():
+        for row_id in ids:
+            await backend.update(row_id, {"health": rng.randint(0, 200)})
+    await timed("update", operations, updates)
+
+    async def deletes():
+        for row_id in dict.fromkeys(ids):
+            await backend.delete(row_id)
+    await timed("delete", len(set(ids)), deletes)
+
+    await backend.shutdown()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--operations", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--backend", choices=("csv", "sql", "both"), default="both")
+    args = parser.parse_args()
+
+    for name, builder in (("csv", build_csv), ("sql", build_sql)):
+        if args.backend not in (name, "both"):
+            continue
+        with tempfile.TemporaryDirectory() as directory:
+            await run(builder(directory), args.rows, args.operations, args.seed)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,61 @@
+"""Bytes por entidad en memoria: modelos Pydantic frente a registros compactos.
+
+Construye las mismas filas como ``PlayerWithID``/``EnemyWithID`` (lo que
+guardaba antes el repositorio) y como registros de ``operations.records``
+(lo que guarda ahora) y mide con ``tracemalloc`` la memoria retenida,
+incluidos los valores de cada fila y el diccionario id -> fila. Como
+referencia se muestra el tamaño del registro binario de ``operations.snapshot``.
+
+Uso: python -m benchmarks.bench_memory --rows 200000
+"""
+import argparse
+import gc
+import random
+import struct
+import tracemalloc
+from typing import Callable, Dict, Iterator
+
+from benchmarks.datasets import iter_rows, sample_enemy, sample_player
+from models import EnemyWithID, PlayerWithID
+from operations.records import record_class
+from operations.snapshot import schema_for
+
+
+def retained_bytes(build: Callable[[], Dict[int, object]]) -> int:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    rows = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del rows
+    return after - before
+
+
+def run(label: str, model, sampler, count: int, seed: int) -> None:
+    # Cada pasada genera sus propios valores para que cuenten en la medida.
+    def items() -> Iterator[dict]:
+        return iter_rows(count, sampler, random.Random(seed))
+
+    record = record_class(model)
+    pydantic_bytes = retained_bytes(lambda: {item["id"]: model(**item) for item in items()})
+    compact_bytes = retained_bytes(lambda: {item["id"]: record.from_model(model(**item)) for item in items()})
+    payload = struct.calcsize("<" + "".join(code for _, code in schema_for(model)))
+    print(f"[{label}] {count} filas (registro binario de referencia: {payload} bytes)")
+    print(f"  {model.__name__:<18} {pydantic_bytes / count:8.1f} bytes/entidad  ({pydantic_bytes / 2 ** 20:.1f} MiB)")
+    print(f"  {record.__name__:<18} {compact_bytes / count:8.1f} bytes/entidad  ({compact_bytes / 2 ** 20:.1f} MiB)")
+    print(f"  ahorro: {1 - compact_bytes / pydantic_bytes:.0%}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    run("players", PlayerWithID, sample_player, args.rows, args.seed)
+    run("enemies", EnemyWithID, sample_enemy, args.rows, args.seed)
+
+
+if __name__ == "__main__":
+    main()
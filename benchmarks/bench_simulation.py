@@ -0,0 +1,48 @@
+"""Minutos simulados por segundo del simulador de apariciones.
+
+Genera una tabla de enemigos sintética, la carga en columnas igual que el
+servidor y mide ``operations.simulation`` sin serializar (muestreo) y
+serializando en NDJSON (lo que sale por ``/api/simulation/spawns``).
+
+Uso: python -m benchmarks.bench_simulation --enemies 10000 --minutes 600
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--enemies", type=int, default=10000)
+    parser.add_argument("--minutes", type=int, default=600)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        # Las operaciones fijan sus rutas a partir de DATA_DIR al importarse.
+        os.environ["DATA_DIR"] = directory
+        from benchmarks.datasets import write_dataset
+        from operations import simulation
+        from operations.operations_enemy import enemies_analytics
+
+        write_dataset(directory, players=0, enemies=args.enemies, seed=args.seed)
+        asyncio.run(enemies_analytics.refresh())
+        plan = simulation.SpawnPlan(enemies_analytics)
+        duration = args.minutes * 60.0
+        print(f"{len(plan)} enemigos, {plan.expected_per_minute():.0f} apariciones/minuto esperadas")
+
+        start = time.perf_counter()
+        spawns = sum(wave["time"].size for wave in simulation.iter_waves(plan, args.seed, duration))
+        elapsed = time.perf_counter() - start
+        print(f"  muestreo  {args.minutes / elapsed:9.0f} minutos/s  ({spawns} apariciones en {elapsed * 1000:.0f} ms)")
+
+        start = time.perf_counter()
+        size = sum(len(line) for line in simulation.iter_ndjson(plan, args.seed, duration))
+        elapsed = time.perf_counter() - start
+        print(f"  ndjson    {args.minutes / elapsed:9.0f} minutos/s  ({size / 2 ** 20:.1f} MiB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Compara la instantánea CSV con la binaria (mmap) sobre la misma tabla.
+
+Mide el tamaño en disco, el tiempo de carga completa, la memoria que reserva
+Python durante la carga (pico de ``tracemalloc``) y la que queda ocupada
+después, y el acceso aleatorio por id sin cargar la tabla. "tabla" es la
+carga del ``Repository`` (filas e índices) con cada formato.
+
+Uso: python -m benchmarks.bench_snapshot --rows 200000
+"""
+import argparse
+import gc
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.datasets import write_dataset
+from models import EnemyWithID, PlayerWithID
+from operations.operations_enemy import read_enemies_from_csv, write_enemies_to_csv
+from operations.operations_player import read_players_from_csv, write_players_to_csv
+from operations.repository import Repository
+from operations.snapshot import SnapshotReader, read_snapshot, table_files, write_snapshot
+
+# Los mismos índices que las tablas de operations_player/operations_enemy.
+PLAYER_INDEXES = {"indexes": ("name", "is_dead"), "sorted_indexes": ("health", "armor", "speed", "jump", "hit_speed")}
+ENEMY_INDEXES = {
+    "indexes": ("name", "type"), "sorted_indexes": ("health", "speed", "hit_speed", "spawn", "probability_spawn"),
+}
+
+
+def measure(label: str, load) -> None:
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    loaded = load()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {label:<22} {elapsed * 1000:9.1f} ms  pico {peak / 2 ** 20:8.1f} MiB  "
+          f"retenida {retained / 2 ** 20:8.1f} MiB  ({len(getattr(loaded, 'rows', loaded))} filas)")
+
+
+def load_table(model, read_csv, write_csv, csv_path: str, snapshot_path: str, snapshot_format: str, indexes):
+    repository = Repository(
+        model, **table_files(model, csv_path, snapshot_path, read_csv, write_csv, snapshot_format), **indexes
+    )
+    repository.load()
+    return repository
+
+
+def run(table: str, model, read_csv, write_csv, indexes: dict, directory: str, lookups: int, seed: int) -> None:
+    csv_path = os.path.join(directory, f"{table}.csv")
+    snapshot_path = os.path.join(directory, f"{table}.snap")
+    start = time.perf_counter()
+    write_snapshot(read_csv(csv_path), snapshot_path, model)
+    print(f"[{table}] import CSV -> binario en {(time.perf_counter() - start) * 1000:.1f} ms")
+    print(f"  tamaño: csv {os.path.getsize(csv_path) / 2 ** 20:.2f} MiB, "
+          f"binario {os.path.getsize(snapshot_path) / 2 ** 20:.2f} MiB")
+
+    measure("carga csv", lambda: read_csv(csv_path))
+    measure("carga binaria", lambda: read_snapshot(snapshot_path, model))
+    for snapshot_format in ("csv", "binary"):
+        measure(f"tabla {snapshot_format}", lambda: load_table(
+            model, read_csv, write_csv, csv_path, snapshot_path, snapshot_format, indexes
+        ))
+
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    with SnapshotReader(snapshot_path, model) as reader:
+        ids = [rng.randint(1, len(reader)) for _ in range(lookups)]
+        opened = time.perf_counter() - start
+        start = time.perf_counter()
+        for row_id in ids:
+            reader.get(row_id)
+        elapsed = time.perf_counter() - start
+    print(f"  mmap: apertura {opened * 1000:.2f} ms, get por id {elapsed / lookups * 1e6:.2f} µs ({lookups} lecturas)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--lookups", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        write_dataset(directory, players=args.rows, enemies=args.rows, seed=args.seed)
+        run("players", PlayerWithID, read_players_from_csv, write_players_to_csv, PLAYER_INDEXES,
+            directory, args.lookups, args.seed)
+        run("enemies", EnemyWithID, read_enemies_from_csv, write_enemies_to_csv, ENEMY_INDEXES,
+            directory, args.lookups, args.seed)
+
+
+if __name__ == "__main__":
+    main()
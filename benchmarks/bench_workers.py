@@ -0,0 +1,154 @@
+"""Prueba de carga multi-worker: rendimiento de lectura frente al número de workers.
+
+Para cada número de workers genera un conjunto de datos nuevo, arranca
+``python -m utils.server --workers N`` (modo de datos compartidos) y lanza
+``--clients`` procesos cliente con conexiones persistentes que hacen GET
+durante ``--seconds``. Informa peticiones/s, aceleración respecto al
+primer valor de ``--workers`` y latencias p50/p99.
+
+Después comprueba la coherencia entre workers: una edición se ve desde
+conexiones nuevas (repartidas entre workers) y altas concurrentes desde
+varios clientes obtienen ids distintos.
+
+El escalado solo se observa con núcleos libres para servidores y clientes
+(``os.cpu_count()`` >= workers + clientes).
+
+Uso: python -m benchmarks.bench_workers --workers 1,2,4 --clients 8 --seconds 10
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+from benchmarks.datasets import sample_player, write_dataset
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+READ_PATHS = ("/players/{player}", "/enemies/query/?type=goblin&limit=20", "/api/estadisticas")
+
+
+# ------------------------ SERVIDOR ------------------------
+
+def start_server(port: int, workers: int, directory: str) -> subprocess.Popen:
+    env = dict(os.environ, DATA_DIR=directory, WEB_CONCURRENCY=str(workers), SHARED_DATA="1")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "utils.server", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        try:
+            if request(port, "GET", "/")[0] == 200:
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("Server did not start")
+
+
+def request(port: int, method: str, path: str, body: Optional[dict] = None) -> Tuple[int, bytes]:
+    # Conexión nueva por petición: el kernel la reparte entre los workers.
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    try:
+        payload = json.dumps(body) if body is not None else None
+        connection.request(method, path, payload, {"Content-Type": "application/json"} if payload else {})
+        response = connection.getresponse()
+        return response.status, response.read()
+    finally:
+        connection.close()
+
+
+# ------------------------ CARGA ------------------------
+
+def client(task: Tuple[int, int, float, int]) -> List[float]:
+    port, players, seconds, seed = task
+    rng = random.Random(seed)
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    latencies = []
+    deadline = time.perf_counter() + seconds
+    while True:
+        start = time.perf_counter()
+        if start >= deadline:
+            break
+        path = rng.choice(READ_PATHS).format(player=rng.randint(1, players))
+        connection.request("GET", path)
+        response = connection.getresponse()
+        response.read()
+        latencies.append(time.perf_counter() - start)
+    connection.close()
+    return latencies
+
+
+def load(port: int, players: int, clients: int, seconds: float, seed: int) -> Tuple[float, float, float]:
+    with multiprocessing.Pool(clients) as pool:
+        results = pool.map(client, [(port, players, seconds, seed + number) for number in range(clients)])
+    latencies = sorted(latency for result in results for latency in result)
+    cuts = statistics.quantiles(latencies, n=100)
+    return len(latencies) / seconds, cuts[49] * 1000, cuts[98] * 1000
+
+
+# ------------------------ COHERENCIA ------------------------
+
+def check_coherence(port: int, probes: int = 20) -> List[str]:
+    errors = []
+    status, body = request(port, "GET", "/players/1")
+    player = json.loads(body)
+    player["health"] = 4321
+    request(port, "PUT", "/players/1", player)
+    seen = {json.loads(request(port, "GET", "/players/1")[1])["health"] for _ in range(probes)}
+    if seen != {4321}:
+        errors.append(f"update not visible from every worker: {seen}")
+
+    rng = random.Random(7)
+    bodies = [sample_player(rng) for _ in range(100)]
+    with ThreadPoolExecutor(8) as executor:
+        created = list(executor.map(lambda item: request(port, "POST", "/players_create/", item), bodies))
+    ids = [json.loads(body)["id"] for status, body in created if status == 200]
+    if len(ids) != len(bodies) or len(set(ids)) != len(ids):
+        errors.append(f"concurrent creates: {len(ids)} ok, {len(set(ids))} distinct ids")
+    counts = {json.loads(request(port, "GET", "/api/estadisticas")[1])["players"]["total"] for _ in range(probes)}
+    if len(counts) != 1:
+        errors.append(f"stats differ between workers: {counts}")
+    return errors
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,2,4", help="Lista de números de workers")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--players", type=int, default=10000)
+    parser.add_argument("--enemies", type=int, default=2000)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    counts = [int(value) for value in args.workers.split(",")]
+    print(f"{os.cpu_count()} núcleos, {args.clients} clientes, {args.seconds:g} s por medida")
+    baseline = None
+    for workers in counts:
+        with tempfile.TemporaryDirectory() as directory:
+            write_dataset(directory, players=args.players, enemies=args.enemies, seed=args.seed)
+            server = start_server(args.port, workers, directory)
+            try:
+                throughput, p50, p99 = load(args.port, args.players, args.clients, args.seconds, args.seed)
+                errors = check_coherence(args.port)
+            finally:
+                server.terminate()
+                server.wait(30)
+        baseline = baseline or throughput
+        print(f"  workers={workers:<3} {throughput:9.0f} req/s  x{throughput / baseline:4.2f}  "
+              f"p50 {p50:6.2f} ms  p99 {p99:7.2f} ms  coherencia: {'ok' if not errors else '; '.join(errors)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Generación de tablas sintéticas de jugadores y enemigos para los benchmarks."""
+import csv
+import os
+import random
+import shutil
+from typing import Iterator
+
+ENEMY_TYPES = ("goblin", "orco", "esqueleto", "slime", "dragon", "murcielago")
+
+
+def sample_player(rng: random.Random) -> dict:
+    return {
+        "name": f"player{rng.randint(0, 9999)}",
+        "health": rng.randint(0, 200),
+        "regenerate_health": rng.randint(0, 10),
+        "speed": round(rng.uniform(0.5, 5.0), 3),
+        "jump": round(rng.uniform(0.5, 3.0), 3),
+        "is_dead": rng.random() < 0.2,
+        "armor": rng.randint(0, 50),
+        "hit_speed": rng.randint(0, 10),
+    }
+
+
+def sample_enemy(rng: random.Random) -> dict:
+    return {
+        "name": f"enemy{rng.randint(0, 9999)}",
+        "speed": round(rng.uniform(0.5, 4.0), 3),
+        "jump": round(rng.uniform(0.5, 2.0), 3),
+        "hit_speed": rng.randint(0, 10),
+        "health": rng.randint(1, 500),
+        "type": rng.choice(ENEMY_TYPES),
+        "spawn": round(rng.uniform(0.5, 30.0), 3),
+        "probability_spawn": round(rng.random(), 4),
+    }
+
+
+def iter_rows(count: int, sampler, rng: random.Random) -> Iterator[dict]:
+    for row_id in range(1, count + 1):
+        yield {"id": row_id, **sampler(rng)}
+
+
+def write_dataset(directory: str, players: int, enemies: int, seed: int = 42) -> None:
+    """Escribe ``players.csv``/``enemies.csv`` (y sus historiales vacíos) en ``directory``."""
+    # Import diferido: las operaciones fijan sus rutas a partir de DATA_DIR al importarse.
+    from operations.operations_enemy import ENEMY_FIELDS
+    from operations.operations_player import FIELDNAMES as PLAYER_FIELDS
+
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    for name, fields, count, sampler in (
+        ("players.csv", PLAYER_FIELDS, players, sample_player),
+        ("enemies.csv", ENEMY_FIELDS, enemies, sample_enemy),
+    ):
+        with open(os.path.join(directory, name), mode="w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(iter_rows(count, sampler, rng))
+    for name, fields in (("deleted_players.csv", PLAYER_FIELDS), ("deleted_enemies.csv", ENEMY_FIELDS)):
+        with open(os.path.join(directory, name), mode="w", newline="", encoding="utf-8") as f:
+            csv.DictWriter(f, fieldnames=fields).writeheader()
+    for name in ("players.log", "enemies.log"):
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            os.remove(path)
+    shutil.rmtree(os.path.join(directory, "history"), ignore_errors=True)
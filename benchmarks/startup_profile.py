@@ -0,0 +1,122 @@
+"""Perfil de arranque en frío: import por módulo y tiempo hasta la primera petición.
+
+Cada medición corre en un proceso nuevo (sin cachés de import calientes salvo
+los .pyc) sobre una copia de ``Data/``, para no compactar los datos reales.
+Informa los módulos que más tardan en importarse (``-X importtime``), el
+tiempo de import agrupado por paquete y, de ``/debug/startup``, las fases del
+startup y el tiempo hasta servir ``GET /``.
+
+Uso:
+    python -m benchmarks.startup_profile
+    python -m benchmarks.startup_profile --repeat 5 --top 15 --output startup.json
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COLD_START = """
+import asyncio, json, time
+start = time.perf_counter()
+import main
+from httpx import ASGITransport, AsyncClient
+
+async def run():
+    await main.app.router.startup()
+    async with AsyncClient(transport=ASGITransport(app=main.app), base_url="http://profile") as client:
+        await client.get("/")
+        first_request = time.perf_counter() - start
+        report = (await client.get("/debug/startup")).json()
+    await main.app.router.shutdown()
+    report["wall_first_request_seconds"] = round(first_request, 4)
+    print(json.dumps(report))
+
+asyncio.run(run())
+"""
+
+
+def run_python(code: str, data_dir: str, *flags: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *flags, "-c", code],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+        env={**os.environ, "PYTHONPATH": ROOT, "DATA_DIR": data_dir},
+    )
+
+
+def import_times(data_dir: str) -> List[Tuple[str, int, int]]:
+    """(módulo, µs propios, µs acumulados) de ``import main``."""
+    result = run_python("import main", data_dir, "-X", "importtime")
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def by_package(rows: List[Tuple[str, int, int]]) -> Dict[str, int]:
+    totals: Dict[str, int] = defaultdict(int)
+    for name, self_us, _ in rows:
+        totals[name.split(".")[0]] += self_us
+    return dict(sorted(totals.items(), key=lambda item: item[1], reverse=True))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3, help="Arranques en frío a medir.")
+    parser.add_argument("--top", type=int, default=20, help="Módulos a listar.")
+    parser.add_argument("--output", help="Archivo JSON donde guardar el perfil.")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = os.path.join(tmp, "Data")
+        shutil.copytree(os.path.join(ROOT, "Data"), data_dir)
+        profile(args, data_dir)
+
+
+def profile(args, data_dir: str) -> None:
+    rows = import_times(data_dir)
+    total_us = sum(self_us for _, self_us, _ in rows)
+    print(f"Import de main: {total_us / 1000:.1f} ms en {len(rows)} módulos\n")
+    print("Por paquete (ms propios):")
+    packages = by_package(rows)
+    for package, self_us in list(packages.items())[:args.top]:
+        print(f"    {package:<28} {self_us / 1000:8.1f}")
+    print("\nMódulos más lentos (ms acumulados):")
+    slowest = sorted(rows, key=lambda row: row[2], reverse=True)[:args.top]
+    for name, self_us, cumulative_us in slowest:
+        print(f"    {name:<48} {cumulative_us / 1000:8.1f}  (propio {self_us / 1000:.1f})")
+
+    starts = [json.loads(run_python(COLD_START, data_dir).stdout.strip().splitlines()[-1]) for _ in range(args.repeat)]
+    first_request = [start["wall_first_request_seconds"] for start in starts]
+    print(f"\nPrimera petición (GET /) tras arrancar en frío: mediana {statistics.median(first_request) * 1000:.1f} ms "
+          f"(min {min(first_request) * 1000:.1f}, max {max(first_request) * 1000:.1f}) en {args.repeat} arranques")
+    print("Fases del startup (último arranque):")
+    for phase, seconds in starts[-1]["phases"].items():
+        print(f"    {phase:<28} {seconds * 1000:8.1f} ms")
+    print("Dependencias pesadas cargadas:", [name for name, loaded in starts[-1]["deferred_loaded"].items() if loaded] or "ninguna")
+
+    if args.output:
+        with open(args.output, mode="w", encoding="utf-8") as f:
+            json.dump({
+                "import_ms": round(total_us / 1000, 2),
+                "packages_ms": {name: round(us / 1000, 2) for name, us in packages.items()},
+                "slowest_modules": [
+                    {"module": name, "self_ms": round(self_us / 1000, 2), "cumulative_ms": round(cumulative_us / 1000, 2)}
+                    for name, self_us, cumulative_us in slowest
+                ],
+                "cold_starts": starts,
+            }, f, indent=2)
+        print(f"\nPerfil guardado en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,43 +1,119 @@
-from fastapi import FastAPI, Depends, HTTPException, Query, Request, Form, File, UploadFile
-from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
-from sqlmodel.ext.asyncio.session import AsyncSession
-from sqlalchemy.future import select
-from typing import List, Optional
-from models import Player, PlayerWithID, Enemy, EnemyWithID
+from utils.profiling import startup_profile
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Form, File, UploadFile, WebSocket
+from fastapi.responses import HTMLResponse, RedirectResponse, Response, StreamingResponse
+from typing import List, Literal, Optional
+from pydantic import TypeAdapter, ValidationError
+from fastapi.exceptions import RequestValidationError
+from models import Player, PlayerWithID, Enemy, EnemyWithID, PlayerPage, EnemyPage
 from operations.operations_player import (
-    get_all_players, get_player, create_player, update_player,
-    delete_player, get_deleted_players, restore_player,
-    delete_all_players as op_delete_all_players
+    get_all_players as read_all_players, get_player as read_one_player,
+    create_player, update_player, delete_player,
+    get_deleted_players as read_deleted_players, get_deleted_players_page, restore_player, players_history,
+    revive_player as revive_player_by_id,
+    create_temporary_player, read_all_temporary_players,
+    create_players, update_players, delete_players,
+    delete_all_players as op_delete_all_players, players_storage, players_analytics,
+    iter_all_players, iter_deleted_players, query_players, FIELDNAMES as PLAYER_FIELDS
 )
 
 from operations.operations_enemy import (
     read_all_enemies, read_one_enemy, create_enemy, update_enemy,
-    delete_enemy, read_deleted_enemies, delete_all_enemies as op_delete_all_enemies
+    delete_enemy, read_deleted_enemies, read_deleted_enemies_page, restore_enemy, enemies_history,
+    delete_all_enemies as op_delete_all_enemies,
+    create_enemies, update_enemies, delete_enemies,
+    enemies_storage, enemies_analytics, iter_all_enemies, iter_deleted_enemies, query_enemies, ENEMY_FIELDS
 )
-from utils.conection_db import get_session, init_db
-from modelos.player_sql import PlayerModel
+from utils.bulk import read_bulk_body, validate_items, split_patches, validated_ids
+from utils.metrics import InstrumentedTemplates, metrics_middleware, render_metrics, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from utils.streaming import stream_format, stream_rows, NDJSON_MEDIA_TYPE, CSV_MEDIA_TYPE
+from utils.cache import CachedRoute, cached, response_cache
+from utils.feed import change_feed, sse_stream, websocket_stream
+from utils.uploads import BodyLimitRoute, FORM_OVERHEAD_BYTES, MAX_UPLOAD_BYTES, limit_body, store_upload, thumbnail_url
+from utils.assets import AssetStaticFiles, assets
+from utils.rendering import PageRenderer
+from utils.conection_db import get_session, pool_metrics
 from operations.operations_player import router as player_router
-import shutil
-import uvicorn
+from operations.backends import SHARED_DATA, WORKERS, follow_loop, maintenance_loop
+from operations.repository import RowsNotFound
+from operations.stats import player_stats, enemy_stats
+from operations import simulation
+from datetime import datetime
+import asyncio
 import os
 
 
 
+class AppRoute(BodyLimitRoute, CachedRoute):
+    pass
+
+
 app = FastAPI()
+# Las rutas marcadas con @cached se sirven desde response_cache (ETag + 304) y
+# las marcadas con @limit_body cortan el cuerpo mientras llega.
+app.router.route_class = AppRoute
+app.middleware("http")(metrics_middleware)
+app.middleware("http")(startup_profile.first_request_middleware)
 app.include_router(player_router, prefix="/api/players", tags=["Players"])
 
-app.mount("/static", StaticFiles(directory="static"), name="static")
-templates = Jinja2Templates(directory="templates")
+app.mount("/static", AssetStaticFiles(directory="static"), name="static")
+templates = InstrumentedTemplates(directory="templates")
+templates.env.globals["thumbnail_url"] = thumbnail_url
+renderer = PageRenderer(templates, manifest=assets)
+
+# Páginas sin datos dinámicos: se renderizan una vez al arrancar.
+renderer.static_page("home", "index.html")
+renderer.static_page("desarrollador", "detalle.html", {"titulo": "👨‍💻 Desarrollador", "info": """
+    <ul>
+      <li><strong>Nombre:</strong> Andrés Felipe Ordóñez</li>
+      <li><strong>Código:</strong> 67001128</li>
+      <li><strong>Correo:</strong> afordonez28@ucatolica.edu.co</li>
+      <li><strong>Semestre:</strong> Séptimo</li>
+    </ul>
+    """})
+renderer.static_page("objetivo", "detalle.html", {"titulo": "🎯 Objetivo del Proyecto", "info": "<p>Crear interfaz gráfica 2D en Godot, fomentando creatividad...</p>"})
+renderer.static_page("planeacion", "detalle.html", {"titulo": "📋 Planeación", "info": "<p>Fase de planeación: requisitos, diseño CRUD, gráficos...</p>"})
+renderer.static_page("diseno", "detalle.html", {"titulo": "🎨 Diseño", "info": "<p>Estética PixelArt, navegación sencilla y estilo RPG...</p>"})
+renderer.static_page("acerca", "acerca.html")
+
+PLAYER_COLUMNS = list(PlayerWithID.model_fields)
+ENEMY_COLUMNS = list(EnemyWithID.model_fields)
+
+players_storage.subscribe(response_cache.table("players", poll=players_storage.poll))
+enemies_storage.subscribe(response_cache.table("enemies", poll=enemies_storage.poll))
+players_storage.subscribe(change_feed.table("players"))
+enemies_storage.subscribe(change_feed.table("enemies"))
+
+PLAYER_LIST = TypeAdapter(List[Player])
+ENEMY_LIST = TypeAdapter(List[Enemy])
 
 @app.on_event("startup")
 async def on_startup():
-    await init_db()
+    # La base de datos (motor y tablas) se inicializa en su primer uso.
+    with startup_profile.phase("players_storage"):
+        await players_storage.startup()
+    with startup_profile.phase("enemies_storage"):
+        await enemies_storage.startup()
+    with startup_profile.phase("assets"):
+        await asyncio.to_thread(assets.build)
+    with startup_profile.phase("prerender"):
+        await asyncio.to_thread(renderer.prerender)
+    app.state.maintenance = asyncio.create_task(
+        maintenance_loop([players_storage, enemies_storage, players_history, enemies_history]))
+    # Varios workers: los cambios de los demás llegan al feed y a las estadísticas sin esperar a una lectura.
+    app.state.follow = asyncio.create_task(follow_loop([players_storage, enemies_storage])) if SHARED_DATA else None
+    startup_profile.mark_started()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    app.state.maintenance.cancel()
+    if app.state.follow is not None:
+        app.state.follow.cancel()
+    await players_storage.shutdown()
+    await enemies_storage.shutdown()
 
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
-    return templates.TemplateResponse("index.html", {"request": request})
+    return renderer.page("home")
 
 # HTML interfaces
 @app.get("/players/created/{player_id}", response_class=HTMLResponse)
@@ -45,41 +121,53 @@ async def show_created_player(request: Request, player_id: int):
     player = await read_one_player(player_id)
     if not player:
         raise HTTPException(status_code=404, detail="Player not found")
-    imagen = f"/static/uploads/{player.name.lower()}.png"
-    return templates.TemplateResponse("personaje_creado.html", {"request": request, "player": player, "imagen": imagen})
+    return templates.TemplateResponse("personaje_creado.html", {"request": request, "player": player, "imagen": player.image})
 
 @app.get("/players/form", response_class=HTMLResponse)
 async def form_player(request: Request):
     return templates.TemplateResponse("form_entidad.html", {"request": request})
 
+def table_rows(entities, columns: List[str]):
+    """Prepara cada entidad una sola vez (dict + miniatura) y devuelve sus filas HTML."""
+    items = []
+    for entity in entities:
+        item = entity.dict()
+        if item.get("image"):
+            item["image"] = assets.url(thumbnail_url(item["image"], 64))
+        items.append(item)
+    return renderer.rows("fila.html", columns, items)
+
 @app.get("/players/html", response_class=HTMLResponse)
+@cached("players")
 async def list_players_html(request: Request):
     players = await read_all_players()
-    imagenes = ["/static/uploads/personaje_1.png",
-                "/static/uploads/personaje_2.png",
-                "/static/uploads/personaje_3.png",
-                "/static/uploads/personaje_4.png"]
-    return templates.TemplateResponse("listar.html", {"request": request, "elementos": players, "imagenes": imagenes, "titulo": "Personajes"})
+    filas = table_rows(players, PLAYER_COLUMNS)
+    imagenes = [assets.url("uploads/personaje_1.png"),
+                assets.url("uploads/personaje_2.png"),
+                assets.url("uploads/personaje_3.png"),
+                assets.url("uploads/personaje_4.png")]
+    return renderer.response("listar.html", {"request": request, "columns": PLAYER_COLUMNS, "filas": filas, "imagenes": imagenes, "titulo": "Personajes", "tabla": "players"}, len(filas))
 
 @app.get("/enemies/html", response_class=HTMLResponse)
+@cached("enemies")
 async def list_enemies_html(request: Request):
     enemies = await read_all_enemies()
-    imagenes = ["/static/uploads/enemie_1.png", "/static/uploads/enemie_2.png"]
-    return templates.TemplateResponse("listar.html", {"request": request, "elementos": enemies, "imagenes": imagenes, "titulo": "Enemigos"})
+    filas = table_rows(enemies, ENEMY_COLUMNS)
+    imagenes = [assets.url("uploads/enemie_1.png"), assets.url("uploads/enemie_2.png")]
+    return renderer.response("listar.html", {"request": request, "columns": ENEMY_COLUMNS, "filas": filas, "imagenes": imagenes, "titulo": "Enemigos", "tabla": "enemies"}, len(filas))
 
 @app.post("/players/form")
+@limit_body(MAX_UPLOAD_BYTES + FORM_OVERHEAD_BYTES)
 async def submit_player_form(
     name: str = Form(...), health: int = Form(...), armor: int = Form(...),
     is_dead: bool = Form(False), regenerate_health: int = Form(...),
     speed: float = Form(...), jump: float = Form(...), hit_speed: int = Form(...),
     image: UploadFile = File(...)
 ):
-    image_path = f"static/uploads/{image.filename}"
-    with open(image_path, "wb") as buffer:
-        shutil.copyfileobj(image.file, buffer)
+    image_url = await store_upload(image)
     player = Player(name=name, health=health, armor=armor, is_dead=is_dead,
                     regenerate_health=regenerate_health, speed=speed,
-                    jump=jump, hit_speed=hit_speed)
+                    jump=jump, hit_speed=hit_speed, image=image_url)
     new_player = await create_player(player)
     return RedirectResponse(url=f"/players/created/{new_player.id}", status_code=302)
 
@@ -102,52 +190,163 @@ async def submit_enemy_form(
 
 # Estadísticas y historial
 @app.get("/estadisticas", response_class=HTMLResponse)
+@cached("players", "enemies")
 async def estadisticas(request: Request):
-    jugadores = await read_all_players()
-    enemigos = await read_all_enemies()
-    return templates.TemplateResponse("estadisticas.html", {"request": request, "jugadores": jugadores, "enemigos": enemigos})
+    return templates.TemplateResponse("estadisticas.html", {
+        "request": request, "jugadores": player_stats.snapshot(), "enemigos": enemy_stats.snapshot(),
+    })
+
+@app.get("/api/estadisticas")
+@cached("players", "enemies")
+async def get_estadisticas():
+    return {"players": player_stats.snapshot(), "enemies": enemy_stats.snapshot()}
+
+# Feed de cambios: deltas de altas, ediciones, bajas y restauraciones en lugar de
+# volver a pedir las tablas completas. ``after`` (o Last-Event-ID) reanuda desde un seq.
+FeedTable = Literal["players", "enemies"]
+
+@app.get("/changes/stream")
+async def changes_stream(
+    request: Request,
+    after: Optional[int] = Query(None, description="Último seq recibido"),
+    table: Optional[List[FeedTable]] = Query(None),
+):
+    last_event = request.headers.get("last-event-id")
+    if after is None and last_event and last_event.isdigit():
+        after = int(last_event)
+    return StreamingResponse(
+        sse_stream(change_feed, after, table), media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.websocket("/ws/changes")
+async def changes_websocket(
+    websocket: WebSocket, after: Optional[int] = None, table: Optional[List[FeedTable]] = Query(None)
+):
+    await websocket_stream(websocket, change_feed, after, table)
+
+ANALYTICS_TABLES = {"players": players_analytics, "enemies": enemies_analytics}
+
+@app.get("/api/analytics/{table}/{query}")
+@cached("players", "enemies")
+async def get_analytics(
+    table: Literal["players", "enemies"],
+    query: Literal["summary", "percentiles", "histogram", "groupby", "correlation"],
+    field: str = Query(..., description="Campo numérico a analizar"),
+    by: Optional[str] = Query(None, description="Campo por el que agrupar (p. ej. type, is_dead)"),
+    other: Optional[str] = Query(None, description="Segundo campo para la correlación"),
+    q: List[float] = Query([50, 90, 99], description="Percentiles (0-100)"),
+    bins: int = Query(10, ge=1, le=1000),
+):
+    columns = ANALYTICS_TABLES[table]
+    await columns.refresh()
+    try:
+        if query == "summary":
+            return columns.summary(field)
+        if query == "percentiles":
+            return columns.percentiles(field, q, by)
+        if query == "histogram":
+            return columns.histogram(field, bins, by)
+        if query == "groupby":
+            if by is None:
+                raise ValueError("groupby needs 'by'")
+            return columns.group_by(by, field)
+        if other is None:
+            raise ValueError("correlation needs 'other'")
+        return columns.correlation(field, other)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/simulation/spawns")
+@cached("enemies")
+async def simulate_spawns(
+    request: Request,
+    duration: float = Query(600, gt=0, le=simulation.MAX_SIMULATION_SECONDS, description="Segundos a simular"),
+    seed: int = Query(0, ge=0),
+    type: Optional[List[str]] = Query(None, description="Tipos de enemigo a incluir (todos por defecto)"),
+    format: Optional[str] = Query(None, description="json, ndjson o csv"),
+):
+    # Misma seed + misma tabla => mismas oleadas; por eso la respuesta JSON se cachea.
+    await enemies_analytics.refresh()
+    plan = simulation.SpawnPlan(enemies_analytics, type)
+    kind = stream_format(request, format)
+    if kind == "csv":
+        return StreamingResponse(
+            simulation.iter_csv(plan, seed, duration), media_type=CSV_MEDIA_TYPE,
+            headers={"Content-Disposition": 'attachment; filename="spawns.csv"'},
+        )
+    if kind:
+        return StreamingResponse(simulation.iter_ndjson(plan, seed, duration), media_type=NDJSON_MEDIA_TYPE)
+    try:
+        return await asyncio.to_thread(simulation.simulate, plan, seed, duration)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+HISTORY_PAGE_SIZE = 50
+
+def timestamp(moment: Optional[datetime]) -> Optional[float]:
+    return moment.timestamp() if moment is not None else None
+
+def history_context(request: Request, entries, total: int, page: int, size: int) -> dict:
+    # Solo se leen del disco las filas de la página pedida.
+    pages = max(1, -(-total // size))
+    return {
+        "request": request,
+        "historial": [
+            {"eliminado": datetime.fromtimestamp(deleted_at).strftime("%Y-%m-%d %H:%M"), "entidad": entity}
+            for deleted_at, entity in entries
+        ],
+        "total": total, "pagina": page, "paginas": pages,
+        "anterior": str(request.url.include_query_params(page=page - 1)) if page > 1 else None,
+        "siguiente": str(request.url.include_query_params(page=page + 1)) if page < pages else None,
+    }
 
 @app.get("/historial", response_class=HTMLResponse)
-async def historial(request: Request):
-    historial = await read_deleted_players()
-    return templates.TemplateResponse("historial.html", {"request": request, "historial": historial})
+async def historial(
+    request: Request,
+    page: int = Query(1, ge=1),
+    size: int = Query(HISTORY_PAGE_SIZE, ge=1, le=500),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+):
+    entries, total = await get_deleted_players_page((page - 1) * size, size, timestamp(since), timestamp(until))
+    context = history_context(request, entries, total, page, size)
+    context.update(titulo="🪦 Personajes Eliminados", columna=("armor", "Armadura"))
+    return templates.TemplateResponse("historial.html", context)
 
 @app.get("/historial_enemigos", response_class=HTMLResponse)
-async def historial_enemigos(request: Request):
-    historial = await read_deleted_enemies()
-    return templates.TemplateResponse("historial.html", {"request": request, "historial": historial, "titulo": "☠️ Enemigos Eliminados"})
+async def historial_enemigos(
+    request: Request,
+    page: int = Query(1, ge=1),
+    size: int = Query(HISTORY_PAGE_SIZE, ge=1, le=500),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+):
+    entries, total = await read_deleted_enemies_page((page - 1) * size, size, timestamp(since), timestamp(until))
+    context = history_context(request, entries, total, page, size)
+    context.update(titulo="☠️ Enemigos Eliminados", columna=("type", "Tipo"))
+    return templates.TemplateResponse("historial.html", context)
 
 # Info pages
 @app.get("/desarrollador", response_class=HTMLResponse)
 async def info_desarrollador(request: Request):
-    contenido = """
-    <ul>
-      <li><strong>Nombre:</strong> Andrés Felipe Ordóñez</li>
-      <li><strong>Código:</strong> 67001128</li>
-      <li><strong>Correo:</strong> afordonez28@ucatolica.edu.co</li>
-      <li><strong>Semestre:</strong> Séptimo</li>
-    </ul>
-    """
-    return templates.TemplateResponse("detalle.html", {"request": request, "titulo": "👨‍💻 Desarrollador", "info": contenido})
+    return renderer.page("desarrollador")
 
 @app.get("/objetivo", response_class=HTMLResponse)
 async def objetivo_proyecto(request: Request):
-    contenido = "<p>Crear interfaz gráfica 2D en Godot, fomentando creatividad...</p>"
-    return templates.TemplateResponse("detalle.html", {"request": request, "titulo": "🎯 Objetivo del Proyecto", "info": contenido})
+    return renderer.page("objetivo")
 
 @app.get("/planeacion", response_class=HTMLResponse)
 async def planeacion(request: Request):
-    contenido = "<p>Fase de planeación: requisitos, diseño CRUD, gráficos...</p>"
-    return templates.TemplateResponse("detalle.html", {"request": request, "titulo": "📋 Planeación", "info": contenido})
+    return renderer.page("planeacion")
 
 @app.get("/diseno", response_class=HTMLResponse)
 async def diseno(request: Request):
-    contenido = "<p>Estética PixelArt, navegación sencilla y estilo RPG...</p>"
-    return templates.TemplateResponse("detalle.html", {"request": request, "titulo": "🎨 Diseño", "info": contenido})
+    return renderer.page("diseno")
 
 @app.get("/acerca", response_class=HTMLResponse)
 async def acerca(request: Request):
-    return templates.TemplateResponse("acerca.html", {"request": request})
+    return renderer.page("acerca")
 
 @app.get("/error_demo", response_class=HTMLResponse)
 async def error_demo(request: Request):
@@ -155,7 +354,11 @@ async def error_demo(request: Request):
 
 # API REST - Players
 @app.get("/players_add/", response_model=List[PlayerWithID])
-async def get_players():
+@cached("players")
+async def get_players(request: Request, format: Optional[str] = Query(None, description="json, ndjson o csv")):
+    kind = stream_format(request, format)
+    if kind:
+        return stream_rows(iter_all_players(), PLAYER_FIELDS, kind, "players")
     return await read_all_players()
 
 @app.post("/players_create/", response_model=PlayerWithID)
@@ -163,6 +366,7 @@ async def add_player(player: Player):
     return await create_player(player)
 
 @app.get("/players/{player_id}", response_model=PlayerWithID)
+@cached("players")
 async def get_player(player_id: int):
     player = await read_one_player(player_id)
     if not player:
@@ -184,14 +388,36 @@ async def delete_player_endpoint(player_id: int):
     return removed
 
 @app.get("/players/filter/", response_model=List[PlayerWithID])
+@cached("players")
 async def filter_players(is_dead: Optional[bool] = None):
-    players = await read_all_players()
-    return [p for p in players if is_dead is None or p.is_dead == is_dead]
+    players, _ = await query_players(equals={"is_dead": is_dead})
+    return players
 
 @app.get("/players/search/", response_model=List[PlayerWithID])
+@cached("players")
 async def search_players_by_health(min_health: int = Query(0)):
-    players = await read_all_players()
-    return [p for p in players if p.health >= min_health]
+    players, _ = await query_players(ranges={"health": (min_health, None)})
+    return players
+
+@app.get("/players/query/", response_model=PlayerPage)
+@cached("players")
+async def query_players_endpoint(
+    name: Optional[str] = None, is_dead: Optional[bool] = None,
+    min_health: Optional[int] = None, max_health: Optional[int] = None,
+    min_armor: Optional[int] = None, max_armor: Optional[int] = None,
+    min_speed: Optional[float] = None, max_speed: Optional[float] = None,
+    sort: str = Query("id", description="Campo de orden; prefijo '-' para descendente"),
+    limit: int = Query(50, ge=1, le=1000), cursor: Optional[str] = None
+):
+    try:
+        players, next_cursor = await query_players(
+            equals={"name": name, "is_dead": is_dead},
+            ranges={"health": (min_health, max_health), "armor": (min_armor, max_armor),
+                    "speed": (min_speed, max_speed)},
+            sort=sort.lstrip("-"), descending=sort.startswith("-"), limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return PlayerPage(items=players, next_cursor=next_cursor)
 
 @app.put("/players/{player_id}/revive", response_model=PlayerWithID)
 async def revive_player(player_id: int):
@@ -201,8 +427,26 @@ async def revive_player(player_id: int):
     return player
 
 @app.get("/players/deleted/", response_model=List[PlayerWithID])
-async def get_deleted_players():
-    return await read_deleted_players()
+async def get_deleted_players(
+    request: Request,
+    format: Optional[str] = Query(None, description="json, ndjson o csv"),
+    since: Optional[datetime] = Query(None, description="Borrados desde esta fecha"),
+    until: Optional[datetime] = Query(None, description="Borrados hasta esta fecha"),
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1),
+):
+    kind = stream_format(request, format)
+    if kind:
+        rows = iter_deleted_players(timestamp(since), timestamp(until), offset, limit)
+        return stream_rows(rows, PLAYER_FIELDS, kind, "deleted_players")
+    return await read_deleted_players(timestamp(since), timestamp(until), offset, limit)
+
+@app.post("/players/{player_id}/restore", response_model=PlayerWithID)
+async def restore_player_endpoint(player_id: int):
+    restored = await restore_player(player_id)
+    if not restored:
+        raise HTTPException(status_code=404, detail="Deleted player not found")
+    return restored
 
 @app.delete("/players/delete_all", response_model=List[PlayerWithID])
 async def delete_all_players_endpoint(confirm: bool = Query(False, description="Confirm deletion")):
@@ -210,16 +454,61 @@ async def delete_all_players_endpoint(confirm: bool = Query(False, description="
         raise HTTPException(status_code=400, detail="Set confirm=true to delete all players")
     return await op_delete_all_players()
 
+# API REST - Players (masivo: arreglo JSON o NDJSON)
+@app.post("/players/bulk/", response_model=List[PlayerWithID])
+async def bulk_create_players(request: Request):
+    players = validate_items(PLAYER_LIST, await read_bulk_body(request))
+    return await create_players(players)
+
+@app.patch("/players/bulk/", response_model=List[PlayerWithID])
+async def bulk_update_players(request: Request):
+    updates = split_patches(await read_bulk_body(request))
+    try:
+        return await update_players(updates)
+    except RowsNotFound as e:
+        raise HTTPException(status_code=404, detail=f"Players not found: {e.ids}")
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+
+@app.delete("/players/bulk/", response_model=List[PlayerWithID])
+async def bulk_delete_players(request: Request):
+    return await delete_players(validated_ids(await read_bulk_body(request)))
+
 # API REST - Enemies
 @app.post("/enemies/", response_model=EnemyWithID)
 async def add_enemy(enemy: Enemy):
     return await create_enemy(enemy)
 
 @app.get("/enemies/", response_model=List[EnemyWithID])
-async def get_enemies():
+@cached("enemies")
+async def get_enemies(request: Request, format: Optional[str] = Query(None, description="json, ndjson o csv")):
+    kind = stream_format(request, format)
+    if kind:
+        return stream_rows(iter_all_enemies(), ENEMY_FIELDS, kind, "enemies")
     return await read_all_enemies()
 
+@app.get("/enemies/query/", response_model=EnemyPage)
+@cached("enemies")
+async def query_enemies_endpoint(
+    name: Optional[str] = None, type: Optional[str] = None,
+    min_health: Optional[int] = None, max_health: Optional[int] = None,
+    min_spawn: Optional[float] = None, max_spawn: Optional[float] = None,
+    min_probability_spawn: Optional[float] = None, max_probability_spawn: Optional[float] = None,
+    sort: str = Query("id", description="Campo de orden; prefijo '-' para descendente"),
+    limit: int = Query(50, ge=1, le=1000), cursor: Optional[str] = None
+):
+    try:
+        enemies, next_cursor = await query_enemies(
+            equals={"name": name, "type": type},
+            ranges={"health": (min_health, max_health), "spawn": (min_spawn, max_spawn),
+                    "probability_spawn": (min_probability_spawn, max_probability_spawn)},
+            sort=sort.lstrip("-"), descending=sort.startswith("-"), limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return EnemyPage(items=enemies, next_cursor=next_cursor)
+
 @app.get("/enemies/{enemy_id}", response_model=EnemyWithID)
+@cached("enemies")
 async def get_enemy(enemy_id: int):
     enemy = await read_one_enemy(enemy_id)
     if not enemy:
@@ -241,8 +530,26 @@ async def delete_enemy_endpoint(enemy_id: int):
     return removed
 
 @app.get("/enemies/deleted/", response_model=List[EnemyWithID])
-async def get_deleted_enemies():
-    return await read_deleted_enemies()
+async def get_deleted_enemies(
+    request: Request,
+    format: Optional[str] = Query(None, description="json, ndjson o csv"),
+    since: Optional[datetime] = Query(None, description="Borrados desde esta fecha"),
+    until: Optional[datetime] = Query(None, description="Borrados hasta esta fecha"),
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1),
+):
+    kind = stream_format(request, format)
+    if kind:
+        rows = iter_deleted_enemies(timestamp(since), timestamp(until), offset, limit)
+        return stream_rows(rows, ENEMY_FIELDS, kind, "deleted_enemies")
+    return await read_deleted_enemies(timestamp(since), timestamp(until), offset, limit)
+
+@app.post("/enemies/{enemy_id}/restore", response_model=EnemyWithID)
+async def restore_enemy_endpoint(enemy_id: int):
+    restored = await restore_enemy(enemy_id)
+    if not restored:
+        raise HTTPException(status_code=404, detail="Deleted enemy not found")
+    return restored
 
 @app.delete("/enemies/delete_all", response_model=List[EnemyWithID])
 async def delete_all_enemies_endpoint(confirm: bool = Query(False, description="Confirm deletion")):
@@ -250,12 +557,47 @@ async def delete_all_enemies_endpoint(confirm: bool = Query(False, description="
         raise HTTPException(status_code=400, detail="Set confirm=true to delete all enemies")
     return await op_delete_all_enemies()
 
+# API REST - Enemies (masivo: arreglo JSON o NDJSON)
+@app.post("/enemies/bulk/", response_model=List[EnemyWithID])
+async def bulk_create_enemies(request: Request):
+    enemies = validate_items(ENEMY_LIST, await read_bulk_body(request))
+    return await create_enemies(enemies)
+
+@app.patch("/enemies/bulk/", response_model=List[EnemyWithID])
+async def bulk_update_enemies(request: Request):
+    updates = split_patches(await read_bulk_body(request))
+    try:
+        return await update_enemies(updates)
+    except RowsNotFound as e:
+        raise HTTPException(status_code=404, detail=f"Enemies not found: {e.ids}")
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+
+@app.delete("/enemies/bulk/", response_model=List[EnemyWithID])
+async def bulk_delete_enemies(request: Request):
+    return await delete_enemies(validated_ids(await read_bulk_body(request)))
+
 # SQL players
 @app.get("/players_sql/")
-async def get_players_sql(session: AsyncSession = Depends(get_session)):
+async def get_players_sql(session=Depends(get_session)):
+    from sqlmodel import select
+    from modelos.player_sql import PlayerModel
+
     result = await session.execute(select(PlayerModel))
     return result.scalars().all()
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
+@app.get("/db/pool")
+async def get_pool_metrics():
+    return pool_metrics()
+
+@app.get("/debug/startup", include_in_schema=False)
+async def get_startup_profile():
+    return startup_profile.report()
+
 # Temporary players
 @app.post("/players/temp_create/", response_model=PlayerWithID)
 async def add_temp_player(player: Player):
@@ -265,5 +607,15 @@ async def add_temp_player(player: Player):
 async def get_temp_players():
     return await read_all_temporary_players()
 
+startup_profile.mark_imported()
+
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="127.0.0.1", port=8000, reload=True)
+    import uvicorn
+
+    if WORKERS > 1:
+        # Varios workers (sin recarga automática) con el socket compartido de utils.server.
+        from utils.server import run
+
+        run("main:app", host="127.0.0.1", port=8000, workers=WORKERS)
+    else:
+        uvicorn.run("main:app", host="127.0.0.1", port=8000, reload=True)
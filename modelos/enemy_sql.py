@@ -0,0 +1,14 @@
+from sqlmodel import SQLModel, Field
+
+class EnemyModel(SQLModel, table=True):
+    __tablename__ = "enemies"
+
+    id: int | None = Field(default=None, primary_key=True)
+    name: str = Field(index=True)
+    speed: float = Field(index=True)
+    jump: float
+    hit_speed: int = Field(index=True)
+    health: int = Field(index=True)
+    type: str = Field(index=True)
+    spawn: float = Field(index=True)
+    probability_spawn: float = Field(index=True)
@@ -1,11 +1,16 @@
 from sqlalchemy import Column, Integer, Float, Boolean
-from utils.conection_db import Base
 from sqlmodel import SQLModel, Field
 
 class PlayerModel(SQLModel, table=True):
     __tablename__ = "players"  # Opcional: SQLModel puede generar esto automáticamente
 
     id: int | None = Field(default=None, primary_key=True)
-    name: str
-    health: int
-    armor: int
+    name: str = Field(index=True)
+    health: int = Field(index=True)
+    armor: int = Field(index=True)
+    regenerate_health: int = 0
+    speed: float = Field(default=1.0, index=True)
+    jump: float = Field(default=1.0, index=True)
+    is_dead: bool = Field(default=False, index=True)
+    hit_speed: int = Field(default=0, index=True)
+    image: str | None = None
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field
-from typing import Optional
+from pydantic import BaseModel, ConfigDict, Field
+from typing import List, Optional
 
 class Player(BaseModel):
     name: str = Field(..., min_length=1,example="Juan")  # ← NUEVO CAMPO
@@ -10,8 +10,12 @@ class Player(BaseModel):
     is_dead: bool
     armor: int = Field(..., ge=0)
     hit_speed: int = Field(..., ge=0)
+    image: Optional[str] = None  # URL de la imagen subida (/static/uploads/<hash>.<ext>)
 
 class PlayerWithID(Player):
+    # Acepta los registros compactos de operations.records (lectura por atributos).
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
 
 class Enemy(BaseModel):
@@ -25,4 +29,14 @@ class Enemy(BaseModel):
     probability_spawn: float = Field(..., ge=0, example=0.5)
 
 class EnemyWithID(Enemy):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
+
+class PlayerPage(BaseModel):
+    items: List[PlayerWithID]
+    next_cursor: Optional[str] = None
+
+class EnemyPage(BaseModel):
+    items: List[EnemyWithID]
+    next_cursor: Optional[str] = None
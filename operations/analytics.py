@@ -0,0 +1,178 @@
+import asyncio
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple, Type
+
+from pydantic import BaseModel
+
+from operations.backends import StorageBackend
+from operations.repository import ChangeListener
+from utils.metrics import timed
+
+# NumPy se importa en la primera consulta, no al cargar la app.
+if TYPE_CHECKING:
+    import numpy as np
+
+
+# ------------------------ TABLA COLUMNAR ------------------------
+
+class ColumnarTable(ChangeListener):
+    """Copia columnar (arrays NumPy) de una tabla para consultas analíticas.
+
+    Los campos numéricos y booleanos se guardan como ``float64``; los de texto
+    como códigos enteros más su tabla de etiquetas. La copia se reconstruye
+    perezosamente en la primera consulta después de un cambio.
+    """
+
+    def __init__(self, storage: StorageBackend, model: Type[BaseModel]):
+        self.storage = storage
+        self.numeric = [name for name, field in model.model_fields.items() if field.annotation in (int, float, bool)]
+        self.categorical = [name for name, field in model.model_fields.items() if field.annotation is str]
+        self.size = 0
+        self.columns: Dict[str, "np.ndarray"] = {}
+        self.codes: Dict[str, "np.ndarray"] = {}
+        self.labels: Dict[str, "np.ndarray"] = {}
+        self.version = 0
+        self.built_version = -1
+        self.lock = asyncio.Lock()
+
+    def on_change(self, before: Optional[BaseModel], after: Optional[BaseModel]) -> None:
+        self.version += 1
+
+    def on_reset(self, rows) -> None:
+        self.version += 1
+
+    async def refresh(self) -> None:
+        if self.built_version == self.version:
+            return
+        async with self.lock:
+            if self.built_version == self.version:
+                return
+            # Si algo cambia mientras se lee, la versión ya no coincide y la
+            # siguiente consulta vuelve a construir.
+            version = self.version
+            rows = [row async for row in self.storage.iterate()]
+            await asyncio.to_thread(self._build, rows)
+            self.built_version = version
+
+    @timed("analytics.build")
+    def _build(self, rows: List[BaseModel]) -> None:
+        import numpy as np
+
+        columns = {
+            name: np.fromiter((getattr(row, name) for row in rows), dtype=np.float64, count=len(rows))
+            for name in self.numeric
+        }
+        codes, labels = {}, {}
+        for name in self.categorical:
+            values = np.array([getattr(row, name) for row in rows], dtype=str)
+            labels[name], codes[name] = np.unique(values, return_inverse=True)
+        self.columns, self.codes, self.labels, self.size = columns, codes, labels, len(rows)
+
+    # ------------------------ ACCESO A COLUMNAS ------------------------
+
+    def _values(self, field: str) -> "np.ndarray":
+        if field not in self.columns:
+            raise ValueError(f"'{field}' is not a numeric field")
+        return self.columns[field]
+
+    def _groups(self, by: str) -> Tuple[List[Any], "np.ndarray"]:
+        import numpy as np
+
+        if by in self.codes:
+            return self.labels[by].tolist(), self.codes[by]
+        if by not in self.columns:
+            raise ValueError(f"Cannot group by '{by}'")
+        labels, codes = np.unique(self.columns[by], return_inverse=True)
+        return labels.tolist(), codes
+
+    # ------------------------ CONSULTAS ------------------------
+
+    def summary(self, field: str) -> dict:
+        import numpy as np
+
+        values = self._values(field)
+        if not values.size:
+            return {"field": field, "count": 0}
+        p25, p50, p75 = np.percentile(values, (25, 50, 75))
+        return {
+            "field": field,
+            "count": int(values.size),
+            "mean": float(values.mean()),
+            "std": float(values.std()),
+            "min": float(values.min()),
+            "p25": float(p25),
+            "median": float(p50),
+            "p75": float(p75),
+            "max": float(values.max()),
+        }
+
+    def percentiles(self, field: str, q: Sequence[float], by: Optional[str] = None) -> dict:
+        import numpy as np
+
+        values = self._values(field)
+        q = [float(value) for value in q]
+        if any(value < 0 or value > 100 for value in q):
+            raise ValueError("Percentiles must be between 0 and 100")
+        if by is None:
+            result = np.percentile(values, q).tolist() if values.size else [None] * len(q)
+            return {"field": field, "q": q, "values": result}
+        labels, codes = self._groups(by)
+        # Un único ordenamiento por (grupo, valor); cada grupo queda contiguo.
+        order = np.lexsort((values, codes))
+        bounds = np.searchsorted(codes[order], np.arange(len(labels) + 1))
+        ordered = values[order]
+        groups = [
+            {by: label, "count": int(end - start), "values": np.percentile(ordered[start:end], q).tolist()}
+            for label, start, end in zip(labels, bounds[:-1], bounds[1:])
+        ]
+        return {"field": field, "q": q, "by": by, "groups": groups}
+
+    def histogram(self, field: str, bins: int = 10, by: Optional[str] = None) -> dict:
+        import numpy as np
+
+        values = self._values(field)
+        edges = np.histogram_bin_edges(values, bins=bins) if values.size else np.linspace(0.0, 1.0, bins + 1)
+        positions = np.clip(np.searchsorted(edges, values, side="right") - 1, 0, bins - 1)
+        if by is None:
+            counts = np.bincount(positions, minlength=bins)
+            return {"field": field, "edges": edges.tolist(), "counts": counts.tolist()}
+        labels, codes = self._groups(by)
+        counts = np.bincount(codes * bins + positions, minlength=len(labels) * bins).reshape(len(labels), bins)
+        groups = [{by: label, "counts": row.tolist()} for label, row in zip(labels, counts)]
+        return {"field": field, "edges": edges.tolist(), "by": by, "groups": groups}
+
+    def group_by(self, by: str, field: str) -> dict:
+        import numpy as np
+
+        values = self._values(field)
+        labels, codes = self._groups(by)
+        counts = np.bincount(codes, minlength=len(labels))
+        sums = np.bincount(codes, weights=values, minlength=len(labels))
+        order = np.lexsort((values, codes))
+        bounds = np.searchsorted(codes[order], np.arange(len(labels) + 1))
+        ordered = values[order]
+        groups = [
+            {
+                by: label,
+                "count": int(count),
+                "sum": float(total),
+                "mean": float(total / count),
+                "min": float(ordered[start]),
+                "max": float(ordered[end - 1]),
+            }
+            for label, count, total, start, end in zip(labels, counts, sums, bounds[:-1], bounds[1:])
+        ]
+        return {"field": field, "by": by, "groups": groups}
+
+    def correlation(self, field: str, other: str) -> dict:
+        x, y = self._values(field), self._values(other)
+        result = {"field": field, "other": other, "count": int(x.size), "r": None, "slope": None, "intercept": None}
+        if not x.size:
+            return result
+        dx, dy = x - x.mean(), y - y.mean()
+        sxx, syy = float(dx @ dx), float(dy @ dy)
+        if sxx and syy:
+            sxy = float(dx @ dy)
+            result["r"] = sxy / (sxx * syy) ** 0.5
+            result["slope"] = sxy / sxx
+            result["intercept"] = float(y.mean() - result["slope"] * x.mean())
+        return result
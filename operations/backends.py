@@ -0,0 +1,219 @@
+import asyncio
+import importlib
+import os
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple, Type
+
+from operations.records import CompactRecord
+from operations.repository import BeforeRemove, ChangeListener, Repository
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "csv").lower()
+# Workers de uvicorn (``--workers`` lee la misma variable). Con más de uno los
+# archivos de datos se comparten entre procesos (cerrojos + seguimiento del log).
+WORKERS = int(os.getenv("WEB_CONCURRENCY", "1"))
+SHARED_DATA = os.getenv("SHARED_DATA", "1" if WORKERS > 1 else "0").lower() in ("1", "true", "yes")
+FOLLOW_INTERVAL = float(os.getenv("FOLLOW_INTERVAL", "0.2"))
+
+
+# ------------------------ INTERFAZ DE ALMACENAMIENTO ------------------------
+
+class StorageBackend(ABC):
+    """Operaciones que ``operations_player``/``operations_enemy`` piden a una tabla.
+
+    Hay dos implementaciones: ``CSVBackend`` (repositorio en memoria + CSV)
+    y ``SQLBackend`` (tabla SQLModel sobre el motor async de
+    ``utils.conection_db``). Se elige con la variable ``STORAGE_BACKEND``.
+    Ambas devuelven registros compactos (``operations.records``).
+    """
+
+    name = "abstract"
+
+    @abstractmethod
+    def subscribe(self, listener: ChangeListener) -> None:
+        """Registra un observador de los cambios (altas, ediciones, bajas)."""
+
+    async def startup(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def maintain(self) -> None:
+        pass
+
+    def poll(self) -> None:
+        """Aplica los cambios hechos por otros workers (barato si no hay ninguno)."""
+
+    @abstractmethod
+    async def get(self, row_id: int) -> Optional[CompactRecord]:
+        ...
+
+    @abstractmethod
+    async def all(self) -> List[CompactRecord]:
+        ...
+
+    @abstractmethod
+    def iterate(self, batch_size: int = 500) -> AsyncIterator[CompactRecord]:
+        ...
+
+    @abstractmethod
+    async def find(self, field: str, value: Any) -> List[CompactRecord]:
+        ...
+
+    @abstractmethod
+    async def query(
+        self,
+        equals: Optional[Dict[str, Any]] = None,
+        ranges: Optional[Dict[str, Tuple[Any, Any]]] = None,
+        sort: str = "id",
+        descending: bool = False,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[CompactRecord], Optional[str]]:
+        ...
+
+    @abstractmethod
+    async def count(self) -> int:
+        ...
+
+    @abstractmethod
+    async def missing(self, row_ids: Iterable[int]) -> List[int]:
+        ...
+
+    @abstractmethod
+    async def insert(self, data: dict, row_id: Optional[int] = None) -> CompactRecord:
+        ...
+
+    @abstractmethod
+    async def insert_many(self, items: List[dict]) -> List[CompactRecord]:
+        ...
+
+    @abstractmethod
+    async def update(self, row_id: int, data: dict) -> Optional[CompactRecord]:
+        ...
+
+    @abstractmethod
+    async def update_many(self, updates: Dict[int, dict]) -> List[CompactRecord]:
+        """Todo o nada: ``RowsNotFound`` si algún id no existe."""
+
+    @abstractmethod
+    async def delete(self, row_id: int, before_remove: BeforeRemove = None) -> Optional[CompactRecord]:
+        """``before_remove`` recibe las filas antes de confirmar el borrado (historial)."""
+
+    @abstractmethod
+    async def delete_many(self, row_ids: Iterable[int], before_remove: BeforeRemove = None) -> List[CompactRecord]:
+        ...
+
+    @abstractmethod
+    async def clear(self, before_remove: BeforeRemove = None) -> List[CompactRecord]:
+        ...
+
+
+# ------------------------ CSV ------------------------
+
+class CSVBackend(StorageBackend):
+    name = "csv"
+
+    def __init__(self, repository: Repository, compaction_threshold: int = 500):
+        self.repository = repository
+        self.compaction_threshold = compaction_threshold
+
+    def subscribe(self, listener: ChangeListener) -> None:
+        self.repository.listeners.append(listener)
+
+    async def startup(self) -> None:
+        await asyncio.to_thread(self.repository.load)
+
+    async def shutdown(self) -> None:
+        await self.repository.compact()
+
+    async def maintain(self) -> None:
+        if self.repository.needs_compaction(self.compaction_threshold):
+            await self.repository.compact()
+
+    def poll(self) -> None:
+        self.repository.refresh()
+
+    async def get(self, row_id: int) -> Optional[CompactRecord]:
+        return self.repository.get(row_id)
+
+    async def all(self) -> List[CompactRecord]:
+        return self.repository.all()
+
+    async def iterate(self, batch_size: int = 500) -> AsyncIterator[CompactRecord]:
+        for row in self.repository.all():
+            yield row
+
+    async def find(self, field: str, value: Any) -> List[CompactRecord]:
+        return self.repository.find(field, value)
+
+    async def query(self, equals=None, ranges=None, sort="id", descending=False, limit=None, cursor=None):
+        return self.repository.query(equals, ranges, sort, descending, limit, cursor)
+
+    async def count(self) -> int:
+        return self.repository.count()
+
+    async def missing(self, row_ids: Iterable[int]) -> List[int]:
+        return self.repository.missing(row_ids)
+
+    async def insert(self, data: dict, row_id: Optional[int] = None) -> CompactRecord:
+        return await self.repository.insert(data, row_id)
+
+    async def insert_many(self, items: List[dict]) -> List[CompactRecord]:
+        return await self.repository.insert_many(items)
+
+    async def update(self, row_id: int, data: dict) -> Optional[CompactRecord]:
+        return await self.repository.update(row_id, data)
+
+    async def update_many(self, updates: Dict[int, dict]) -> List[CompactRecord]:
+        return await self.repository.update_many(updates)
+
+    async def delete(self, row_id: int, before_remove: BeforeRemove = None) -> Optional[CompactRecord]:
+        return await self.repository.delete(row_id, before_remove)
+
+    async def delete_many(self, row_ids: Iterable[int], before_remove: BeforeRemove = None) -> List[CompactRecord]:
+        return await self.repository.delete_many(row_ids, before_remove)
+
+    async def clear(self, before_remove: BeforeRemove = None) -> List[CompactRecord]:
+        return await self.repository.clear(before_remove)
+
+
+# ------------------------ SELECCION ------------------------
+
+def import_model(path: str) -> Type:
+    module_name, _, attribute = path.rpartition(".")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+def select_backend(repository: Repository, sql_model: str, backend: Optional[str] = None) -> StorageBackend:
+    """``sql_model`` es la ruta del modelo SQLModel, p. ej. ``modelos.player_sql.PlayerModel``."""
+    backend = (backend or STORAGE_BACKEND).lower()
+    if backend == "csv":
+        return CSVBackend(repository)
+    if backend == "sql":
+        # Imports diferidos: el modo CSV no necesita cargar SQLAlchemy.
+        from operations.sql_backend import SQLBackend
+        return SQLBackend(
+            import_model(sql_model),
+            repository.model,
+            equal_fields=tuple(repository.indexes),
+            range_fields=tuple(repository.sorted_indexes),
+            channel_path=f"{repository.log.path}.changes" if repository.file_lock is not None else None,
+        )
+    raise ValueError(f"Unknown STORAGE_BACKEND '{backend}' (expected 'csv' or 'sql')")
+
+
+async def maintenance_loop(backends: List[StorageBackend], interval: float = 5.0) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        for backend in backends:
+            await backend.maintain()
+
+
+async def follow_loop(backends: List[StorageBackend], interval: float = FOLLOW_INTERVAL) -> None:
+    # Con varios workers: los cambios de los demás llegan a estadísticas, cachés
+    # y feed aunque este worker no reciba lecturas.
+    while True:
+        await asyncio.sleep(interval)
+        for backend in backends:
+            backend.poll()
@@ -0,0 +1,507 @@
+import asyncio
+import contextlib
+import gzip
+import json
+import os
+import shutil
+import struct
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple, Type
+
+from pydantic import BaseModel
+
+from operations.records import CompactRecord, record_class
+from utils.files import FileLock
+from utils.metrics import timed
+
+HISTORY_SEGMENT_ROWS = int(os.getenv("HISTORY_SEGMENT_ROWS", "50000"))
+# Días que un segmento cerrado sigue en línea; 0 = sin archivado.
+HISTORY_RETENTION_DAYS = float(os.getenv("HISTORY_RETENTION_DAYS", "0"))
+
+# Entrada del índice de un segmento: id, momento del borrado, offset en el .jsonl.
+INDEX_ENTRY = struct.Struct("<qdQ")
+# Entrada de una lápida: segmento, posición dentro del segmento.
+TOMBSTONE = struct.Struct("<II")
+
+Entry = Tuple[float, CompactRecord]
+
+
+# ------------------------ SEGMENTOS ------------------------
+
+class Segment:
+    """Un tramo del historial: ``NNNNNN.jsonl`` con las filas y ``NNNNNN.idx``.
+
+    El índice vive en memoria en tres ``array`` paralelos (24 bytes por
+    borrado); las filas solo se leen del disco al mostrarlas o restaurarlas.
+    """
+
+    def __init__(self, directory: str, number: int):
+        self.number = number
+        self.data_path = os.path.join(directory, f"{number:06d}.jsonl")
+        self.index_path = os.path.join(directory, f"{number:06d}.idx")
+        self.ids = array("q")
+        self.times = array("d")
+        self.offsets = array("Q")
+        self.size = 0
+        self.dead: List[int] = []
+        self.sealed = False
+        self._by_id: Optional[Dict[int, List[int]]] = None
+        self._sorted: Optional[Tuple[array, array]] = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def load(self) -> None:
+        try:
+            with open(self.index_path, mode="rb") as f:
+                raw = f.read()
+        except FileNotFoundError:
+            raw = b""
+        raw = raw[:len(raw) - len(raw) % INDEX_ENTRY.size]
+        if not os.path.exists(self.data_path):
+            open(self.data_path, mode="ab").close()
+        for row_id, deleted_at, offset in INDEX_ENTRY.iter_unpack(raw):
+            self.ids.append(row_id)
+            self.times.append(deleted_at)
+            self.offsets.append(offset)
+        self.size = os.path.getsize(self.data_path)
+        if not self._consistent():
+            self._rebuild()
+
+    def _consistent(self) -> bool:
+        # El índice cuadra si su última entrada apunta a la última línea completa.
+        if not self.offsets:
+            return self.size == 0
+        with open(self.data_path, mode="rb") as f:
+            f.seek(self.offsets[-1])
+            line = f.readline()
+            return line.endswith(b"\n") and f.tell() == self.size
+
+    @timed("history.rebuild_segment")
+    def _rebuild(self) -> None:
+        """Reconstruye el índice a partir del .jsonl (tras una caída a medio anexar)."""
+        self.ids, self.times, self.offsets = array("q"), array("d"), array("Q")
+        valid_size = 0
+        with open(self.data_path, mode="rb") as f:
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break
+                entry = json.loads(raw)
+                self.ids.append(entry["row"]["id"])
+                self.times.append(entry["deleted_at"])
+                self.offsets.append(valid_size)
+                valid_size += len(raw)
+        with open(self.data_path, mode="rb+") as f:
+            f.truncate(valid_size)
+        self.size = valid_size
+        with open(self.index_path, mode="wb") as f:
+            for entry in zip(self.ids, self.times, self.offsets):
+                f.write(INDEX_ENTRY.pack(*entry))
+
+    def extend(self) -> None:
+        """Lee las entradas que otro proceso añadió al índice (sin reconstruir nada)."""
+        known = len(self.ids) * INDEX_ENTRY.size
+        try:
+            if os.path.getsize(self.index_path) < known + INDEX_ENTRY.size:
+                return
+            with open(self.index_path, mode="rb") as f:
+                f.seek(known)
+                raw = f.read()
+        except FileNotFoundError:
+            return
+        raw = raw[:len(raw) - len(raw) % INDEX_ENTRY.size]
+        for row_id, deleted_at, offset in INDEX_ENTRY.iter_unpack(raw):
+            if self._by_id is not None:
+                self._by_id.setdefault(row_id, []).append(len(self.ids))
+            self.ids.append(row_id)
+            self.times.append(deleted_at)
+            self.offsets.append(offset)
+        self.size = os.path.getsize(self.data_path)
+
+    def append(self, entries: List[Tuple[float, dict]]) -> None:
+        lines, index = [], []
+        offset = self.size
+        for deleted_at, row in entries:
+            line = json.dumps({"deleted_at": deleted_at, "row": row}, separators=(",", ":")).encode("utf-8") + b"\n"
+            lines.append(line)
+            index.append(INDEX_ENTRY.pack(row["id"], deleted_at, offset))
+            offset += len(line)
+        with open(self.data_path, mode="ab") as f:
+            f.write(b"".join(lines))
+        with open(self.index_path, mode="ab") as f:
+            f.write(b"".join(index))
+        for (deleted_at, row), line in zip(entries, lines):
+            position = len(self.ids)
+            self.ids.append(row["id"])
+            self.times.append(deleted_at)
+            self.offsets.append(self.size)
+            self.size += len(line)
+            if self._by_id is not None:
+                self._by_id.setdefault(row["id"], []).append(position)
+
+    # ------------------------ BUSQUEDAS ------------------------
+
+    def positions_of(self, row_id: int) -> List[int]:
+        if not self.sealed:
+            # Segmento abierto: diccionario id -> posiciones, acotado a HISTORY_SEGMENT_ROWS.
+            if self._by_id is None:
+                self._by_id = {}
+                for position, value in enumerate(self.ids):
+                    self._by_id.setdefault(value, []).append(position)
+            return self._by_id.get(row_id, [])
+        if self._sorted is None:
+            # Segmento cerrado: ids ordenados + posición, construidos en la primera búsqueda.
+            order = sorted(range(len(self.ids)), key=self.ids.__getitem__)
+            self._sorted = (array("q", (self.ids[position] for position in order)), array("I", order))
+        ids, positions = self._sorted
+        start, stop = bisect_left(ids, row_id), bisect_right(ids, row_id)
+        return sorted(positions[start:stop])
+
+    def seal(self) -> None:
+        self.sealed = True
+        self._by_id = None
+
+    def is_dead(self, position: int) -> bool:
+        slot = bisect_left(self.dead, position)
+        return slot < len(self.dead) and self.dead[slot] == position
+
+    def live_between(self, start: int, stop: int) -> int:
+        return (stop - start) - (bisect_left(self.dead, stop) - bisect_left(self.dead, start))
+
+    def bounds(self, since: Optional[float], until: Optional[float]) -> Tuple[int, int]:
+        start = 0 if since is None else bisect_left(self.times, since)
+        stop = len(self.ids) if until is None else bisect_right(self.times, until)
+        return start, max(start, stop)
+
+    def read(self, positions: List[int]) -> List[Tuple[float, dict]]:
+        entries = []
+        with open(self.data_path, mode="rb") as f:
+            for position in positions:
+                f.seek(self.offsets[position])
+                entry = json.loads(f.readline())
+                entries.append((entry["deleted_at"], entry["row"]))
+        return entries
+
+
+# ------------------------ HISTORIAL ------------------------
+
+class HistoryStore:
+    """Historial de borrados en segmentos ordenados por tiempo.
+
+    - Anexar escribe al final del segmento abierto; al llegar a
+      ``segment_rows`` filas se abre uno nuevo.
+    - Consultas paginadas y por rango de fechas: búsqueda binaria sobre los
+      tiempos de cada segmento y lectura solo de las filas de la página.
+    - Restaurar no reescribe nada: la entrada se marca con una lápida en
+      ``tombstones.idx``.
+    - ``maintain`` archiva (gzip en ``archive/``) los segmentos cerrados más
+      antiguos que ``retention_days``.
+
+    Los métodos son síncronos (E/S de disco): se llaman con ``asyncio.to_thread``.
+
+    Con ``shared=True`` (varios workers) las escrituras toman un cerrojo de
+    archivo y cada operación lee antes lo que otros procesos añadieron a
+    los índices y a las lápidas (los archivos solo crecen).
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        model: Type[BaseModel],
+        legacy_csv: Optional[str] = None,
+        legacy_loader: Optional[Callable[[str], List[BaseModel]]] = None,
+        segment_rows: int = HISTORY_SEGMENT_ROWS,
+        retention_days: float = HISTORY_RETENTION_DAYS,
+        shared: bool = False,
+    ):
+        self.directory = directory
+        self.archive_directory = os.path.join(directory, "archive")
+        self.tombstones_path = os.path.join(directory, "tombstones.idx")
+        self.record = record_class(model)
+        self.legacy_csv = legacy_csv
+        self.legacy_loader = legacy_loader
+        self.segment_rows = segment_rows
+        self.retention_days = retention_days
+        self.segments: List[Segment] = []
+        self.lock = threading.RLock()
+        self.opened = False
+        self.tombstones_size = 0
+        self.file_lock = FileLock(os.path.join(directory, "write.lock")) if shared else None
+        self.restore_lock = FileLock(os.path.join(directory, "restore.lock")) if shared else None
+
+    # ------------------------ APERTURA ------------------------
+
+    @timed("history.open")
+    def open(self) -> None:
+        with self.lock:
+            if self.opened:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            with self._exclusive():
+                self._open()
+
+    def _open(self) -> None:
+        numbers = {
+            int(stem) for stem, extension in map(os.path.splitext, os.listdir(self.directory))
+            if extension in (".jsonl", ".idx") and stem.isdigit()
+        }
+        for number in sorted(numbers):
+            segment = Segment(self.directory, number)
+            segment.load()
+            self.segments.append(segment)
+        for segment in self.segments[:-1]:
+            segment.seal()
+        by_number = {segment.number: segment for segment in self.segments}
+        try:
+            with open(self.tombstones_path, mode="rb") as f:
+                raw = f.read()
+        except FileNotFoundError:
+            raw = b""
+        raw = raw[:len(raw) - len(raw) % TOMBSTONE.size]
+        self.tombstones_size = len(raw)
+        for number, position in TOMBSTONE.iter_unpack(raw):
+            segment = by_number.get(number)
+            if segment is not None and not segment.is_dead(position):
+                insort(segment.dead, position)
+        self.opened = True
+        if not self.segments and self.legacy_csv and os.path.exists(self.legacy_csv):
+            self._import_legacy()
+
+    def _import_legacy(self) -> None:
+        # El CSV de borrados anterior se importa una vez, con la fecha del archivo.
+        deleted_at = os.path.getmtime(self.legacy_csv)
+        rows = self.legacy_loader(self.legacy_csv)
+        for start in range(0, len(rows), self.segment_rows):
+            self._append([(deleted_at, row.dict()) for row in rows[start:start + self.segment_rows]])
+
+    def ensure_open(self) -> None:
+        if not self.opened:
+            self.open()
+        elif self.file_lock is not None:
+            self._refresh()
+
+    # ------------------------ VARIOS PROCESOS ------------------------
+
+    def _exclusive(self):
+        return self.file_lock.held() if self.file_lock is not None else contextlib.nullcontext()
+
+    @contextlib.contextmanager
+    def _writing(self) -> Iterator[None]:
+        with self.lock:
+            self.ensure_open()
+            if self.file_lock is None:
+                yield
+                return
+            with self.file_lock.held():
+                self._refresh()
+                yield
+
+    def _refresh(self) -> None:
+        """Incorpora lo que otros workers archivaron, anexaron o restauraron."""
+        while self.segments and not os.path.exists(self.segments[0].index_path):
+            self.segments.pop(0)
+        if self.segments:
+            self.segments[-1].extend()
+        number = self.segments[-1].number + 1 if self.segments else 1
+        while os.path.exists(os.path.join(self.directory, f"{number:06d}.idx")):
+            if self.segments:
+                self.segments[-1].seal()
+            segment = Segment(self.directory, number)
+            segment.extend()
+            self.segments.append(segment)
+            number += 1
+        try:
+            if os.path.getsize(self.tombstones_path) < self.tombstones_size + TOMBSTONE.size:
+                return
+            with open(self.tombstones_path, mode="rb") as f:
+                f.seek(self.tombstones_size)
+                raw = f.read()
+        except FileNotFoundError:
+            return
+        raw = raw[:len(raw) - len(raw) % TOMBSTONE.size]
+        self.tombstones_size += len(raw)
+        by_number = {segment.number: segment for segment in self.segments}
+        for number, position in TOMBSTONE.iter_unpack(raw):
+            segment = by_number.get(number)
+            if segment is not None and not segment.is_dead(position):
+                insort(segment.dead, position)
+
+    @contextlib.asynccontextmanager
+    async def restoring(self) -> AsyncIterator[None]:
+        """Serializa las restauraciones entre workers: un borrado no se restaura dos veces."""
+        if self.restore_lock is None:
+            yield
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        async with self.restore_lock.hold():
+            yield
+
+    # ------------------------ ESCRITURA ------------------------
+
+    def _active(self) -> Segment:
+        if not self.segments or len(self.segments[-1]) >= self.segment_rows:
+            if self.segments:
+                self.segments[-1].seal()
+            number = self.segments[-1].number + 1 if self.segments else 1
+            self.segments.append(Segment(self.directory, number))
+        return self.segments[-1]
+
+    def _append(self, entries: List[Tuple[float, dict]]) -> None:
+        while entries:
+            segment = self._active()
+            room = self.segment_rows - len(segment)
+            segment.append(entries[:room])
+            entries = entries[room:]
+
+    @timed("history.append")
+    def append(self, rows: List[CompactRecord]) -> None:
+        if not rows:
+            return
+        with self._writing():
+            # Tiempos no decrecientes aunque el reloj retroceda: los segmentos siguen ordenados.
+            last = next((segment.times[-1] for segment in reversed(self.segments) if len(segment)), 0.0)
+            deleted_at = max(time.time(), last)
+            self._append([(deleted_at, row.dict()) for row in rows])
+
+    # ------------------------ RESTAURACION ------------------------
+
+    def latest(self, row_id: int) -> Optional[Tuple[Tuple[int, int], CompactRecord]]:
+        """Último borrado aún no restaurado de ``row_id``: ((segmento, posición), fila)."""
+        with self.lock:
+            self.ensure_open()
+            for segment in reversed(self.segments):
+                for position in reversed(segment.positions_of(row_id)):
+                    if not segment.is_dead(position):
+                        _, row = segment.read([position])[0]
+                        return (segment.number, position), self.record(**row)
+            return None
+
+    @timed("history.tombstone")
+    def tombstone(self, location: Tuple[int, int]) -> None:
+        number, position = location
+        with self._writing():
+            with open(self.tombstones_path, mode="ab") as f:
+                f.write(TOMBSTONE.pack(number, position))
+            self.tombstones_size += TOMBSTONE.size
+            for segment in self.segments:
+                if segment.number == number and not segment.is_dead(position):
+                    insort(segment.dead, position)
+
+    # ------------------------ CONSULTAS ------------------------
+
+    def count(self, since: Optional[float] = None, until: Optional[float] = None) -> int:
+        with self.lock:
+            self.ensure_open()
+            return sum(segment.live_between(*segment.bounds(since, until)) for segment in self.segments)
+
+    @timed("history.page")
+    def page(
+        self,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        newest_first: bool = True,
+    ) -> List[Entry]:
+        """Borrados vivos entre ``since`` y ``until`` (timestamps), saltando ``offset``."""
+        with self.lock:
+            self.ensure_open()
+            entries: List[Entry] = []
+            skip = offset
+            segments = reversed(self.segments) if newest_first else iter(self.segments)
+            for segment in segments:
+                if limit is not None and len(entries) >= limit:
+                    break
+                start, stop = segment.bounds(since, until)
+                live = segment.live_between(start, stop)
+                if skip >= live:
+                    # El segmento entero queda antes de la página: no se lee.
+                    skip -= live
+                    continue
+                wanted = None if limit is None else limit - len(entries)
+                ordered = range(stop - 1, start - 1, -1) if newest_first else range(start, stop)
+                if not segment.dead:
+                    ordered = ordered[skip:] if wanted is None else ordered[skip:skip + wanted]
+                    skip = 0
+                positions = []
+                for position in ordered:
+                    if segment.dead and segment.is_dead(position):
+                        continue
+                    if skip:
+                        skip -= 1
+                        continue
+                    positions.append(position)
+                    if wanted is not None and len(positions) == wanted:
+                        break
+                entries.extend((deleted_at, self.record(**row)) for deleted_at, row in segment.read(positions))
+            return entries
+
+    def iter_rows(
+        self,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ) -> Iterator[CompactRecord]:
+        """Las mismas filas que ``page(..., newest_first=False)``, leídas en flujo (exportaciones)."""
+        with self.lock:
+            self.ensure_open()
+            segments = list(self.segments)
+        skip, remaining = offset, limit
+        for segment in segments:
+            if remaining == 0:
+                return
+            with self.lock:
+                start, stop = segment.bounds(since, until)
+                live = segment.live_between(start, stop)
+                dead = set(segment.dead)
+                first = segment.offsets[start] if start < stop else 0
+            if skip >= live:
+                skip -= live
+                continue
+            try:
+                with open(segment.data_path, mode="rb") as f:
+                    f.seek(first)
+                    for position in range(start, stop):
+                        line = f.readline()
+                        if position in dead:
+                            continue
+                        if skip:
+                            skip -= 1
+                            continue
+                        yield self.record(**json.loads(line)["row"])
+                        if remaining is not None:
+                            remaining -= 1
+                            if remaining == 0:
+                                return
+            except FileNotFoundError:
+                # Archivado mientras se recorría.
+                continue
+
+    # ------------------------ RETENCION ------------------------
+
+    @timed("history.archive")
+    def archive(self, now: Optional[float] = None) -> List[int]:
+        """Comprime en ``archive/`` los segmentos cerrados más viejos que la retención."""
+        if self.retention_days <= 0:
+            return []
+        cutoff = (now or time.time()) - self.retention_days * 86400
+        archived = []
+        with self._writing():
+            while len(self.segments) > 1 and self.segments[0].sealed and self.segments[0].times[-1] < cutoff:
+                segment = self.segments.pop(0)
+                os.makedirs(self.archive_directory, exist_ok=True)
+                target = os.path.join(self.archive_directory, os.path.basename(segment.data_path) + ".gz")
+                with open(segment.data_path, mode="rb") as source, gzip.open(target, mode="wb") as compressed:
+                    shutil.copyfileobj(source, compressed)
+                os.remove(segment.data_path)
+                os.remove(segment.index_path)
+                archived.append(segment.number)
+        return archived
+
+    async def maintain(self) -> None:
+        if self.retention_days > 0:
+            await asyncio.to_thread(self.archive)
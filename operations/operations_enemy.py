@@ -1,43 +1,41 @@
+import asyncio
 import csv
-from typing import List, Optional
+import os
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
 from models import Enemy, EnemyWithID
-
-ENEMY_CSV = "data/enemies.csv"
-DELETED_ENEMY_CSV = "data/deleted_enemies.csv"
+from operations.analytics import ColumnarTable
+from operations.backends import SHARED_DATA, select_backend
+from operations.history import HistoryStore
+from operations.records import record_class
+from operations.repository import Repository
+from operations.snapshot import table_files
+from operations.stats import enemy_stats
+from utils.feed import tag_changes
+from utils.metrics import timed
+
+DATA_DIR = os.getenv("DATA_DIR", "Data")
+ENEMY_CSV = os.path.join(DATA_DIR, "enemies.csv")
+DELETED_ENEMY_CSV = os.path.join(DATA_DIR, "deleted_enemies.csv")
+ENEMY_LOG = os.path.join(DATA_DIR, "enemies.log")
+ENEMY_SNAPSHOT = os.path.join(DATA_DIR, "enemies.snap")
+ENEMY_HISTORY_DIR = os.path.join(DATA_DIR, "history", "enemies")
 ENEMY_FIELDS = ["id", "name", "speed", "jump", "hit_speed", "health", "type", "spawn", "probability_spawn"]
 
 # -----------------------------------------
 # FUNCIONES AUXILIARES
 # -----------------------------------------
 
-def write_enemies_to_csv(enemies: List[EnemyWithID]):
-    with open(ENEMY_CSV, mode="w", newline="") as csvfile:
+@timed("write_enemies_to_csv")
+def write_enemies_to_csv(enemies: List[EnemyWithID], file_path: str = ENEMY_CSV):
+    with open(file_path, mode="w", newline="") as csvfile:
         writer = csv.DictWriter(csvfile, fieldnames=ENEMY_FIELDS)
         writer.writeheader()
         for enemy in enemies:
             writer.writerow(enemy.dict())
 
-def append_to_deleted_enemies(enemy: EnemyWithID):
-    try:
-        with open(DELETED_ENEMY_CSV, mode="a", newline="") as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=ENEMY_FIELDS)
-            if csvfile.tell() == 0:
-                writer.writeheader()
-            writer.writerow(enemy.dict())
-    except Exception as e:
-        print(f"Error writing to deleted_enemies.csv: {e}")
-
-
-
-
-# -----------------------------------------
-# LECTURAS
-# -----------------------------------------
-
-def read_all_enemies() -> List[EnemyWithID]:
-    enemies = []
+def iter_enemies_from_csv(file_path: str = ENEMY_CSV) -> Iterator[EnemyWithID]:
     try:
-        with open(ENEMY_CSV, mode="r", newline="") as csvfile:
+        with open(file_path, mode="r", newline="") as csvfile:
             reader = csv.DictReader(csvfile)
             for row in reader:
                 row['id'] = int(row['id'])
@@ -49,82 +47,139 @@ def read_all_enemies() -> List[EnemyWithID]:
                 row['spawn'] = float(row['spawn'])
                 row['probability_spawn'] = float(row['probability_spawn'])
                 row['type'] = row.get('type', 'unknown')
-                enemies.append(EnemyWithID(**row))
+                yield EnemyWithID(**row)
     except FileNotFoundError:
-        pass
-    return enemies
+        return
 
-def read_deleted_enemies() -> List[EnemyWithID]:
-    enemies = []
-    try:
-        with open(DELETED_ENEMY_CSV, mode="r", newline="") as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                row['id'] = int(row['id'])
-                row['name'] = row.get('name', 'SinNombre')
-                row['speed'] = float(row['speed'])
-                row['jump'] = float(row['jump'])
-                row['hit_speed'] = int(row['hit_speed'])
-                row['health'] = int(row['health'])
-                row['spawn'] = float(row['spawn'])
-                row['probability_spawn'] = float(row['probability_spawn'])
-                row['type'] = row.get('type', 'unknown')
-                enemies.append(EnemyWithID(**row))
-    except FileNotFoundError:
-        pass
-    return enemies
+@timed("read_enemies_from_csv")
+def read_enemies_from_csv(file_path: str = ENEMY_CSV) -> List[EnemyWithID]:
+    return list(iter_enemies_from_csv(file_path))
+
+# -----------------------------------------
+# REPOSITORIO
+# -----------------------------------------
 
-async def read_one_enemy(enemy_id: int) -> Optional[EnemyWithID]:
-    enemies = await read_all_enemies()
-    for enemy in enemies:
-        if enemy.id == enemy_id:
-            return enemy
-    return None
+# En memoria las filas son registros compactos; main.py las convierte a
+# EnemyWithID al responder (response_model).
+EnemyRecord = record_class(EnemyWithID)
+
+enemies_repository = Repository(
+    EnemyWithID,
+    **table_files(EnemyWithID, ENEMY_CSV, ENEMY_SNAPSHOT, read_enemies_from_csv, write_enemies_to_csv),
+    log_path=ENEMY_LOG,
+    indexes=("name", "type"),
+    sorted_indexes=("health", "speed", "hit_speed", "spawn", "probability_spawn"),
+    shared=SHARED_DATA,
+)
+
+# Backend activo (CSV o SQL según STORAGE_BACKEND); el historial va aparte.
+enemies_storage = select_backend(enemies_repository, "modelos.enemy_sql.EnemyModel")
+enemies_analytics = ColumnarTable(enemies_storage, EnemyWithID)
+enemies_storage.subscribe(enemies_analytics)
+enemies_storage.subscribe(enemy_stats)
+
+# Historial de borrados segmentado (Data/history/enemies); el antiguo
+# deleted_enemies.csv se importa la primera vez que se abre.
+enemies_history = HistoryStore(ENEMY_HISTORY_DIR, EnemyWithID, DELETED_ENEMY_CSV, read_enemies_from_csv, shared=SHARED_DATA)
+deleted_enemies_lock = asyncio.Lock()
+
+async def archive_enemies(enemies: List[EnemyRecord]):
+    # Se llama dentro de la escritura de la tabla, antes de confirmar el borrado:
+    # una caída nunca deja un borrado sin historial. Sin deleted_enemies_lock,
+    # que la restauración toma antes que la tabla.
+    await asyncio.to_thread(enemies_history.append, enemies)
+
+# -----------------------------------------
+# LECTURAS
+# -----------------------------------------
+
+async def read_all_enemies() -> List[EnemyRecord]:
+    return await enemies_storage.all()
+
+async def read_deleted_enemies(
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    offset: int = 0,
+    limit: Optional[int] = None,
+) -> List[EnemyRecord]:
+    """Enemigos borrados, del más antiguo al más reciente."""
+    entries = await asyncio.to_thread(enemies_history.page, offset, limit, since, until, False)
+    return [row for _, row in entries]
+
+async def read_deleted_enemies_page(
+    offset: int, limit: int, since: Optional[float] = None, until: Optional[float] = None
+) -> Tuple[List[Tuple[float, EnemyRecord]], int]:
+    """Página del historial (más recientes primero) y total de borrados en el rango."""
+    def read():
+        return enemies_history.page(offset, limit, since, until), enemies_history.count(since, until)
+    return await asyncio.to_thread(read)
+
+def iter_all_enemies() -> AsyncIterator[EnemyRecord]:
+    return enemies_storage.iterate()
+
+def iter_deleted_enemies(
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    offset: int = 0,
+    limit: Optional[int] = None,
+) -> Iterator[EnemyRecord]:
+    return enemies_history.iter_rows(since, until, offset, limit)
+
+async def read_one_enemy(enemy_id: int) -> Optional[EnemyRecord]:
+    return await enemies_storage.get(enemy_id)
+
+async def read_enemies_by_type(enemy_type: str) -> List[EnemyRecord]:
+    return await enemies_storage.find("type", enemy_type)
+
+async def query_enemies(
+    equals: Optional[Dict[str, Any]] = None,
+    ranges: Optional[Dict[str, Tuple[Any, Any]]] = None,
+    sort: str = "id",
+    descending: bool = False,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+) -> Tuple[List[EnemyRecord], Optional[str]]:
+    return await enemies_storage.query(equals, ranges, sort, descending, limit, cursor)
 
 # -----------------------------------------
 # CRUD PRINCIPALES
 # -----------------------------------------
 
-async def create_enemy(enemy: Enemy) -> EnemyWithID:
-    enemies = read_all_enemies()
-    new_id = max([e.id for e in enemies], default=0) + 1
-    enemy_with_id = EnemyWithID(id=new_id, **enemy.dict())
-    enemies.append(enemy_with_id)
-    write_enemies_to_csv(enemies)
-    return enemy_with_id
-
-async def update_enemy(enemy_id: int, enemy_update: dict) -> Optional[EnemyWithID]:
-    enemies = read_all_enemies()
-    updated_enemy = None
-    for enemy in enemies:
-        if enemy.id == enemy_id:
-            for key, value in enemy_update.items():
-                setattr(enemy, key, value)
-            updated_enemy = enemy
-            break
-    if updated_enemy:
-        write_enemies_to_csv(enemies)
-        return updated_enemy
-    return None
-
-async def delete_enemy(enemy_id: int) -> Optional[EnemyWithID]:
-    enemies = await read_all_enemies()
-    new_enemies = []
-    removed_enemy = None
-    for enemy in enemies:
-        if enemy.id == enemy_id:
-            removed_enemy = enemy
-        else:
-            new_enemies.append(enemy)
-    if removed_enemy:
-        await write_enemies_to_csv(new_enemies)
-        await append_to_deleted_enemies(removed_enemy)
-        return removed_enemy
-    return None
-
-async def delete_all_enemies() -> List[EnemyWithID]:
-    enemies = await read_all_enemies()
-    for enemy in enemies:
-        await append_to_deleted_enemies(enemy)
-    await write_enemies_to_csv([])
-    return enemies
+async def create_enemy(enemy: Enemy) -> EnemyRecord:
+    return await enemies_storage.insert(enemy.dict())
+
+async def update_enemy(enemy_id: int, enemy_update: dict) -> Optional[EnemyRecord]:
+    return await enemies_storage.update(enemy_id, enemy_update)
+
+async def delete_enemy(enemy_id: int) -> Optional[EnemyRecord]:
+    return await enemies_storage.delete(enemy_id, archive_enemies)
+
+async def delete_all_enemies() -> List[EnemyRecord]:
+    return await enemies_storage.clear(archive_enemies)
+
+# -----------------------------------------
+# OPERACIONES MASIVAS
+# -----------------------------------------
+
+async def create_enemies(enemies: List[Enemy]) -> List[EnemyRecord]:
+    return await enemies_storage.insert_many([enemy.dict() for enemy in enemies])
+
+async def update_enemies(updates: Dict[int, dict]) -> List[EnemyRecord]:
+    return await enemies_storage.update_many(updates)
+
+async def delete_enemies(enemy_ids: List[int]) -> List[EnemyRecord]:
+    return await enemies_storage.delete_many(enemy_ids, archive_enemies)
+
+async def restore_enemy(enemy_id: int) -> Optional[EnemyRecord]:
+    # Igual que restore_player: lápida sobre el último borrado del id.
+    async with deleted_enemies_lock, enemies_history.restoring():
+        found = await asyncio.to_thread(enemies_history.latest, enemy_id)
+        if found is None:
+            return None
+        location, to_restore = found
+        restored = await enemies_storage.get(to_restore.id)
+        if restored != to_restore:
+            with tag_changes("restore"):
+                restored = await enemies_storage.insert(to_restore.dict(exclude={"id"}), row_id=to_restore.id)
+        await asyncio.to_thread(enemies_history.tombstone, location)
+        return restored
@@ -1,11 +1,26 @@
+import asyncio
 import csv
-from typing import List, Optional
+import os
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
 from models import Player, PlayerWithID
+from operations.analytics import ColumnarTable
+from operations.backends import SHARED_DATA, select_backend
+from operations.history import HistoryStore
+from operations.records import record_class
+from operations.repository import Repository
+from operations.snapshot import table_files
+from operations.stats import player_stats
+from utils.feed import tag_changes
+from utils.metrics import timed
 
 # ------------------------ RUTAS Y CONSTANTES ------------------------
-CSV_FILE = "data/player.csv"
-DELETED_CSV_FILE = "data/deleted_player.csv"
-FIELDNAMES = ["id", "name", "health", "regenerate_health", "speed", "jump", "is_dead", "armor", "hit_speed"]
+DATA_DIR = os.getenv("DATA_DIR", "Data")
+CSV_FILE = os.path.join(DATA_DIR, "players.csv")
+DELETED_CSV_FILE = os.path.join(DATA_DIR, "deleted_players.csv")
+LOG_FILE = os.path.join(DATA_DIR, "players.log")
+SNAPSHOT_FILE = os.path.join(DATA_DIR, "players.snap")
+HISTORY_DIR = os.path.join(DATA_DIR, "history", "players")
+FIELDNAMES = ["id", "name", "health", "regenerate_health", "speed", "jump", "is_dead", "armor", "hit_speed", "image"]
 
 from fastapi import APIRouter
 
@@ -14,6 +29,7 @@ router = APIRouter()
 
 # ------------------------ FUNCIONES AUXILIARES ------------------------
 
+@timed("write_players_to_csv")
 def write_players_to_csv(players: List[PlayerWithID], file_path: str = CSV_FILE):
     with open(file_path, mode="w", newline="", encoding="utf-8") as f:
         writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
@@ -21,18 +37,10 @@ def write_players_to_csv(players: List[PlayerWithID], file_path: str = CSV_FILE)
         for player in players:
             writer.writerow(player.dict())
 
-def append_to_deleted_players(player: PlayerWithID):
-    try:
-        with open(DELETED_CSV_FILE, mode="a", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
-            if f.tell() == 0:
-                writer.writeheader()
-            writer.writerow(player.dict())
-    except Exception as e:
-        print(f"Error writing to deleted_players.csv: {e}")
+def parse_bool(value) -> bool:
+    return str(value).strip().lower() in ("1", "true", "yes")
 
-def read_players_from_csv(file_path: str = CSV_FILE) -> List[PlayerWithID]:
-    players = []
+def iter_players_from_csv(file_path: str = CSV_FILE) -> Iterator[PlayerWithID]:
     try:
         with open(file_path, mode="r", encoding="utf-8") as f:
             reader = csv.DictReader(f)
@@ -42,89 +50,154 @@ def read_players_from_csv(file_path: str = CSV_FILE) -> List[PlayerWithID]:
                 row["regenerate_health"] = int(row["regenerate_health"])
                 row["speed"] = float(row["speed"])
                 row["jump"] = float(row["jump"])
-                row["is_dead"] = int(row["is_dead"])
+                row["is_dead"] = parse_bool(row["is_dead"])
                 row["armor"] = int(row["armor"])
                 row["hit_speed"] = int(row["hit_speed"])
-                players.append(PlayerWithID(**row))
+                # Archivos anteriores a la columna ``image`` no la traen en la
+                # cabecera; las filas anexadas después la llevan como sobrante.
+                extra = row.pop(None, None)
+                row["image"] = row.get("image") or (extra[0] if extra else None) or None
+                yield PlayerWithID(**row)
     except FileNotFoundError:
-        pass
-    return players
+        return
 
-def read_deleted_players() -> List[PlayerWithID]:
-    return read_players_from_csv(DELETED_CSV_FILE)
+@timed("read_players_from_csv")
+def read_players_from_csv(file_path: str = CSV_FILE) -> List[PlayerWithID]:
+    return list(iter_players_from_csv(file_path))
+
+# ------------------------ REPOSITORIOS ------------------------
+
+# En memoria las filas son registros compactos; main.py las convierte a
+# PlayerWithID al responder (response_model).
+PlayerRecord = record_class(PlayerWithID)
+
+players_repository = Repository(
+    PlayerWithID,
+    **table_files(PlayerWithID, CSV_FILE, SNAPSHOT_FILE, read_players_from_csv, write_players_to_csv),
+    log_path=LOG_FILE,
+    indexes=("name", "is_dead"),
+    sorted_indexes=("health", "armor", "speed", "jump", "hit_speed"),
+    shared=SHARED_DATA,
+)
+
+# Historial de borrados segmentado (Data/history/players); el antiguo
+# deleted_players.csv se importa la primera vez que se abre.
+players_history = HistoryStore(HISTORY_DIR, PlayerWithID, DELETED_CSV_FILE, read_players_from_csv, shared=SHARED_DATA)
+deleted_players_lock = asyncio.Lock()
+
+async def archive_players(players: List[PlayerRecord]):
+    # Se llama dentro de la escritura de la tabla, antes de confirmar el borrado:
+    # una caída nunca deja un borrado sin historial. Sin deleted_players_lock,
+    # que la restauración toma antes que la tabla.
+    await asyncio.to_thread(players_history.append, players)
+
+# Backend activo (CSV o SQL según STORAGE_BACKEND); el historial va aparte.
+players_storage = select_backend(players_repository, "modelos.player_sql.PlayerModel")
+players_analytics = ColumnarTable(players_storage, PlayerWithID)
+players_storage.subscribe(players_analytics)
+players_storage.subscribe(player_stats)
+
+# Los jugadores temporales solo viven en memoria: no tienen archivo asociado.
+temporary_players_repository = Repository(PlayerWithID)
 
 # ------------------------ CRUD PRINCIPALES ------------------------
 
-async def get_all_players() -> List[PlayerWithID]:
-    return read_players_from_csv()
-
-async def get_deleted_players() -> List[PlayerWithID]:
-    return read_deleted_players()
-
-async def get_player(player_id: int) -> Optional[PlayerWithID]:
-    players = read_players_from_csv()
-    for player in players:
-        if player.id == player_id:
-            return player
-    return None
-
-async def create_player(player: Player) -> PlayerWithID:
-    players = read_players_from_csv()
-    new_id = max((p.id for p in players), default=0) + 1
-    player_with_id = PlayerWithID(id=new_id, **player.dict())
-    players.append(player_with_id)
-    write_players_to_csv(players)
-    return player_with_id
-
-async def update_player(player_id: int, updated_data: dict) -> Optional[PlayerWithID]:
-    players = read_players_from_csv()
-    updated_player = None
-    for i, player in enumerate(players):
-        if player.id == player_id:
-            for key, value in updated_data.items():
-                setattr(player, key, value)
-            updated_player = player
-            break
-    if updated_player:
-        write_players_to_csv(players)
-        return updated_player
-    return None
-
-async def delete_player(player_id: int) -> Optional[PlayerWithID]:
-    players = read_players_from_csv()
-    new_players = []
-    removed_player = None
-    for player in players:
-        if player.id == player_id:
-            removed_player = player
-        else:
-            new_players.append(player)
-    if removed_player:
-        write_players_to_csv(new_players)
-        append_to_deleted_players(removed_player)
-        return removed_player
-    return None
-
-async def delete_all_players() -> List[PlayerWithID]:
-    players = read_players_from_csv()
-    for player in players:
-        append_to_deleted_players(player)
-    write_players_to_csv([])
-    return players
-
-async def restore_player(player_id: int) -> Optional[PlayerWithID]:
-    deleted_players = read_deleted_players()
-    to_restore = None
-    remaining = []
-    for player in deleted_players:
-        if player.id == player_id:
-            to_restore = player
-        else:
-            remaining.append(player)
-    if to_restore:
-        current_players = read_players_from_csv()
-        current_players.append(to_restore)
-        write_players_to_csv(current_players)
-        write_players_to_csv(remaining, DELETED_CSV_FILE)
-        return to_restore
-    return None
+async def get_all_players() -> List[PlayerRecord]:
+    return await players_storage.all()
+
+async def get_deleted_players(
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    offset: int = 0,
+    limit: Optional[int] = None,
+) -> List[PlayerRecord]:
+    """Jugadores borrados, del más antiguo al más reciente."""
+    entries = await asyncio.to_thread(players_history.page, offset, limit, since, until, False)
+    return [row for _, row in entries]
+
+async def get_deleted_players_page(
+    offset: int, limit: int, since: Optional[float] = None, until: Optional[float] = None
+) -> Tuple[List[Tuple[float, PlayerRecord]], int]:
+    """Página del historial (más recientes primero) y total de borrados en el rango."""
+    def read():
+        return players_history.page(offset, limit, since, until), players_history.count(since, until)
+    return await asyncio.to_thread(read)
+
+def iter_all_players() -> AsyncIterator[PlayerRecord]:
+    return players_storage.iterate()
+
+def iter_deleted_players(
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    offset: int = 0,
+    limit: Optional[int] = None,
+) -> Iterator[PlayerRecord]:
+    return players_history.iter_rows(since, until, offset, limit)
+
+async def get_player(player_id: int) -> Optional[PlayerRecord]:
+    return await players_storage.get(player_id)
+
+async def get_players_by_name(name: str) -> List[PlayerRecord]:
+    return await players_storage.find("name", name)
+
+async def query_players(
+    equals: Optional[Dict[str, Any]] = None,
+    ranges: Optional[Dict[str, Tuple[Any, Any]]] = None,
+    sort: str = "id",
+    descending: bool = False,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+) -> Tuple[List[PlayerRecord], Optional[str]]:
+    return await players_storage.query(equals, ranges, sort, descending, limit, cursor)
+
+async def create_player(player: Player) -> PlayerRecord:
+    return await players_storage.insert(player.dict())
+
+async def update_player(player_id: int, updated_data: dict) -> Optional[PlayerRecord]:
+    return await players_storage.update(player_id, updated_data)
+
+async def revive_player(player_id: int) -> Optional[PlayerRecord]:
+    return await players_storage.update(player_id, {"is_dead": False})
+
+async def delete_player(player_id: int) -> Optional[PlayerRecord]:
+    return await players_storage.delete(player_id, archive_players)
+
+async def delete_all_players() -> List[PlayerRecord]:
+    return await players_storage.clear(archive_players)
+
+# ------------------------ OPERACIONES MASIVAS ------------------------
+
+async def create_players(players: List[Player]) -> List[PlayerRecord]:
+    return await players_storage.insert_many([player.dict() for player in players])
+
+async def update_players(updates: Dict[int, dict]) -> List[PlayerRecord]:
+    return await players_storage.update_many(updates)
+
+async def delete_players(player_ids: List[int]) -> List[PlayerRecord]:
+    return await players_storage.delete_many(player_ids, archive_players)
+
+async def restore_player(player_id: int) -> Optional[PlayerRecord]:
+    # Se busca el último borrado del id y se marca con una lápida: el
+    # historial no se reescribe.
+    async with deleted_players_lock, players_history.restoring():
+        found = await asyncio.to_thread(players_history.latest, player_id)
+        if found is None:
+            return None
+        location, to_restore = found
+        restored = await players_storage.get(to_restore.id)
+        if restored != to_restore:
+            with tag_changes("restore"):
+                restored = await players_storage.insert(to_restore.dict(exclude={"id"}), row_id=to_restore.id)
+        # Si la fila ya estaba viva e idéntica, una restauración anterior se
+        # interrumpió antes de la lápida (o el borrado antes de confirmarse):
+        # solo falta la lápida y no se duplica la fila.
+        await asyncio.to_thread(players_history.tombstone, location)
+        return restored
+
+# ------------------------ JUGADORES TEMPORALES ------------------------
+
+async def create_temporary_player(player: Player) -> PlayerRecord:
+    return await temporary_players_repository.insert(player.dict())
+
+async def read_all_temporary_players() -> List[PlayerRecord]:
+    return temporary_players_repository.all()
@@ -0,0 +1,61 @@
+import dataclasses
+import sys
+from typing import Any, Dict, Iterable, Tuple, Type
+
+from pydantic import BaseModel
+
+
+# ------------------------ REGISTROS COMPACTOS ------------------------
+
+class CompactRecord:
+    """Fila en memoria: dataclass con ``__slots__`` generada a partir del modelo.
+
+    No tiene ``__dict__`` ni el estado de validación de Pydantic, así que
+    una fila ocupa poco más que sus valores. Los valores se validan con el
+    modelo Pydantic antes de guardarse; en el borde de la API se vuelve al
+    modelo (``to_model`` o ``response_model`` de FastAPI).
+    """
+
+    __slots__ = ()
+    model: Type[BaseModel]
+    fields: Tuple[str, ...] = ()
+
+    @classmethod
+    def from_model(cls, row: BaseModel) -> "CompactRecord":
+        # Las cadenas se internan: ``type`` o ``name`` repetidos comparten objeto.
+        values = row.__dict__
+        return cls(**{name: sys.intern(value) if type(value) is str else value for name, value in values.items()})
+
+    def dict(self, exclude: Iterable[str] = ()) -> Dict[str, Any]:
+        """Misma forma que ``BaseModel.dict()`` (mismo orden de campos)."""
+        if exclude:
+            return {name: getattr(self, name) for name in self.fields if name not in exclude}
+        return {name: getattr(self, name) for name in self.fields}
+
+    def to_model(self) -> BaseModel:
+        return self.model.model_validate(self.dict())
+
+
+_record_classes: Dict[Type[BaseModel], Type[CompactRecord]] = {}
+
+
+def record_class(model: Type[BaseModel]) -> Type[CompactRecord]:
+    """Clase de registro compacto de ``model`` (una por modelo)."""
+    cls = _record_classes.get(model)
+    if cls is not None:
+        return cls
+    # Los campos con valor por defecto van al final, como exige dataclasses.
+    required = [(name, info.annotation) for name, info in model.model_fields.items() if info.is_required()]
+    optional = [
+        (name, info.annotation, dataclasses.field(default=info.default))
+        for name, info in model.model_fields.items()
+        if not info.is_required()
+    ]
+    name = model.__name__.replace("WithID", "") + "Record"
+    cls = dataclasses.make_dataclass(
+        name, required + optional, bases=(CompactRecord,), slots=True, repr=True, eq=True,
+        namespace={"model": model, "fields": tuple(model.model_fields)},
+    )
+    cls.__module__ = __name__
+    _record_classes[model] = cls
+    return cls
@@ -0,0 +1,550 @@
+import asyncio
+import base64
+import contextlib
+import copy
+import json
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, MutableMapping, Optional, Set, Tuple, Type
+
+from pydantic import BaseModel
+
+from operations.records import CompactRecord, record_class
+from operations.snapshot import SnapshotRows
+from operations.wal import MutationLog, clear_record, delete_record, put_record
+from utils.files import FileLock, replace_atomically
+from utils.metrics import timed
+
+
+# ------------------------ CURSORES DE PAGINACION ------------------------
+
+def encode_cursor(entry: Tuple[Any, int], sort: str, descending: bool) -> str:
+    raw = json.dumps([sort, descending, entry[0], entry[1]]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str, descending: bool) -> Tuple[Any, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, cursor_descending, value, row_id = json.loads(raw)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(row_id, int) or isinstance(row_id, bool):
+        raise ValueError("Invalid cursor")
+    if cursor_sort != sort or cursor_descending != descending:
+        raise ValueError("Cursor does not match the requested sort")
+    return value, row_id
+
+
+class RowsNotFound(LookupError):
+    """Una operación masiva nombra ids que no existen; no se aplicó nada."""
+
+    def __init__(self, ids: List[int]):
+        super().__init__(ids)
+        self.ids = ids
+
+
+# Se llama con las filas que se van a borrar, dentro de la escritura y antes de
+# confirmarla (p. ej. para archivarlas en el historial).
+BeforeRemove = Optional[Callable[[List[CompactRecord]], Awaitable[None]]]
+
+
+# ------------------------ OBSERVADORES ------------------------
+
+class ChangeListener:
+    """Recibe cada cambio aplicado a una tabla (estadísticas, cachés, feeds)."""
+
+    def on_change(self, before: Optional[BaseModel], after: Optional[BaseModel]) -> None:
+        pass
+
+    def on_reset(self, rows: Iterable[BaseModel]) -> None:
+        pass
+
+
+# ------------------------ REPOSITORIO EN MEMORIA ------------------------
+
+class Repository:
+    """Tabla en memoria indexada por id, respaldada por un archivo CSV.
+
+    El CSV se lee una sola vez (``load``) y todas las lecturas se sirven
+    desde el diccionario ``rows`` (con una instantánea binaria, un
+    ``SnapshotRows`` que decodifica cada fila del mmap al pedirla). Las escrituras pasan siempre por este
+    objeto: cada mutación se anexa al log (``log_path``) y ``compact``
+    vuelca periódicamente el estado a una instantánea CSV nueva.
+
+    Las filas se validan con ``model`` y se guardan como registros
+    compactos (``operations.records``); las lecturas devuelven registros.
+
+    Con ``shared=True`` (varios workers) el log es el canal entre procesos:
+    cada escritura toma un cerrojo de archivo, aplica antes lo que otros
+    anexaron y luego anexa lo suyo; las lecturas aplican las líneas nuevas
+    del log con los mismos ``_apply``, así que los observadores (cachés,
+    estadísticas, feed) ven también los cambios de los demás workers.
+    """
+
+    def __init__(
+        self,
+        model: Type[BaseModel],
+        path: Optional[str] = None,
+        loader: Optional[Callable[[str], Iterable[BaseModel]]] = None,
+        writer: Optional[Callable[[List[BaseModel], str], None]] = None,
+        log_path: Optional[str] = None,
+        indexes: Iterable[str] = (),
+        sorted_indexes: Iterable[str] = (),
+        shared: bool = False,
+    ):
+        self.model = model
+        self.record = record_class(model)
+        self.path = path
+        self.loader = loader
+        self.writer = writer
+        self.log = MutationLog(log_path) if log_path else None
+        # Varios procesos sobre los mismos archivos: escrituras con cerrojo y
+        # lecturas al día siguiendo el log (ver ``refresh``).
+        self.file_lock = FileLock(f"{log_path}.lock") if shared and log_path else None
+        self.rows: MutableMapping[int, CompactRecord] = {}
+        self.indexes: Dict[str, Dict[Any, Set[int]]] = {field: defaultdict(set) for field in indexes}
+        # Listas ordenadas de (valor, id) para rangos, ordenación y paginación.
+        self.sorted_indexes: Dict[str, List[Tuple[Any, int]]] = {
+            field: [] for field in ("id", *sorted_indexes)
+        }
+        self.loaded = False
+        # El log se siguió hasta perder alguna generación: falta recargar la instantánea.
+        self.stale = False
+        self._bulk_loading = False
+        self._catching_up: Optional[asyncio.Task] = None
+        self.lock = asyncio.Lock()
+        self.listeners: List[ChangeListener] = []
+
+    # ------------------------ CARGA ------------------------
+
+    @timed("repository.load")
+    def load(self) -> None:
+        if self.file_lock is None:
+            self._load()
+            return
+        # Con el cerrojo: ni un anexado a medias ni una compactación entre CSV y log.
+        with self.file_lock.held():
+            self._load()
+
+    def _load(self) -> None:
+        self._adopt(self._read())
+
+    def _read(self) -> "Repository":
+        """Lee instantánea y log en una copia sin observadores.
+
+        Puede ejecutarse en un hilo: lo que ven los lectores no cambia hasta
+        ``_adopt``, que solo intercambia las estructuras ya construidas.
+        """
+        shadow = copy.copy(self)
+        shadow.listeners = []
+        shadow.rows = {}
+        shadow.indexes = {field: defaultdict(set) for field in self.indexes}
+        shadow.sorted_indexes = {field: [] for field in self.sorted_indexes}
+        # Durante la carga los índices ordenados se construyen de una vez al final.
+        shadow._bulk_loading = True
+        if self.loader is not None and self.path is not None:
+            rows = self.loader(self.path)
+            if isinstance(rows, SnapshotRows):
+                # Instantánea binaria: las filas se quedan en el mmap y solo se recorren
+                # las columnas indexadas (antes del log, que desindexa lo que sustituye).
+                shadow.rows = rows
+                for field, index in shadow.indexes.items():
+                    for value, row_id in rows.pairs(field):
+                        index[value].add(row_id)
+            else:
+                for row in rows:
+                    shadow._put(row if isinstance(row, self.record) else self.record.from_model(row))
+        if self.log is not None:
+            for record in self.log.replay():
+                shadow._apply(record)
+            if self.file_lock is not None:
+                self.log.mark_end()
+        shadow._rebuild_sorted_indexes()
+        return shadow
+
+    def _adopt(self, shadow: "Repository") -> None:
+        # Los observadores reciben un único ``on_reset``.
+        self.rows, self.indexes, self.sorted_indexes = shadow.rows, shadow.indexes, shadow.sorted_indexes
+        self.loaded = True
+        self.stale = False
+        for listener in self.listeners:
+            listener.on_reset(self.rows.values())
+
+    def ensure_loaded(self) -> None:
+        if not self.loaded:
+            self.load()
+        elif self.file_lock is not None:
+            self.refresh()
+
+    def refresh(self) -> None:
+        """Aplica lo que otros procesos anexaron al log desde la última vez."""
+        # Si este proceso está escribiendo o recargando, se pone al día con el cerrojo tomado.
+        if self.file_lock is None or not self.loaded or self.lock.locked():
+            return
+        if (self.stale or self.log.changed()) and not self._follow():
+            # Recargar la instantánea es caro: se hace en segundo plano y fuera del
+            # event loop; mientras tanto las lecturas ven la versión anterior.
+            self._schedule_catch_up()
+
+    def _schedule_catch_up(self) -> None:
+        if self._catching_up is not None and not self._catching_up.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Lectura desde un hilo: se recarga aquí mismo si nadie está escribiendo.
+            with self.file_lock.attempt(exclusive=False) as acquired:
+                if acquired:
+                    self._load()
+            return
+        self._catching_up = loop.create_task(self.catch_up())
+
+    async def catch_up(self) -> None:
+        """Pone la tabla al día con el log compartido (recargando la instantánea si hace falta)."""
+        if self.file_lock is None:
+            return
+        # El cerrojo compartido impide una compactación a medias mientras se lee.
+        async with self.lock, self.file_lock.hold(exclusive=False):
+            await self._catch_up()
+
+    async def _catch_up(self) -> None:
+        # Con ``lock`` y el cerrojo de archivo tomados. La E/S va a un hilo; en el
+        # event loop solo se aplican los registros o se intercambian las estructuras.
+        if self.loaded and not self.stale:
+            records = await asyncio.to_thread(self.log.follow)
+            if records is not None:
+                for record in records:
+                    self._apply(record)
+                return
+            self.stale = True
+        self._adopt(await asyncio.to_thread(self._read))
+
+    def _follow(self) -> bool:
+        """Aplica lo nuevo del log; False si hay que recargar la instantánea."""
+        if not self.stale:
+            records = self.log.follow()
+            if records is not None:
+                for record in records:
+                    self._apply(record)
+                return True
+            self.stale = True
+        return False
+
+    # ------------------------ INDICES ------------------------
+
+    def _index(self, row: CompactRecord) -> None:
+        for field, index in self.indexes.items():
+            index[getattr(row, field)].add(row.id)
+        if not self._bulk_loading:
+            for field, entries in self.sorted_indexes.items():
+                insort(entries, (getattr(row, field), row.id))
+
+    def _unindex(self, row: CompactRecord) -> None:
+        for field, index in self.indexes.items():
+            value = getattr(row, field)
+            ids = index.get(value)
+            if ids is not None:
+                ids.discard(row.id)
+                if not ids:
+                    del index[value]
+        if not self._bulk_loading:
+            for field, entries in self.sorted_indexes.items():
+                entry = (getattr(row, field), row.id)
+                position = bisect_left(entries, entry)
+                if position < len(entries) and entries[position] == entry:
+                    del entries[position]
+
+    def _rebuild_sorted_indexes(self) -> None:
+        if isinstance(self.rows, SnapshotRows):
+            for field in self.sorted_indexes:
+                self.sorted_indexes[field] = sorted(self.rows.pairs(field))
+            return
+        for field in self.sorted_indexes:
+            self.sorted_indexes[field] = sorted((getattr(row, field), row.id) for row in self.rows.values())
+
+    def _put(self, row: CompactRecord) -> None:
+        previous = self.rows.get(row.id)
+        if previous is not None:
+            self._unindex(previous)
+        self.rows[row.id] = row
+        self._index(row)
+        if not self._bulk_loading:
+            for listener in self.listeners:
+                listener.on_change(previous, row)
+
+    def _remove(self, row_id: int) -> Optional[CompactRecord]:
+        row = self.rows.pop(row_id, None)
+        if row is not None:
+            self._unindex(row)
+            if not self._bulk_loading:
+                for listener in self.listeners:
+                    listener.on_change(row, None)
+        return row
+
+    def _reset(self) -> None:
+        self.rows = {}
+        for index in self.indexes.values():
+            index.clear()
+        for entries in self.sorted_indexes.values():
+            entries.clear()
+        if not self._bulk_loading:
+            for listener in self.listeners:
+                listener.on_reset(())
+
+    def _apply(self, record: dict) -> None:
+        op = record.get("op")
+        if op == "put":
+            # Lo que está en el log ya se validó al escribirse.
+            self._put(self.record(**record["row"]))
+        elif op == "delete":
+            self._remove(record["id"])
+        elif op == "clear":
+            self._reset()
+
+    # ------------------------ PERSISTENCIA ------------------------
+
+    async def _persist(self, records: List[dict]) -> None:
+        # Se llama con ``lock`` tomado y antes de tocar la memoria: lo que los
+        # lectores ven ya está en disco. La E/S sale del event loop. Sin log
+        # la tabla vive solo en memoria (salvo que se llame a ``compact``).
+        if self.log is not None:
+            await asyncio.to_thread(self.log.append, records)
+
+    @timed("repository.write_snapshot")
+    def _write_snapshot(self, rows: List[CompactRecord]) -> None:
+        replace_atomically(self.path, lambda tmp_path: self.writer(rows, tmp_path))
+
+    @contextlib.asynccontextmanager
+    async def _writing(self) -> AsyncIterator[None]:
+        async with self.lock:
+            if self.file_lock is None:
+                self.ensure_loaded()
+                yield
+                return
+            async with self.file_lock.hold():
+                await self._catch_up()
+                try:
+                    yield
+                finally:
+                    # Lo recién anexado es propio: no se vuelve a aplicar al seguir el log.
+                    self.log.mark_end()
+
+    def needs_compaction(self, threshold: int) -> bool:
+        return self.log is not None and self.log.pending >= threshold
+
+    async def compact(self) -> None:
+        if self.writer is None or self.path is None:
+            return
+        async with self._writing():
+            await asyncio.to_thread(self._write_snapshot, list(self.rows.values()))
+            if isinstance(self.rows, SnapshotRows):
+                # La instantánea nueva es la tabla tal cual: las filas vuelven al mmap
+                # (los índices no cambian) y lo acumulado en memoria se suelta.
+                self.rows = await asyncio.to_thread(self.loader, self.path)
+            if self.log is not None:
+                await asyncio.to_thread(self.log.truncate)
+
+    # ------------------------ LECTURAS ------------------------
+
+    def get(self, row_id: int) -> Optional[CompactRecord]:
+        self.ensure_loaded()
+        return self.rows.get(row_id)
+
+    def all(self) -> List[CompactRecord]:
+        self.ensure_loaded()
+        return list(self.rows.values())
+
+    def find(self, field: str, value: Any) -> List[CompactRecord]:
+        self.ensure_loaded()
+        ids = self.indexes[field].get(value, ())
+        return [self.rows[row_id] for row_id in sorted(ids)]
+
+    def query(
+        self,
+        equals: Optional[Dict[str, Any]] = None,
+        ranges: Optional[Dict[str, Tuple[Any, Any]]] = None,
+        sort: str = "id",
+        descending: bool = False,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[CompactRecord], Optional[str]]:
+        """Filtra, ordena y pagina usando los índices.
+
+        ``equals`` solo admite campos con índice hash y ``ranges`` campos con
+        índice ordenado (límites inclusivos, ``None`` = abierto). Devuelve la
+        página y el cursor opaco para pedir la siguiente.
+        """
+        self.ensure_loaded()
+        equals = {field: value for field, value in (equals or {}).items() if value is not None}
+        ranges = {field: bounds for field, bounds in (ranges or {}).items() if bounds != (None, None)}
+        for field in equals:
+            if field not in self.indexes:
+                raise ValueError(f"Cannot filter by '{field}'")
+        for field in ranges:
+            if field not in self.sorted_indexes:
+                raise ValueError(f"Cannot filter by range on '{field}'")
+        if sort not in self.sorted_indexes:
+            raise ValueError(f"Cannot sort by '{sort}'")
+        after = decode_cursor(cursor, sort, descending) if cursor else None
+        if after is not None:
+            # Un cursor manipulado puede traer un valor que no se compara con los del campo.
+            try:
+                sorted([after, *self.sorted_indexes[sort][:1]])
+            except TypeError:
+                raise ValueError("Invalid cursor")
+
+        # Conjunto candidato más pequeño entre los índices hash y los rangos.
+        candidates: Optional[Set[int]] = None
+        for field, value in equals.items():
+            ids = self.indexes[field].get(value, set())
+            candidates = set(ids) if candidates is None else candidates & ids
+        for field, (low, high) in ranges.items():
+            if field == sort:
+                continue
+            entries = self.sorted_indexes[field]
+            start, stop = self._range_bounds(entries, low, high)
+            if candidates is None and stop - start > len(self.rows) // 4:
+                continue
+            ids = {row_id for _, row_id in entries[start:stop]}
+            candidates = ids if candidates is None else candidates & ids
+
+        def matches(row: CompactRecord) -> bool:
+            for field, (low, high) in ranges.items():
+                value = getattr(row, field)
+                if (low is not None and value < low) or (high is not None and value > high):
+                    return False
+            return all(getattr(row, field) == value for field, value in equals.items())
+
+        entries = self.sorted_indexes[sort]
+        if candidates is not None and len(candidates) < len(entries) // 4:
+            keyed = sorted(((getattr(self.rows[row_id], sort), row_id) for row_id in candidates), reverse=descending)
+            if after is not None:
+                keyed = [entry for entry in keyed if (entry < after if descending else entry > after)]
+            ordered = (entry for entry in keyed)
+        else:
+            low, high = ranges.get(sort, (None, None))
+            start, stop = self._range_bounds(entries, low, high)
+            if after is not None:
+                if descending:
+                    stop = min(stop, bisect_left(entries, after))
+                else:
+                    start = max(start, bisect_right(entries, after))
+            positions = range(stop - 1, start - 1, -1) if descending else range(start, stop)
+            ordered = (entries[position] for position in positions)
+
+        page: List[CompactRecord] = []
+        last = None
+        for entry in ordered:
+            row = self.rows[entry[1]]
+            if candidates is not None and entry[1] not in candidates:
+                continue
+            if not matches(row):
+                continue
+            if limit is not None and len(page) == limit:
+                return page, encode_cursor(last, sort, descending)
+            page.append(row)
+            last = entry
+        return page, None
+
+    @staticmethod
+    def _range_bounds(entries: List[Tuple[Any, int]], low: Any, high: Any) -> Tuple[int, int]:
+        start = 0 if low is None else bisect_left(entries, (low, float("-inf")))
+        stop = len(entries) if high is None else bisect_right(entries, (high, float("inf")))
+        return start, stop
+
+    def count(self) -> int:
+        self.ensure_loaded()
+        return len(self.rows)
+
+    def next_id(self) -> int:
+        self.ensure_loaded()
+        # El último id del índice ordenado es el máximo: O(1) en lugar de recorrer la tabla.
+        ids = self.sorted_indexes["id"]
+        return ids[-1][1] + 1 if ids else 1
+
+    # ------------------------ ESCRITURAS ------------------------
+    # Un único escritor por tabla: todas las mutaciones pasan por ``_writing``
+    # (``lock`` y, con varios workers, el cerrojo de archivo), así dos altas
+    # concurrentes nunca calculan el mismo id.
+
+    async def insert(self, data: dict, row_id: Optional[int] = None) -> CompactRecord:
+        async with self._writing():
+            if row_id is None or row_id in self.rows:
+                row_id = self.next_id()
+            row = self._validated(id=row_id, **data)
+            await self._persist([put_record(row.dict())])
+            self._put(row)
+            return row
+
+    async def insert_many(self, items: List[dict]) -> List[CompactRecord]:
+        async with self._writing():
+            first_id = self.next_id()
+            rows = [self._validated(id=first_id + offset, **data) for offset, data in enumerate(items)]
+            await self._persist([put_record(row.dict()) for row in rows])
+            for row in rows:
+                self._put(row)
+            return rows
+
+    def _validated(self, **values) -> CompactRecord:
+        return self.record.from_model(self.model(**values))
+
+    def _merge(self, current: CompactRecord, data: dict) -> CompactRecord:
+        values = current.dict()
+        values.update(data)
+        values["id"] = current.id
+        return self._validated(**values)
+
+    async def update(self, row_id: int, data: dict) -> Optional[CompactRecord]:
+        async with self._writing():
+            current = self.rows.get(row_id)
+            if current is None:
+                return None
+            row = self._merge(current, data)
+            await self._persist([put_record(row.dict())])
+            self._put(row)
+            return row
+
+    async def update_many(self, updates: Dict[int, dict]) -> List[CompactRecord]:
+        async with self._writing():
+            # Con la tabla bloqueada: o existen todas las filas o no se toca ninguna.
+            missing = [row_id for row_id in updates if row_id not in self.rows]
+            if missing:
+                raise RowsNotFound(missing)
+            # Se validan todas las filas antes de aplicar ninguna.
+            rows = [self._merge(self.rows[row_id], data) for row_id, data in updates.items()]
+            await self._persist([put_record(row.dict()) for row in rows])
+            for row in rows:
+                self._put(row)
+            return rows
+
+    async def delete(self, row_id: int, before_remove: BeforeRemove = None) -> Optional[CompactRecord]:
+        async with self._writing():
+            row = self.rows.get(row_id)
+            if row is None:
+                return None
+            if before_remove is not None:
+                await before_remove([row])
+            await self._persist([delete_record(row_id)])
+            return self._remove(row_id)
+
+    async def delete_many(self, row_ids: Iterable[int], before_remove: BeforeRemove = None) -> List[CompactRecord]:
+        async with self._writing():
+            present = [row_id for row_id in dict.fromkeys(row_ids) if row_id in self.rows]
+            if before_remove is not None and present:
+                await before_remove([self.rows[row_id] for row_id in present])
+            await self._persist([delete_record(row_id) for row_id in present])
+            return [self._remove(row_id) for row_id in present]
+
+    def missing(self, row_ids: Iterable[int]) -> List[int]:
+        self.ensure_loaded()
+        return [row_id for row_id in row_ids if row_id not in self.rows]
+
+    async def clear(self, before_remove: BeforeRemove = None) -> List[CompactRecord]:
+        async with self._writing():
+            removed = list(self.rows.values())
+            if before_remove is not None and removed:
+                await before_remove(removed)
+            await self._persist([clear_record()])
+            self._reset()
+            return removed
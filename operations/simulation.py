@@ -0,0 +1,173 @@
+import json
+import os
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Sequence
+
+from operations.analytics import ColumnarTable
+from utils.metrics import timed
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Las tiradas se agrupan en oleadas de WAVE_SECONDS; cada oleada tiene su
+# propio generador (seed, oleada, bloque), así el resultado no depende de
+# cómo se consuma (JSON completo o en flujo). Tiempos al microsegundo.
+WAVE_SECONDS = 60.0
+ENEMY_BLOCK = 65536
+MAX_SIMULATION_SECONDS = float(os.getenv("MAX_SIMULATION_SECONDS", str(24 * 3600)))
+MAX_SIMULATION_EVENTS = int(os.getenv("MAX_SIMULATION_EVENTS", "1000000"))
+
+
+# ------------------------ PLAN ------------------------
+
+class SpawnPlan:
+    """Enemigos que participan en una simulación, como arrays NumPy.
+
+    Cada enemigo tira cada ``spawn`` segundos (t = spawn, 2·spawn, ...) y
+    aparece con probabilidad ``probability_spawn`` en cada tirada.
+    """
+
+    def __init__(self, table: ColumnarTable, types: Optional[Sequence[str]] = None):
+        import numpy as np
+
+        # Referencias tomadas juntas: un _build posterior reemplaza los dicts, no los muta.
+        columns, codes, labels = table.columns, table.codes, table.labels
+        type_codes = codes.get("type", np.zeros(table.size, dtype=np.intp))
+        type_labels = labels.get("type", np.array([], dtype=str))
+        mask = np.ones(table.size, dtype=bool)
+        if types:
+            wanted = np.flatnonzero(np.isin(type_labels, list(types)))
+            mask = np.isin(type_codes, wanted)
+        # Ordenado por id: con un argsort estable por tiempo los empates quedan por id.
+        selected = np.flatnonzero(mask)
+        if table.size:
+            selected = selected[np.argsort(columns["id"][selected], kind="stable")]
+            self.ids = columns["id"][selected].astype(np.int64)
+            self.interval = columns["spawn"][selected]
+            self.probability = np.clip(columns["probability_spawn"][selected], 0.0, 1.0)
+        else:
+            self.ids, self.interval, self.probability = np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0)
+        # Tipos renumerados a solo los presentes en el plan.
+        self.types, self.type_codes = np.unique(type_labels[type_codes[selected]], return_inverse=True)
+
+    def __len__(self) -> int:
+        return int(self.ids.size)
+
+    def expected_per_minute(self) -> float:
+        # Suma de ``stats.spawns_per_minute``: el panel y la simulación dan la misma tasa.
+        return float((self.probability * 60.0 / self.interval).sum()) if len(self) else 0.0
+
+
+# ------------------------ MUESTREO ------------------------
+
+def _block_events(plan: SpawnPlan, block: slice, start: float, end: float, rng) -> Dict[str, "np.ndarray"]:
+    import numpy as np
+
+    interval = plan.interval[block]
+    # Tiradas k·interval dentro de (start, end], para todos los enemigos del bloque a la vez.
+    first = np.floor(start / interval).astype(np.int64) + 1
+    last = np.floor(end / interval).astype(np.int64)
+    counts = np.maximum(last - first + 1, 0)
+    total = int(counts.sum())
+    if not total:
+        return {"enemy": np.zeros(0, dtype=np.int64), "time": np.zeros(0)}
+    enemy = np.repeat(np.arange(block.start, block.start + interval.size), counts)
+    offsets = np.repeat(np.cumsum(counts) - counts, counts)
+    k = np.repeat(first, counts) + (np.arange(total) - offsets)
+    hits = rng.random(total) < plan.probability[enemy]
+    enemy = enemy[hits]
+    return {"enemy": enemy, "time": k[hits] * plan.interval[enemy]}
+
+
+@timed("simulation.wave")
+def simulate_wave(plan: SpawnPlan, seed: int, wave: int, duration: float) -> Dict[str, "np.ndarray"]:
+    """Apariciones de la oleada ``wave`` ordenadas por tiempo (y por id en empates)."""
+    import numpy as np
+
+    start = wave * WAVE_SECONDS
+    end = min(start + WAVE_SECONDS, duration)
+    parts = []
+    for block_start in range(0, len(plan), ENEMY_BLOCK):
+        rng = np.random.default_rng((seed, wave, block_start // ENEMY_BLOCK))
+        parts.append(_block_events(plan, slice(block_start, block_start + ENEMY_BLOCK), start, end, rng))
+    enemy = np.concatenate([part["enemy"] for part in parts]) if parts else np.zeros(0, dtype=np.int64)
+    time = np.concatenate([part["time"] for part in parts]) if parts else np.zeros(0)
+    # Clave entera única (microsegundo, posición en el plan): un sort sin estabilidad
+    # basta y los empates de tiempo salen ordenados por id.
+    size = max(len(plan), 1)
+    keys = np.sort(np.rint(time * 1e6).astype(np.int64) * size + enemy)
+    enemy = keys % size
+    return {"time": (keys // size) / 1e6, "enemy_id": plan.ids[enemy], "type": plan.type_codes[enemy]}
+
+
+def wave_count(duration: float) -> int:
+    return int(-(-duration // WAVE_SECONDS))
+
+
+def iter_waves(plan: SpawnPlan, seed: int, duration: float) -> Iterator[Dict[str, "np.ndarray"]]:
+    for wave in range(wave_count(duration)):
+        yield simulate_wave(plan, seed, wave, duration)
+
+
+# ------------------------ SALIDAS ------------------------
+
+def header(plan: SpawnPlan, seed: int, duration: float) -> dict:
+    return {
+        "seed": seed,
+        "duration": duration,
+        "wave_seconds": WAVE_SECONDS,
+        "enemies": len(plan),
+        "types": plan.types.tolist(),
+        "expected_per_minute": round(plan.expected_per_minute(), 4),
+    }
+
+
+@timed("simulation.run")
+def simulate(plan: SpawnPlan, seed: int, duration: float, max_events: int = MAX_SIMULATION_EVENTS) -> dict:
+    """Simulación completa en forma columnar: ``time``, ``enemy_id`` y ``type`` (índice en ``types``)."""
+    import numpy as np
+
+    waves: List[Dict[str, "np.ndarray"]] = []
+    events = 0
+    for wave in iter_waves(plan, seed, duration):
+        events += wave["time"].size
+        if events > max_events:
+            raise ValueError(f"Simulation exceeds {max_events} spawns; request format=ndjson to stream it")
+        waves.append(wave)
+    result = header(plan, seed, duration)
+    result.update(
+        spawns=events,
+        wave_spawns=[int(wave["time"].size) for wave in waves],
+        time=np.concatenate([wave["time"] for wave in waves]).tolist() if waves else [],
+        enemy_id=np.concatenate([wave["enemy_id"] for wave in waves]).tolist() if waves else [],
+        type=np.concatenate([wave["type"] for wave in waves]).tolist() if waves else [],
+    )
+    return result
+
+
+def wave_payload(number: int, wave: Dict[str, "np.ndarray"], duration: float) -> dict:
+    return {
+        "wave": number,
+        "start": number * WAVE_SECONDS,
+        "end": min((number + 1) * WAVE_SECONDS, duration),
+        "time": wave["time"].tolist(),
+        "enemy_id": wave["enemy_id"].tolist(),
+        "type": wave["type"].tolist(),
+    }
+
+
+def iter_ndjson(plan: SpawnPlan, seed: int, duration: float) -> Iterator[str]:
+    """Cabecera y luego una línea columnar por oleada; se calcula a medida que se envía."""
+    yield json.dumps(header(plan, seed, duration), separators=(",", ":")) + "\n"
+    for number, wave in enumerate(iter_waves(plan, seed, duration)):
+        yield json.dumps(wave_payload(number, wave, duration), separators=(",", ":")) + "\n"
+
+
+def iter_csv(plan: SpawnPlan, seed: int, duration: float) -> Iterator[str]:
+    yield "time,enemy_id,type\n"
+    types = plan.types
+    for wave in iter_waves(plan, seed, duration):
+        if wave["time"].size:
+            yield "".join(
+                f"{time:.6f},{enemy_id},{types[code]}\n"
+                for time, enemy_id, code in zip(wave["time"].tolist(), wave["enemy_id"].tolist(), wave["type"].tolist())
+            )
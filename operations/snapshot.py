@@ -0,0 +1,538 @@
+"""Instantáneas binarias de las tablas, leídas con ``mmap``.
+
+Formato (little-endian)::
+
+    cabecera   HEADER: magia, versión, nº de campos y de filas, offsets de cada sección
+    esquema    JSON con [campo, código struct, escala] en el orden de los registros
+    registros  nº de filas × registro de ancho fijo, en orden de id (b/h/i/q=int
+               con el ancho justo para la columna; float como entero escalado
+               (escala > 0), f o d, el más estrecho que conserva los valores;
+               ?=bool; I=índice en la tabla de cadenas, NO_STRING = None)
+    cadenas    nº de cadenas (u32), offsets (u64 × nº+1) y los bytes UTF-8
+
+No hay índice aparte: como los registros van ordenados por id, ``get(id)``
+busca directamente en la columna ``id`` (acceso directo si los ids son
+consecutivos, búsqueda binaria si no).
+
+Los números no se parsean: un registro se decodifica con un solo
+``struct.unpack_from`` cuando se accede a él, y cada cadena distinta
+(``type``, ``name``) se guarda y se decodifica una sola vez.
+
+Herramientas::
+
+    python -m operations.snapshot import players Data/players.csv Data/players.snap
+    python -m operations.snapshot export enemies Data/enemies.snap Data/enemies.csv
+    python -m operations.snapshot info Data/players.snap --id 42
+"""
+import argparse
+import dataclasses
+import importlib
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from collections.abc import MutableMapping, ValuesView
+from operator import attrgetter, itemgetter
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Type
+
+from pydantic import BaseModel
+
+from operations.records import CompactRecord, record_class
+from utils.metrics import timed
+
+# csv (por defecto) o binary: formato de la instantánea que escribe ``compact``.
+SNAPSHOT_FORMAT = os.getenv("SNAPSHOT_FORMAT", "csv").lower()
+
+MAGIC = b"GSNP"
+VERSION = 2
+HEADER = struct.Struct("<4sHHIIQQ")
+NO_STRING = 0xFFFFFFFF
+FIELD_CODES = {int: "q", float: "d", bool: "?", str: "I"}
+INT_CODES = (("b", 2 ** 7), ("h", 2 ** 15), ("i", 2 ** 31), ("q", 2 ** 63))
+FLOAT32 = struct.Struct("<f")
+# Decimales con los que se intenta guardar una columna float como entero escalado.
+MAX_FLOAT_DIGITS = 6
+
+
+def schema_for(model: Type[BaseModel]) -> List[Tuple[str, str]]:
+    """[(campo, código struct)] de ``model``; ``Optional[str]`` se guarda como cadena."""
+    fields = []
+    for name, info in model.model_fields.items():
+        annotation = info.annotation
+        if annotation not in FIELD_CODES:
+            args = [arg for arg in getattr(annotation, "__args__", ()) if arg is not type(None)]
+            if args != [str]:
+                raise ValueError(f"Field '{name}' cannot be stored in a snapshot")
+            annotation = str
+        fields.append((name, FIELD_CODES[annotation]))
+    return fields
+
+
+def _int_code(values: Iterable[int]) -> str:
+    """Código entero más estrecho que admite todos los valores de la columna."""
+    low = high = 0
+    for value in values:
+        low, high = min(low, value), max(high, value)
+    for code, limit in INT_CODES:
+        if -limit <= low and high < limit:
+            return code
+    raise ValueError(f"Integer {low if low < -2 ** 63 else high} does not fit in 64 bits")
+
+
+def _is_float32(value: float) -> bool:
+    try:
+        return FLOAT32.unpack(FLOAT32.pack(value))[0] == value
+    except OverflowError:
+        return False
+
+
+def _float_code(values: Sequence[float]) -> Tuple[str, int]:
+    """(código, escala) más estrecho que devuelve exactamente cada valor.
+
+    Con pocos decimales (2.35, 0.125) la columna se guarda como entero
+    ``round(valor * escala)``; si no, como float32 cuando basta, o ``d``.
+    """
+    if not all(math.isfinite(value) for value in values):
+        return "d", 0
+    code, scale = "d", 0
+    for digits in range(MAX_FLOAT_DIGITS + 1):
+        candidate = 10 ** digits
+        if all(round(value * candidate) / candidate == value for value in values):
+            try:
+                scaled = _int_code(round(value * candidate) for value in values)
+            except ValueError:
+                break
+            if scaled != "q":
+                code, scale = scaled, candidate
+            break
+    if struct.calcsize(code) > FLOAT32.size and all(_is_float32(value) for value in values):
+        return "f", 0
+    return code, scale
+
+
+def _align(offset: int, size: int = 8) -> int:
+    return offset + (-offset % size)
+
+
+def _int_view(buffer: memoryview, code: str) -> Sequence[int]:
+    # Vista sin copia sobre el mmap; en máquinas big-endian se copia y se invierte.
+    if sys.byteorder == "little":
+        return buffer.cast(code)
+    values = array(code, buffer.tobytes())
+    values.byteswap()
+    return values
+
+
+# ------------------------ ESCRITURA ------------------------
+
+@timed("snapshot.write")
+def write_snapshot(rows: Sequence[BaseModel], path: str, model: Type[BaseModel]) -> None:
+    # En orden de id (y sin repetidos: gana el último, como al cargar un CSV).
+    rows = sorted({row.id: row for row in rows}.values(), key=attrgetter("id"))
+    fields: List[Tuple[str, str, int]] = []
+    for name, code in schema_for(model):
+        scale = 0
+        if code == "q":
+            code = _int_code(getattr(row, name) for row in rows)
+        elif code == "d":
+            code, scale = _float_code([getattr(row, name) for row in rows])
+        fields.append((name, code, scale))
+    record = struct.Struct("<" + "".join(code for _, code, _ in fields))
+    schema = json.dumps({"model": model.__name__, "fields": fields}).encode("utf-8")
+    records_offset = _align(HEADER.size + len(schema))
+    strings: Dict[str, int] = {}
+
+    with open(path, mode="wb") as f:
+        f.write(b"\0" * records_offset)
+        for row in rows:
+            values = []
+            for name, code, scale in fields:
+                value = getattr(row, name)
+                if code == "I":
+                    value = NO_STRING if value is None else strings.setdefault(value, len(strings))
+                elif scale:
+                    value = round(value * scale)
+                values.append(value)
+            f.write(record.pack(*values))
+
+        strings_offset = _align(f.tell())
+        f.write(b"\0" * (strings_offset - f.tell()))
+        encoded = [text.encode("utf-8") for text in strings]
+        offsets = array("Q", [0])
+        for data in encoded:
+            offsets.append(offsets[-1] + len(data))
+        if sys.byteorder != "little":
+            offsets.byteswap()
+        f.write(struct.pack("<I", len(encoded)) + b"\0" * 4)
+        f.write(offsets.tobytes())
+        f.write(b"".join(encoded))
+
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, len(fields), len(rows), len(schema), records_offset, strings_offset))
+        f.write(schema)
+
+
+# ------------------------ LECTURA ------------------------
+
+class SnapshotReader:
+    """Acceso perezoso a una instantánea: nada se decodifica hasta pedirlo.
+
+    ``get(id)`` busca en la columna ``id`` del mmap y decodifica solo ese
+    registro; iterar decodifica en orden de archivo. ``model`` puede ser un
+    modelo Pydantic (se valida), un registro compacto de
+    ``operations.records`` o ``None`` (diccionarios).
+    """
+
+    def __init__(self, path: str, model: Optional[type] = None):
+        self.path = path
+        self.model = model
+        self._validate = model is not None and issubclass(model, BaseModel)
+        self._file = open(path, mode="rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"{path} is not a snapshot")
+        try:
+            self._open()
+        except Exception:
+            self.close()
+            raise
+
+    def _open(self) -> None:
+        size = len(self._map)
+        if size < HEADER.size or self._map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{self.path} is not a snapshot")
+        (_, version, field_count, self.row_count, schema_size,
+         records_offset, strings_offset) = HEADER.unpack_from(self._map)
+        if version != VERSION:
+            raise ValueError(f"Unsupported snapshot version {version}")
+        try:
+            schema = json.loads(self._map[HEADER.size:HEADER.size + schema_size])
+            self.fields: List[Tuple[str, str, int]] = [
+                (str(name), str(code), int(scale)) for name, code, scale in schema["fields"]
+            ]
+            self.record = struct.Struct("<" + "".join(code for _, code, _ in self.fields))
+        except (ValueError, KeyError, TypeError, struct.error):
+            raise ValueError(f"{self.path}: corrupt snapshot schema")
+        self.names = [name for name, _, _ in self.fields]
+        if len(self.fields) != field_count or "id" not in self.names:
+            raise ValueError(f"{self.path}: corrupt snapshot schema")
+        records_end = records_offset + self.row_count * self.record.size
+        if not HEADER.size + schema_size <= records_offset <= records_end <= strings_offset <= size - 8:
+            raise ValueError(f"{self.path} is truncated or corrupt")
+        (string_count,) = struct.unpack_from("<I", self._map, strings_offset)
+        offsets_start = strings_offset + 8
+        self._blob_start = offsets_start + 8 * (string_count + 1)
+        if self._blob_start > size:
+            raise ValueError(f"{self.path} is truncated or corrupt")
+
+        view = memoryview(self._map)
+        self._views = [view]
+        self._records = view[records_offset:records_end]
+        self._string_offsets = _int_view(view[offsets_start:self._blob_start], "Q")
+        self._views += [self._records, self._string_offsets]
+        if self._blob_start + self._string_offsets[-1] > size:
+            raise ValueError(f"{self.path} is truncated or corrupt")
+        self._strings: Dict[int, str] = {}
+        self._string_fields = [position for position, (_, code, _) in enumerate(self.fields) if code == "I"]
+        self._scaled = [(position, scale) for position, (_, _, scale) in enumerate(self.fields) if scale]
+        id_position = self.names.index("id")
+        self._id = struct.Struct("<" + self.fields[id_position][1])
+        self._id_offset = struct.calcsize("<" + "".join(code for _, code, _ in self.fields[:id_position]))
+        # Registros compactos: se construyen por posición (orden del dataclass), sin diccionario intermedio.
+        self._order = None
+        if isinstance(self.model, type) and issubclass(self.model, CompactRecord):
+            order = [field.name for field in dataclasses.fields(self.model)]
+            if set(order) == set(self.names):
+                self._order = [self.names.index(name) for name in order]
+
+    def __enter__(self) -> "SnapshotReader":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        # Las vistas sobre el mmap deben soltarse antes de cerrarlo.
+        for view in reversed(getattr(self, "_views", [])):
+            if isinstance(view, memoryview):
+                view.release()
+        self._views = []
+        if getattr(self, "_map", None) is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __len__(self) -> int:
+        return self.row_count
+
+    # ------------------------ DECODIFICACION ------------------------
+
+    def string(self, position: int) -> Optional[str]:
+        if position == NO_STRING:
+            return None
+        text = self._strings.get(position)
+        if text is None:
+            start = self._blob_start + self._string_offsets[position]
+            stop = self._blob_start + self._string_offsets[position + 1]
+            text = self._strings[position] = self._map[start:stop].decode("utf-8")
+        return text
+
+    def _convert(self, values: Tuple[Any, ...]) -> List[Any]:
+        values = list(values)
+        for position, scale in self._scaled:
+            values[position] = values[position] / scale
+        for position in self._string_fields:
+            values[position] = self.string(values[position])
+        return values
+
+    def _decode(self, values: Tuple[Any, ...]) -> Dict[str, Any]:
+        return dict(zip(self.names, self._convert(values)))
+
+    def _build(self, values: Dict[str, Any]):
+        if self._validate:
+            # model_validate (núcleo en Rust) es más rápido que model_construct.
+            return self.model.model_validate(values)
+        return self.model(**values) if self.model is not None else values
+
+    def _make(self, values: Tuple[Any, ...]):
+        if self._order is None:
+            return self._build(self._decode(values))
+        values = self._convert(values)
+        return self.model(*[values[position] for position in self._order])
+
+    def record_at(self, position: int) -> Dict[str, Any]:
+        return self._decode(self.record.unpack_from(self._records, position * self.record.size))
+
+    def row_at(self, position: int):
+        return self._make(self.record.unpack_from(self._records, position * self.record.size))
+
+    def _id_at(self, position: int) -> int:
+        return self._id.unpack_from(self._records, position * self.record.size + self._id_offset)[0]
+
+    def position(self, row_id: int) -> Optional[int]:
+        count = self.row_count
+        if not count:
+            return None
+        # Con ids consecutivos la posición sale directa; si no, búsqueda binaria.
+        slot = row_id - self._id_at(0)
+        if 0 <= slot < count and self._id_at(slot) == row_id:
+            return slot
+        slot = bisect_left(range(count), row_id, key=self._id_at)
+        if slot < count and self._id_at(slot) == row_id:
+            return slot
+        return None
+
+    def get(self, row_id: int):
+        position = self.position(row_id)
+        return None if position is None else self.row_at(position)
+
+    def column(self, name: str) -> List[Any]:
+        """Todos los valores de la columna ``name``, sin construir los registros."""
+        position = self.names.index(name)
+        values = list(map(itemgetter(position), self.record.iter_unpack(self._records)))
+        scale = self.fields[position][2]
+        if scale:
+            return [value / scale for value in values]
+        if position in self._string_fields:
+            return list(map(self.string, values))
+        return values
+
+    def ids(self) -> Iterator[int]:
+        return iter(self.column("id"))
+
+    def __iter__(self) -> Iterator:
+        make = self._make
+        for values in self.record.iter_unpack(self._records):
+            yield make(values)
+
+
+@timed("snapshot.read")
+def read_snapshot(path: str, model: type) -> list:
+    with SnapshotReader(path, model) as reader:
+        return list(reader)
+
+
+class SnapshotRows(MutableMapping):
+    """Filas de una instantánea como ``dict`` id -> registro compacto, sin cargarlas.
+
+    Cada lectura decodifica el registro del mmap (no se guarda); lo escrito
+    después de abrirla vive en memoria (``changed``/``added``) y los borrados
+    ocultan la fila de la instantánea (``removed``). ``Repository`` la usa como
+    ``rows`` en modo binario y construye sus índices con ``columns``.
+    """
+
+    def __init__(self, reader: SnapshotReader):
+        self.reader = reader
+        # Un solo objeto int por id, compartido por todos los índices del repositorio.
+        self.ids = reader.column("id")
+        self.changed: Dict[int, CompactRecord] = {}
+        self.added: Dict[int, CompactRecord] = {}
+        self.removed: Set[int] = set()
+
+    def _stored(self, row_id: int) -> Optional[int]:
+        if row_id in self.removed:
+            return None
+        return self.reader.position(row_id)
+
+    def get(self, row_id: int, default=None):
+        row = self.changed.get(row_id) or self.added.get(row_id)
+        if row is not None:
+            return row
+        position = self._stored(row_id)
+        return default if position is None else self.reader.row_at(position)
+
+    def __getitem__(self, row_id: int) -> CompactRecord:
+        row = self.get(row_id)
+        if row is None:
+            raise KeyError(row_id)
+        return row
+
+    def __contains__(self, row_id: object) -> bool:
+        return row_id in self.changed or row_id in self.added or self._stored(row_id) is not None
+
+    def __setitem__(self, row_id: int, row: CompactRecord) -> None:
+        if row_id in self.added or self.reader.position(row_id) is None:
+            self.added[row_id] = row
+        else:
+            self.changed[row_id] = row
+            self.removed.discard(row_id)
+
+    def __delitem__(self, row_id: int) -> None:
+        if self.added.pop(row_id, None) is not None:
+            return
+        if self.changed.pop(row_id, None) is None and self._stored(row_id) is None:
+            raise KeyError(row_id)
+        self.removed.add(row_id)
+
+    def __len__(self) -> int:
+        return self.reader.row_count - len(self.removed) + len(self.added)
+
+    def __iter__(self) -> Iterator[int]:
+        removed = self.removed
+        for row_id in self.ids:
+            if row_id not in removed:
+                yield row_id
+        yield from list(self.added)
+
+    def values(self) -> ValuesView:
+        return _SnapshotValues(self)
+
+    def _iter_values(self) -> Iterator[CompactRecord]:
+        if not self.removed and not self.changed:
+            yield from self.reader
+        else:
+            removed, changed = self.removed, self.changed
+            for row in self.reader:
+                if row.id not in removed:
+                    yield changed.get(row.id, row)
+        yield from list(self.added.values())
+
+    def pairs(self, field: str) -> List[Tuple[Any, int]]:
+        """(valor de ``field``, id) de cada fila, sin construir los registros de la instantánea."""
+        pairs = list(zip(self.reader.column(field), self.ids))
+        hidden = self.removed | self.changed.keys()
+        if hidden:
+            pairs = [pair for pair in pairs if pair[1] not in hidden]
+        pairs += [(getattr(row, field), row.id) for row in [*self.changed.values(), *self.added.values()]]
+        return pairs
+
+
+class _SnapshotValues(ValuesView):
+    def __iter__(self) -> Iterator[CompactRecord]:
+        return self._mapping._iter_values()
+
+
+# ------------------------ INTEGRACION CON EL REPOSITORIO ------------------------
+
+def table_files(
+    model: Type[BaseModel],
+    csv_path: str,
+    snapshot_path: str,
+    csv_loader: Callable[[str], List[BaseModel]],
+    csv_writer: Callable[[List[BaseModel], str], None],
+    snapshot_format: str = SNAPSHOT_FORMAT,
+) -> dict:
+    """``path``/``loader``/``writer`` del ``Repository`` según SNAPSHOT_FORMAT.
+
+    En modo binary, si aún no existe la instantánea se carga el CSV; la
+    siguiente compactación ya escribe el ``.snap``. La instantánea no se
+    carga: el loader devuelve ``SnapshotRows`` sobre el mmap (los registros
+    ya se validaron al escribirla y se decodifican al pedirlos).
+    """
+    if snapshot_format == "csv":
+        return {"path": csv_path, "loader": csv_loader, "writer": csv_writer}
+    if snapshot_format != "binary":
+        raise ValueError(f"Unknown SNAPSHOT_FORMAT '{snapshot_format}' (expected 'csv' or 'binary')")
+
+    def loader(path: str) -> Iterable[BaseModel]:
+        if os.path.exists(path):
+            return SnapshotRows(SnapshotReader(path, record_class(model)))
+        return csv_loader(csv_path)
+
+    def writer(rows: List[BaseModel], path: str) -> None:
+        write_snapshot(rows, path, model)
+
+    return {"path": snapshot_path, "loader": loader, "writer": writer}
+
+
+# ------------------------ HERRAMIENTAS ------------------------
+
+TABLES = {
+    "players": ("models.PlayerWithID", "operations.operations_player",
+                "read_players_from_csv", "write_players_to_csv"),
+    "enemies": ("models.EnemyWithID", "operations.operations_enemy",
+                "read_enemies_from_csv", "write_enemies_to_csv"),
+}
+
+
+def _table(name: str):
+    model_path, module_name, reader, writer = TABLES[name]
+    model_module, _, model_name = model_path.rpartition(".")
+    model = getattr(importlib.import_module(model_module), model_name)
+    module = importlib.import_module(module_name)
+    return model, getattr(module, reader), getattr(module, writer)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    to_binary = commands.add_parser("import", help="CSV -> instantánea binaria")
+    to_csv = commands.add_parser("export", help="instantánea binaria -> CSV")
+    for command in (to_binary, to_csv):
+        command.add_argument("table", choices=sorted(TABLES))
+        command.add_argument("source")
+        command.add_argument("target")
+    info = commands.add_parser("info", help="resumen de una instantánea")
+    info.add_argument("path")
+    info.add_argument("--id", type=int, help="Muestra el registro con este id.")
+    args = parser.parse_args()
+
+    if args.command == "info":
+        with SnapshotReader(args.path) as reader:
+            print(f"{args.path}: {len(reader)} filas, {os.path.getsize(args.path)} bytes, "
+                  f"registro de {reader.record.size} bytes")
+            print("Campos:", ", ".join(
+                f"{name}:{code}" + (f"/{scale}" if scale else "") for name, code, scale in reader.fields
+            ))
+            if args.id is not None:
+                print(reader.get(args.id))
+        return
+
+    model, read_csv, write_csv = _table(args.table)
+    if args.command == "import":
+        rows = read_csv(args.source)
+        write_snapshot(rows, args.target, model)
+    else:
+        rows = read_snapshot(args.source, model)
+        write_csv(rows, args.target)
+    print(f"{len(rows)} filas: {args.source} -> {args.target}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+import asyncio
+import os
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple, Type
+
+from pydantic import BaseModel
+from sqlalchemy import and_, delete, func, or_
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlmodel import SQLModel, select
+
+from operations.backends import StorageBackend
+from operations.records import CompactRecord, record_class
+from operations.repository import BeforeRemove, ChangeListener, RowsNotFound, decode_cursor, encode_cursor
+from operations.wal import MutationLog
+from utils.conection_db import create_tables
+from utils.files import FileLock
+
+# El canal entre workers se reinicia al superar este tamaño.
+CHANNEL_MAX_BYTES = 1024 * 1024
+
+
+# ------------------------ SQL (SQLite / Postgres) ------------------------
+
+class SQLBackend(StorageBackend):
+    """Tabla SQLModel con columnas indexadas; cada escritura es una transacción.
+
+    Usa el motor async de ``utils.conection_db`` (aiosqlite o asyncpg según
+    ``DATABASE_URL``) salvo que se le pase otro ``engine``/``session_factory``.
+
+    Con varios workers la base ya es común, pero los observadores (cachés,
+    estadísticas, feed) son de cada proceso: cada cambio confirmado se anexa
+    como (antes, después) a ``channel_path`` y los demás workers lo leen en
+    ``poll``. Si un worker se salta alguna rotación del canal, reconstruye
+    sus observadores desde la base (``_resync``).
+    """
+
+    name = "sql"
+
+    def __init__(
+        self,
+        sql_model: Type[SQLModel],
+        api_model: Type[BaseModel],
+        equal_fields: Iterable[str] = (),
+        range_fields: Iterable[str] = ("id",),
+        engine: Optional[AsyncEngine] = None,
+        session_factory=None,
+        channel_path: Optional[str] = None,
+    ):
+        if engine is None or session_factory is None:
+            from utils.conection_db import async_session, engine as default_engine
+            engine = engine or default_engine
+            session_factory = session_factory or async_session
+        self.sql_model = sql_model
+        self.api_model = api_model
+        self.record = record_class(api_model)
+        self.equal_fields = set(equal_fields)
+        self.range_fields = set(range_fields) | {"id"}
+        self.engine = engine
+        self.session_factory = session_factory
+        self.listeners: List[ChangeListener] = []
+        self.channel = MutationLog(channel_path, fsync=False) if channel_path else None
+        self.channel_lock = FileLock(f"{channel_path}.lock") if channel_path else None
+        # Dentro del proceso el canal se serializa con ``share_lock`` antes del cerrojo de archivo.
+        self.share_lock = asyncio.Lock()
+        self.resync: Optional[asyncio.Task] = None
+
+    def subscribe(self, listener: ChangeListener) -> None:
+        self.listeners.append(listener)
+
+    async def _notify(self, changes: Iterable[Tuple[Optional[CompactRecord], Optional[CompactRecord]]]) -> None:
+        # Se llama tras el commit: los observadores solo ven cambios confirmados.
+        changes = list(changes)
+        for before, after in changes:
+            for listener in self.listeners:
+                listener.on_change(before, after)
+        if self.channel is not None:
+            await self._share([
+                {"before": before and before.dict(), "after": after and after.dict()} for before, after in changes
+            ])
+
+    async def _share(self, records: List[dict]) -> None:
+        # Si otro worker tiene el cerrojo se espera en un hilo, no en el event loop.
+        async with self.share_lock, self.channel_lock.hold():
+            self.poll()
+            self.channel.append(records)
+            if os.path.getsize(self.channel.path) > CHANNEL_MAX_BYTES:
+                self.channel.truncate()
+            self.channel.mark_end()
+
+    def poll(self) -> None:
+        if self.channel is None or (self.resync is not None and not self.resync.done()):
+            return
+        if not self.channel.changed():
+            return
+        records = self.channel.follow()
+        if records is None:
+            # El canal rotó más de una vez desde la última lectura: los avisos intermedios se perdieron.
+            self.resync = asyncio.get_running_loop().create_task(self._resync())
+            return
+        for record in records:
+            if record.get("op") == "clear":
+                for listener in self.listeners:
+                    listener.on_reset(())
+                continue
+            before, after = record["before"], record["after"]
+            before = self.record(**before) if before is not None else None
+            after = self.record(**after) if after is not None else None
+            for listener in self.listeners:
+                listener.on_change(before, after)
+
+    async def _resync(self) -> None:
+        # Con el cerrojo del canal: lo que se comparta después se aplicará sobre la tabla leída.
+        async with self.share_lock, self.channel_lock.hold():
+            rows = await self.all()
+            self.channel.mark_end()
+            for listener in self.listeners:
+                listener.on_reset(rows)
+
+    def _to_api(self, row: SQLModel) -> CompactRecord:
+        # Igual que el backend CSV: registros compactos hasta el borde de la API.
+        return self.record(**row.model_dump())
+
+    def _validated(self, data: dict, row_id: int = 0) -> dict:
+        values = self.api_model(**{**data, "id": row_id}).dict()
+        values.pop("id")
+        return values
+
+    # ------------------------ CICLO DE VIDA ------------------------
+
+    async def startup(self) -> None:
+        if self.channel is None:
+            await self._create_table()
+        else:
+            # Los workers arrancan a la vez: uno solo crea la tabla.
+            async with self.share_lock, self.channel_lock.hold():
+                await self._create_table()
+                self.channel.mark_end()
+        if self.listeners:
+            rows = await self.all()
+            for listener in self.listeners:
+                listener.on_reset(rows)
+
+    async def _create_table(self) -> None:
+        async with self.engine.begin() as conn:
+            await conn.run_sync(create_tables, [self.sql_model.__table__])
+
+    # ------------------------ LECTURAS ------------------------
+
+    async def get(self, row_id: int) -> Optional[CompactRecord]:
+        async with self.session_factory() as session:
+            row = await session.get(self.sql_model, row_id)
+            return self._to_api(row) if row is not None else None
+
+    async def all(self) -> List[CompactRecord]:
+        async with self.session_factory() as session:
+            result = await session.execute(select(self.sql_model).order_by(self.sql_model.id))
+            return [self._to_api(row) for row in result.scalars()]
+
+    async def iterate(self, batch_size: int = 500) -> AsyncIterator[CompactRecord]:
+        last_id = None
+        while True:
+            statement = select(self.sql_model).order_by(self.sql_model.id).limit(batch_size)
+            if last_id is not None:
+                statement = statement.where(self.sql_model.id > last_id)
+            async with self.session_factory() as session:
+                rows = (await session.execute(statement)).scalars().all()
+            for row in rows:
+                yield self._to_api(row)
+            if len(rows) < batch_size:
+                return
+            last_id = rows[-1].id
+
+    async def find(self, field: str, value: Any) -> List[CompactRecord]:
+        rows, _ = await self.query(equals={field: value})
+        return rows
+
+    async def query(
+        self,
+        equals: Optional[Dict[str, Any]] = None,
+        ranges: Optional[Dict[str, Tuple[Any, Any]]] = None,
+        sort: str = "id",
+        descending: bool = False,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[CompactRecord], Optional[str]]:
+        equals = {field: value for field, value in (equals or {}).items() if value is not None}
+        ranges = {field: bounds for field, bounds in (ranges or {}).items() if bounds != (None, None)}
+        for field in equals:
+            if field not in self.equal_fields:
+                raise ValueError(f"Cannot filter by '{field}'")
+        for field in ranges:
+            if field not in self.range_fields:
+                raise ValueError(f"Cannot filter by range on '{field}'")
+        if sort not in self.range_fields:
+            raise ValueError(f"Cannot sort by '{sort}'")
+
+        model = self.sql_model
+        column = getattr(model, sort)
+        statement = select(model)
+        for field, value in equals.items():
+            statement = statement.where(getattr(model, field) == value)
+        for field, (low, high) in ranges.items():
+            if low is not None:
+                statement = statement.where(getattr(model, field) >= low)
+            if high is not None:
+                statement = statement.where(getattr(model, field) <= high)
+        if cursor:
+            value, row_id = decode_cursor(cursor, sort, descending)
+            if descending:
+                statement = statement.where(or_(column < value, and_(column == value, model.id < row_id)))
+            else:
+                statement = statement.where(or_(column > value, and_(column == value, model.id > row_id)))
+        if descending:
+            statement = statement.order_by(column.desc(), model.id.desc())
+        else:
+            statement = statement.order_by(column, model.id)
+        if limit is not None:
+            # Una fila extra para saber si hay página siguiente.
+            statement = statement.limit(limit + 1)
+
+        async with self.session_factory() as session:
+            rows = (await session.execute(statement)).scalars().all()
+        next_cursor = None
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = encode_cursor((getattr(last, sort), last.id), sort, descending)
+        return [self._to_api(row) for row in rows], next_cursor
+
+    async def count(self) -> int:
+        async with self.session_factory() as session:
+            return (await session.execute(select(func.count()).select_from(self.sql_model))).scalar_one()
+
+    async def missing(self, row_ids: Iterable[int]) -> List[int]:
+        row_ids = list(row_ids)
+        if not row_ids:
+            return []
+        async with self.session_factory() as session:
+            result = await session.execute(select(self.sql_model.id).where(self.sql_model.id.in_(row_ids)))
+            present = set(result.scalars())
+        return [row_id for row_id in row_ids if row_id not in present]
+
+    # ------------------------ ESCRITURAS ------------------------
+
+    async def insert(self, data: dict, row_id: Optional[int] = None) -> CompactRecord:
+        values = self._validated(data)
+        async with self.session_factory() as session:
+            async with session.begin():
+                if row_id is not None and await session.get(self.sql_model, row_id) is None:
+                    values["id"] = row_id
+                row = self.sql_model(**values)
+                session.add(row)
+                await session.flush()
+                created = self._to_api(row)
+        await self._notify([(None, created)])
+        return created
+
+    async def insert_many(self, items: List[dict]) -> List[CompactRecord]:
+        rows = [self.sql_model(**self._validated(data)) for data in items]
+        async with self.session_factory() as session:
+            async with session.begin():
+                session.add_all(rows)
+                await session.flush()
+                created = [self._to_api(row) for row in rows]
+        await self._notify((None, row) for row in created)
+        return created
+
+    def _apply(self, row: SQLModel, data: dict) -> Tuple[CompactRecord, CompactRecord]:
+        before = self._to_api(row)
+        values = self._validated({**row.model_dump(), **data}, row.id)
+        for key, value in values.items():
+            setattr(row, key, value)
+        return before, self._to_api(row)
+
+    async def update(self, row_id: int, data: dict) -> Optional[CompactRecord]:
+        async with self.session_factory() as session:
+            async with session.begin():
+                row = await session.get(self.sql_model, row_id, with_for_update=True)
+                if row is None:
+                    return None
+                before, after = self._apply(row, data)
+                await session.flush()
+        await self._notify([(before, after)])
+        return after
+
+    async def update_many(self, updates: Dict[int, dict]) -> List[CompactRecord]:
+        if not updates:
+            return []
+        async with self.session_factory() as session:
+            async with session.begin():
+                statement = (
+                    select(self.sql_model)
+                    .where(self.sql_model.id.in_(list(updates)))
+                    .with_for_update()
+                )
+                rows = {row.id: row for row in (await session.execute(statement)).scalars()}
+                # Filas bloqueadas (FOR UPDATE): si falta alguna se revierte la transacción entera.
+                missing = [row_id for row_id in updates if row_id not in rows]
+                if missing:
+                    raise RowsNotFound(missing)
+                changes = [self._apply(rows[row_id], data) for row_id, data in updates.items()]
+                await session.flush()
+        await self._notify(changes)
+        return [after for _, after in changes]
+
+    async def delete(self, row_id: int, before_remove: BeforeRemove = None) -> Optional[CompactRecord]:
+        async with self.session_factory() as session:
+            async with session.begin():
+                row = await session.get(self.sql_model, row_id, with_for_update=True)
+                if row is None:
+                    return None
+                removed = self._to_api(row)
+                if before_remove is not None:
+                    await before_remove([removed])
+                await session.delete(row)
+        await self._notify([(removed, None)])
+        return removed
+
+    async def delete_many(self, row_ids: Iterable[int], before_remove: BeforeRemove = None) -> List[CompactRecord]:
+        row_ids = list(dict.fromkeys(row_ids))
+        if not row_ids:
+            return []
+        async with self.session_factory() as session:
+            async with session.begin():
+                statement = select(self.sql_model).where(self.sql_model.id.in_(row_ids)).with_for_update()
+                rows = {row.id: row for row in (await session.execute(statement)).scalars()}
+                removed = [self._to_api(rows[row_id]) for row_id in row_ids if row_id in rows]
+                if before_remove is not None and removed:
+                    await before_remove(removed)
+                await session.execute(delete(self.sql_model).where(self.sql_model.id.in_(list(rows))))
+        await self._notify((row, None) for row in removed)
+        return removed
+
+    async def clear(self, before_remove: BeforeRemove = None) -> List[CompactRecord]:
+        async with self.session_factory() as session:
+            async with session.begin():
+                result = await session.execute(select(self.sql_model).order_by(self.sql_model.id))
+                removed = [self._to_api(row) for row in result.scalars()]
+                if before_remove is not None and removed:
+                    await before_remove(removed)
+                await session.execute(delete(self.sql_model))
+        for listener in self.listeners:
+            listener.on_reset(())
+        if self.channel is not None:
+            await self._share([{"op": "clear"}])
+        return removed
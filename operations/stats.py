@@ -0,0 +1,202 @@
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, Optional
+
+from pydantic import BaseModel
+
+from operations.repository import ChangeListener
+
+
+# ------------------------ DISTRIBUCIONES ------------------------
+
+class Distribution:
+    """Conteo, suma, mínimo/máximo e histograma de ancho fijo de un campo numérico.
+
+    Altas y bajas cuestan O(1); el mínimo/máximo solo se recalcula (sobre los
+    valores distintos) cuando se retira el valor extremo actual.
+    """
+
+    def __init__(self, bucket_width: float):
+        self.bucket_width = bucket_width
+        self.reset()
+
+    def reset(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.values: Dict[float, int] = {}
+        self.buckets: Dict[int, int] = {}
+        self._min: Optional[float] = None
+        self._max: Optional[float] = None
+        self._stale = False
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.values[value] = self.values.get(value, 0) + 1
+        bucket = int(value // self.bucket_width)
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        if not self._stale:
+            self._min = value if self._min is None else min(self._min, value)
+            self._max = value if self._max is None else max(self._max, value)
+
+    def remove(self, value: float) -> None:
+        self.count -= 1
+        self.total -= value
+        remaining = self.values[value] - 1
+        if remaining:
+            self.values[value] = remaining
+        else:
+            del self.values[value]
+            if value == self._min or value == self._max:
+                self._stale = True
+        bucket = int(value // self.bucket_width)
+        remaining = self.buckets[bucket] - 1
+        if remaining:
+            self.buckets[bucket] = remaining
+        else:
+            del self.buckets[bucket]
+
+    def _refresh(self) -> None:
+        if self._stale:
+            self._min = min(self.values) if self.values else None
+            self._max = max(self.values) if self.values else None
+            self._stale = False
+
+    def snapshot(self) -> dict:
+        self._refresh()
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count, 4) if self.count else None,
+            "min": self._min,
+            "max": self._max,
+            "buckets": [
+                {"from": bucket * self.bucket_width, "to": (bucket + 1) * self.bucket_width, "count": count}
+                for bucket, count in sorted(self.buckets.items())
+            ],
+        }
+
+
+# ------------------------ AGREGADOS POR TABLA ------------------------
+
+class TableStats(ChangeListener, ABC):
+    """Agregados que se mantienen al vuelo a partir de los cambios de una tabla."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    @abstractmethod
+    def reset(self) -> None:
+        ...
+
+    @abstractmethod
+    def add(self, row: BaseModel) -> None:
+        ...
+
+    @abstractmethod
+    def remove(self, row: BaseModel) -> None:
+        ...
+
+    @abstractmethod
+    def summary(self) -> dict:
+        ...
+
+    def on_change(self, before: Optional[BaseModel], after: Optional[BaseModel]) -> None:
+        with self.lock:
+            if before is not None:
+                self.remove(before)
+            if after is not None:
+                self.add(after)
+
+    def on_reset(self, rows: Iterable[BaseModel]) -> None:
+        with self.lock:
+            self.reset()
+            for row in rows:
+                self.add(row)
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return self.summary()
+
+
+class PlayerStats(TableStats):
+    def reset(self) -> None:
+        self.total = 0
+        self.dead = 0
+        self.health = Distribution(bucket_width=25)
+        self.armor = Distribution(bucket_width=10)
+
+    def add(self, row: BaseModel) -> None:
+        self.total += 1
+        self.dead += row.is_dead
+        self.health.add(row.health)
+        self.armor.add(row.armor)
+
+    def remove(self, row: BaseModel) -> None:
+        self.total -= 1
+        self.dead -= row.is_dead
+        self.health.remove(row.health)
+        self.armor.remove(row.armor)
+
+    def summary(self) -> dict:
+        return {
+            "total": self.total,
+            "alive": self.total - self.dead,
+            "dead": self.dead,
+            "health": self.health.snapshot(),
+            "armor": self.armor.snapshot(),
+        }
+
+
+def spawns_per_minute(enemy: BaseModel) -> float:
+    """Apariciones esperadas por minuto: ``60 / spawn × probability_spawn``.
+
+    ``spawn`` es el intervalo en segundos entre tiradas (el "tiempo de
+    aparición" del formulario), no una cantidad: el producto literal
+    ``spawn × probability_spawn`` crecería al espaciar las tiradas. Misma
+    lectura que ``simulation.SpawnPlan``, que también acota la probabilidad a [0, 1].
+    """
+    return min(max(enemy.probability_spawn, 0.0), 1.0) * 60.0 / enemy.spawn
+
+
+class EnemyStats(TableStats):
+    def reset(self) -> None:
+        self.total = 0
+        self.spawn_rate = 0.0
+        self.health = Distribution(bucket_width=50)
+        self.types: Dict[str, list] = {}
+
+    def add(self, row: BaseModel) -> None:
+        rate = spawns_per_minute(row)
+        self.total += 1
+        self.spawn_rate += rate
+        self.health.add(row.health)
+        entry = self.types.setdefault(row.type, [0, 0.0])
+        entry[0] += 1
+        entry[1] += rate
+
+    def remove(self, row: BaseModel) -> None:
+        rate = spawns_per_minute(row)
+        self.total -= 1
+        self.spawn_rate -= rate
+        self.health.remove(row.health)
+        entry = self.types[row.type]
+        entry[0] -= 1
+        entry[1] -= rate
+        if not entry[0]:
+            del self.types[row.type]
+
+    def summary(self) -> dict:
+        return {
+            "total": self.total,
+            "spawns_per_minute": round(max(self.spawn_rate, 0.0), 4),
+            "health": self.health.snapshot(),
+            "types": [
+                {"type": name, "count": count, "spawns_per_minute": round(max(rate, 0.0), 4)}
+                for name, (count, rate) in sorted(self.types.items())
+            ],
+        }
+
+
+player_stats = PlayerStats()
+enemy_stats = EnemyStats()
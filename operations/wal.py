@@ -0,0 +1,187 @@
+import json
+import os
+from typing import BinaryIO, Iterator, List, Optional
+
+from utils.files import replace_atomically
+from utils.metrics import timed
+
+
+# ------------------------ LOG DE MUTACIONES ------------------------
+
+class MutationLog:
+    """Log de solo-anexado con una mutación JSON por línea.
+
+    Cada registro describe el estado final de una fila (``put``), un borrado
+    (``delete``) o el vaciado de la tabla (``clear``), así que reaplicar el
+    log sobre una instantánea más reciente es idempotente.
+
+    Cada compactación empieza un log nuevo cuya primera línea es su número
+    de generación: quien siga el log desde otro proceso sabe si se saltó
+    alguna generación (y entonces debe recargar la instantánea).
+    """
+
+    def __init__(self, path: str, fsync: bool = True):
+        self.path = path
+        self.fsync = fsync
+        self.pending = 0
+        self.generation = 0
+        # Lectura incremental (modo multiproceso): descriptor abierto y bytes ya aplicados.
+        self.tail: Optional[BinaryIO] = None
+        self.inode = 0
+        self.position = 0
+
+    @timed("mutation_log.append")
+    def append(self, records: List[dict]) -> None:
+        if not records:
+            return
+        payload = "".join(json.dumps(record, separators=(",", ":")) + "\n" for record in records)
+        with open(self.path, mode="a", encoding="utf-8") as f:
+            f.write(payload)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        self.pending += len(records)
+
+    def replay(self) -> Iterator[dict]:
+        self.pending = 0
+        self.generation = 0
+        valid_size = 0
+        try:
+            with open(self.path, mode="rb") as f:
+                self._read_header(f)
+                valid_size = f.tell()
+                for raw in f:
+                    if not raw.endswith(b"\n"):
+                        # Última línea a medio escribir tras una caída: se descarta.
+                        break
+                    valid_size += len(raw)
+                    line = raw.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    self.pending += 1
+                    yield record
+        except FileNotFoundError:
+            return
+        if os.path.getsize(self.path) != valid_size:
+            with open(self.path, mode="rb+") as f:
+                f.truncate(valid_size)
+
+    @timed("mutation_log.truncate")
+    def truncate(self) -> None:
+        # Se reemplaza por un archivo nuevo en lugar de vaciarlo: quien siga el
+        # log (otro worker) termina de leer el anterior por su descriptor abierto.
+        # Quien compacta tiene el cerrojo y está al día: conoce la generación actual.
+        generation = self.generation + 1
+        header = json.dumps(generation_record(generation), separators=(",", ":")) + "\n"
+
+        def write(tmp_path: str) -> None:
+            with open(tmp_path, mode="w", encoding="utf-8") as f:
+                f.write(header)
+
+        replace_atomically(self.path, write)
+        self.generation = generation
+        self.pending = 0
+
+    def _read_header(self, f: BinaryIO) -> Optional[int]:
+        """Generación de la primera línea; ``None`` (y ``f`` al inicio) si el log no la tiene."""
+        raw = f.readline()
+        if raw.endswith(b"\n"):
+            try:
+                record = json.loads(raw)
+            except json.JSONDecodeError:
+                record = None
+            if isinstance(record, dict) and record.get("op") == "generation":
+                self.generation = record["value"]
+                return self.generation
+        f.seek(0)
+        return None
+
+    # ------------------------ SEGUIMIENTO ENTRE PROCESOS ------------------------
+
+    def _open_tail(self) -> None:
+        if self.tail is not None:
+            self.tail.close()
+        open(self.path, mode="ab").close()
+        self.tail = open(self.path, mode="rb")
+        self.inode = os.fstat(self.tail.fileno()).st_ino
+        self.generation = 0
+        self._read_header(self.tail)
+        self.position = self.tail.tell()
+
+    def mark_end(self) -> None:
+        """Da por aplicado todo lo escrito hasta ahora (tras cargar o anexar con el cerrojo)."""
+        if self.tail is None or os.stat(self.path).st_ino != self.inode:
+            self._open_tail()
+        self.position = self.tail.seek(0, os.SEEK_END)
+
+    def changed(self) -> bool:
+        """Comprobación barata (un ``stat``) de si otro proceso escribió o compactó."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        return stat.st_ino != self.inode or stat.st_size != self.position
+
+    def follow(self) -> Optional[List[dict]]:
+        """Registros completos anexados por otros procesos desde la última lectura.
+
+        Devuelve ``None`` si otro proceso compactó más de una vez desde
+        entonces: los logs intermedios ya no existen y lo que contenían solo
+        está en la instantánea.
+        """
+        if self.tail is None:
+            self.mark_end()
+            return []
+        records: List[dict] = []
+        while True:
+            # Se mira antes de leer: si ya estaba reemplazado, lo leído es el log viejo completo.
+            replaced = self._replaced()
+            records += self._read_tail()
+            if not replaced:
+                return records
+            expected = self.generation + 1
+            self._open_tail()
+            self.pending = 0
+            if self.generation != expected:
+                return None
+
+    def _replaced(self) -> bool:
+        try:
+            return os.stat(self.path).st_ino != self.inode
+        except FileNotFoundError:
+            return False
+
+    def _read_tail(self) -> List[dict]:
+        self.tail.seek(self.position)
+        data = self.tail.read()
+        # Una línea sin "\n" aún se está escribiendo: se lee en la próxima pasada.
+        end = data.rfind(b"\n") + 1
+        records = []
+        for line in data[:end].splitlines():
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+        self.position += end
+        self.pending += len(records)
+        return records
+
+
+def put_record(row: dict) -> dict:
+    return {"op": "put", "row": row}
+
+
+def delete_record(row_id: int) -> dict:
+    return {"op": "delete", "id": row_id}
+
+
+def clear_record() -> dict:
+    return {"op": "clear"}
+
+
+def generation_record(generation: int) -> dict:
+    return {"op": "generation", "value": generation}
@@ -0,0 +1,23 @@
+import atexit
+import os
+import shutil
+import tempfile
+
+import pytest
+from fastapi.testclient import TestClient
+
+# Las operaciones fijan sus rutas a partir de DATA_DIR al importarse: se
+# configura antes de recoger los tests para que ninguno toque Data/.
+DATA_DIR = tempfile.mkdtemp(prefix="game-data-")
+os.environ["DATA_DIR"] = DATA_DIR
+os.environ["HISTORY_SEGMENT_ROWS"] = "8"
+atexit.register(shutil.rmtree, DATA_DIR, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def client():
+    from benchmarks.datasets import write_dataset
+    write_dataset(DATA_DIR, 60, 30)
+    import main
+    with TestClient(main.app) as client:
+        yield client
@@ -0,0 +1,32 @@
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from starlette.testclient import TestClient
+
+from utils.assets import IMMUTABLE, REVALIDATE, AssetManifest, AssetStaticFiles
+
+
+def make_client(tmp_path):
+    static = tmp_path / "static"
+    (static / "css").mkdir(parents=True)
+    (static / "css" / "theme.css").write_text("body { color: red; }\n")
+    manifest = AssetManifest(str(static), cache_dir=str(tmp_path / "cache"))
+    app = Starlette(routes=[Mount("/static", AssetStaticFiles(directory=str(static), manifest=manifest))])
+    return TestClient(app), manifest, static
+
+
+def test_stale_fingerprint_serves_current_file_revalidated(tmp_path):
+    client, manifest, static = make_client(tmp_path)
+    old_url = manifest.url("css/theme.css")
+    response = client.get(old_url)
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == IMMUTABLE
+
+    # Despliegue: el archivo cambia y la URL vieja sigue en HTML ya servido.
+    (static / "css" / "theme.css").write_text("body { color: blue; }\n")
+    assert manifest.url("css/theme.css") != old_url
+    response = client.get(old_url)
+    assert response.status_code == 200
+    assert "blue" in response.text
+    assert response.headers["cache-control"] == REVALIDATE
+    assert client.get("/static/css/theme.000000000000.css").status_code == 200
+    assert client.get("/static/css/missing.000000000000.css").status_code == 404
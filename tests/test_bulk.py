@@ -0,0 +1,35 @@
+import pytest
+from fastapi import HTTPException
+
+from utils.bulk import split_patches
+
+
+def test_split_patches_keeps_one_patch_per_id():
+    assert split_patches([{"id": 1, "health": 5}, {"id": 2}]) == {1: {"health": 5}, 2: {}}
+
+
+def test_split_patches_rejects_repeated_id():
+    with pytest.raises(HTTPException) as error:
+        split_patches([{"id": 1, "health": 5}, {"id": 2}, {"id": 1, "health": 9}])
+    assert error.value.status_code == 422
+    assert error.value.detail == "Item 2 repeats id 1"
+
+
+@pytest.mark.parametrize("row_id", [True, False])
+def test_split_patches_rejects_boolean_id(row_id):
+    with pytest.raises(HTTPException) as error:
+        split_patches([{"id": 3}, {"id": row_id, "health": 1}])
+    assert error.value.status_code == 422
+    assert error.value.detail.startswith("Item 1 has a boolean 'id'")
+
+
+@pytest.mark.parametrize("resource", ["players", "enemies"])
+def test_bulk_patch_rejects_ambiguous_ids_without_writing(client, resource):
+    before = client.get(f"/{resource}/1").json()
+    assert before["id"] == 1
+    response = client.patch(f"/{resource}/bulk/", json=[{"id": 1, "health": 1}, {"id": 1, "health": 2}])
+    assert response.status_code == 422
+    assert "repeats id 1" in response.json()["detail"]
+    response = client.patch(f"/{resource}/bulk/", json=[{"id": True, "health": 1}])
+    assert response.status_code == 422
+    assert client.get(f"/{resource}/1").json() == before
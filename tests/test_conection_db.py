@@ -0,0 +1,69 @@
+import asyncio
+import sqlite3
+
+import pytest
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from modelos.player_sql import PlayerModel
+from utils import conection_db
+from utils.conection_db import create_tables, engine_options
+
+
+def test_create_tables_adds_new_columns_to_existing_table(tmp_path):
+    path = tmp_path / "game.db"
+    # Tabla tal como la creaba el modelo original.
+    with sqlite3.connect(path) as db:
+        db.execute("CREATE TABLE players (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, "
+                   "health INTEGER NOT NULL, armor INTEGER NOT NULL)")
+        db.execute("INSERT INTO players (name, health, armor) VALUES ('Old', 10, 2)")
+
+    async def scenario():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        async with engine.begin() as conn:
+            await conn.run_sync(create_tables, [PlayerModel.__table__])
+            # Idempotente: la segunda vez no hay nada que añadir.
+            await conn.run_sync(create_tables, [PlayerModel.__table__])
+            indexes = await conn.run_sync(lambda sync: {index["name"] for index in inspect(sync).get_indexes("players")})
+        async with AsyncSession(engine) as session:
+            players = (await session.exec(select(PlayerModel))).all()
+        await engine.dispose()
+        return players, indexes
+
+    players, indexes = asyncio.run(scenario())
+    assert [(player.name, player.speed, player.is_dead, player.image) for player in players] == [("Old", 1.0, False, None)]
+    assert "ix_players_speed" in indexes
+
+
+def test_pool_counts_only_blocked_checkouts_as_waits(tmp_path, monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE", "1")
+    monkeypatch.setenv("DB_MAX_OVERFLOW", "0")
+    monkeypatch.setenv("DB_POOL_TIMEOUT", "0.2")
+    monkeypatch.setattr(conection_db, "pool_stats", conection_db.PoolStats())
+    url = f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}"
+
+    async def scenario():
+        engine = create_async_engine(url, **engine_options(url))
+
+        async def hold(seconds):
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+                await asyncio.sleep(seconds)
+
+        # Secuenciales: la conexión siempre está libre.
+        for _ in range(3):
+            await hold(0)
+        # Concurrentes con pool de 1: la segunda espera a la primera; la tercera agota el timeout.
+        await asyncio.gather(hold(0.05), hold(0))
+        with pytest.raises(TimeoutError):
+            await asyncio.gather(hold(0.5), hold(0))
+        await engine.dispose()
+
+    asyncio.run(scenario())
+    metrics = conection_db.pool_metrics()
+    assert metrics["wait_count"] == 2
+    assert metrics["timeouts"] == 1
+    assert metrics["wait_seconds_max"] >= 0.04
@@ -0,0 +1,38 @@
+import csv
+import io
+import itertools
+import json
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from operations import history
+
+START = 1_700_000_000
+
+
+@pytest.mark.parametrize("table", ["players", "enemies"])
+def test_streamed_deleted_rows_match_filtered_json(client, monkeypatch, table):
+    # Un segundo por borrado: las ventanas de fechas caen entre borrados concretos.
+    clock = itertools.count(START)
+    monkeypatch.setattr(history, "time", SimpleNamespace(time=lambda: float(next(clock))))
+    for row_id in range(1, 21):
+        assert client.delete(f"/{table}/{row_id}").status_code == 200
+    # Una lápida dentro de la ventana.
+    assert client.post(f"/{table}/5/restore").status_code == 200
+
+    params = {
+        "since": datetime.fromtimestamp(START + 2).isoformat(),
+        "until": datetime.fromtimestamp(START + 17).isoformat(),
+        "offset": 3,
+        "limit": 9,
+    }
+    rows = client.get(f"/{table}/deleted/", params=params).json()
+    ndjson = client.get(f"/{table}/deleted/", params={**params, "format": "ndjson"}).text
+    exported = client.get(f"/{table}/deleted/", params={**params, "format": "csv"}).text
+
+    expected = [3, 4, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15, 16, 17, 18][3:12]
+    assert [row["id"] for row in rows] == expected
+    assert [json.loads(line) for line in ndjson.splitlines()] == rows
+    assert [int(row["id"]) for row in csv.DictReader(io.StringIO(exported))] == expected
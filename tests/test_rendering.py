@@ -0,0 +1,28 @@
+from fastapi.templating import Jinja2Templates
+
+from utils import rendering
+from utils.assets import AssetManifest
+from utils.rendering import PageRenderer
+
+
+def test_cached_pages_follow_asset_fingerprints(tmp_path, monkeypatch):
+    monkeypatch.setattr(rendering, "ASSET_CHECK_SECONDS", 0)
+    static, pages = tmp_path / "static", tmp_path / "templates"
+    (static / "css").mkdir(parents=True)
+    pages.mkdir()
+    css = static / "css" / "theme.css"
+    css.write_text("body { color: red; }\n")
+    (pages / "nav.html").write_text("<link href=\"{{ static_url('css/theme.css') }}\">")
+    (pages / "home.html").write_text("{{ fragment('nav.html') }}<img src=\"{{ static_url('css/theme.css') }}\">")
+    manifest = AssetManifest(str(static), cache_dir=str(tmp_path / "cache"))
+    renderer = PageRenderer(Jinja2Templates(directory=str(pages)), manifest=manifest)
+    renderer.static_page("home", "home.html")
+    renderer.prerender()
+    before = manifest.url("css/theme.css")
+    assert renderer.page("home").body.decode().count(before) == 2
+
+    css.write_text("body { color: blue; }\n")
+    after = manifest.url("css/theme.css")
+    body = renderer.page("home").body.decode()
+    assert before not in body
+    assert body.count(after) == 2
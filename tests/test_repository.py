@@ -0,0 +1,305 @@
+import asyncio
+import base64
+import csv
+import json
+import os
+import threading
+from typing import List
+
+import pytest
+from pydantic import BaseModel
+
+from operations.repository import Repository, RowsNotFound
+
+
+class Item(BaseModel):
+    id: int
+    name: str
+
+
+def read_items(path: str) -> List[Item]:
+    try:
+        with open(path, newline="", encoding="utf-8") as f:
+            return [Item(id=int(row["id"]), name=row["name"]) for row in csv.DictReader(f)]
+    except FileNotFoundError:
+        return []
+
+
+def write_items(rows, path: str) -> None:
+    with open(path, mode="w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=["id", "name"])
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row.dict())
+
+
+def make_repository(directory, shared: bool = False) -> Repository:
+    return Repository(
+        Item,
+        path=os.path.join(directory, "items.csv"),
+        loader=read_items,
+        writer=write_items,
+        log_path=os.path.join(directory, "items.log"),
+        indexes=("name",),
+        shared=shared,
+    )
+
+
+def names(repository: Repository) -> dict:
+    return {row.id: row.name for row in repository.all()}
+
+
+# ------------------------ ESCRITURAS ------------------------
+
+def test_ids_continue_after_the_highest_id(tmp_path):
+    async def scenario():
+        repository = make_repository(tmp_path)
+        repository.load()
+        first = await repository.insert_many([{"name": name} for name in "abc"])
+        await repository.delete(2)
+        after_gap = await repository.insert({"name": "d"})
+        await repository.insert({"name": "e"}, row_id=10)
+        return [row.id for row in first], after_gap.id, repository.next_id()
+
+    assert asyncio.run(scenario()) == ([1, 2, 3], 4, 11)
+
+
+def test_update_many_is_all_or_nothing(tmp_path):
+    async def scenario():
+        repository = make_repository(tmp_path)
+        repository.load()
+        await repository.insert_many([{"name": "a"}, {"name": "b"}])
+        await repository.delete(2)
+        with pytest.raises(RowsNotFound) as error:
+            await repository.update_many({1: {"name": "a2"}, 2: {"name": "b2"}})
+        return error.value.ids
+
+    assert asyncio.run(scenario()) == [2]
+    reloaded = make_repository(tmp_path)
+    reloaded.load()
+    assert names(reloaded) == {1: "a"}
+
+
+def test_delete_runs_before_remove_before_committing(tmp_path):
+    archived = []
+
+    async def archive(rows):
+        # Lo que se archiva aún está en la tabla y en el log.
+        archived.extend((row.id, repository.get(row.id) is not None) for row in rows)
+
+    async def failing_archive(rows):
+        raise OSError("disk full")
+
+    async def scenario():
+        repository.load()
+        await repository.insert_many([{"name": name} for name in "abc"])
+        await repository.delete(1, archive)
+        await repository.delete_many([2, 9], archive)
+        with pytest.raises(OSError):
+            await repository.delete(3, failing_archive)
+
+    repository = make_repository(tmp_path)
+    asyncio.run(scenario())
+    assert archived == [(1, True), (2, True)]
+    reloaded = make_repository(tmp_path)
+    reloaded.load()
+    assert names(reloaded) == {3: "c"}
+
+
+# ------------------------ LOG Y COMPACTACIÓN ------------------------
+
+def test_replay_after_crash_discards_torn_line(tmp_path):
+    async def scenario():
+        repository = make_repository(tmp_path)
+        repository.load()
+        await repository.insert_many([{"name": name} for name in "abc"])
+        await repository.compact()
+        await repository.update(1, {"name": "a2"})
+        await repository.delete(2)
+
+    asyncio.run(scenario())
+    log_path = tmp_path / "items.log"
+    committed = log_path.stat().st_size
+    # Caída a mitad de una escritura: la última línea queda sin terminar.
+    with open(log_path, "ab") as f:
+        f.write(b'{"op": "put", "row": {"id": 4, "na')
+
+    reloaded = make_repository(tmp_path)
+    reloaded.load()
+    assert names(reloaded) == {1: "a2", 3: "c"}
+    assert reloaded.find("name", "a2")[0].id == 1
+    assert log_path.stat().st_size == committed
+    # Lo que se escribe después de recuperar la caída también se conserva.
+    asyncio.run(reloaded.insert({"name": "d"}))
+    again = make_repository(tmp_path)
+    again.load()
+    assert names(again) == {1: "a2", 3: "c", 4: "d"}
+
+
+def test_compact_writes_snapshot_and_empties_log(tmp_path):
+    async def scenario():
+        repository = make_repository(tmp_path)
+        repository.load()
+        await repository.insert_many([{"name": name} for name in "abc"])
+        await repository.update(3, {"name": "c2"})
+        await repository.delete(1)
+        await repository.compact()
+        return names(repository)
+
+    before = asyncio.run(scenario())
+    assert [(row.id, row.name) for row in read_items(str(tmp_path / "items.csv"))] == [(2, "b"), (3, "c2")]
+    lines = (tmp_path / "items.log").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["op"] for line in lines] == ["generation"]
+    reloaded = make_repository(tmp_path)
+    reloaded.load()
+    assert names(reloaded) == before
+    assert reloaded.log.pending == 0
+    assert reloaded.next_id() == 4
+
+
+# ------------------------ VARIOS WORKERS ------------------------
+
+def test_shared_writer_reloads_after_skipped_compactions(tmp_path):
+    async def scenario():
+        a, b = make_repository(tmp_path, shared=True), make_repository(tmp_path, shared=True)
+        a.load()
+        b.load()
+        await a.insert({"name": "x"})
+        await a.compact()
+        await a.insert({"name": "y"})
+        await a.compact()
+        # b se saltó dos generaciones del log: debe recargar la instantánea antes de escribir.
+        z = await b.insert({"name": "z"})
+        await b.compact()
+        return z
+
+    z = asyncio.run(scenario())
+    assert z.id == 3
+    reloaded = make_repository(tmp_path)
+    reloaded.load()
+    assert names(reloaded) == {1: "x", 2: "y", 3: "z"}
+
+
+def test_shared_reader_follows_log_and_compactions(tmp_path, monkeypatch):
+    async def scenario():
+        writer, reader = make_repository(tmp_path, shared=True), make_repository(tmp_path, shared=True)
+        writer.load()
+        reader.load()
+        await writer.insert({"name": "x"})
+        assert names(reader) == {1: "x"}
+        await writer.compact()
+        await writer.update(1, {"name": "x2"})
+        # Una sola compactación: se sigue el log nuevo sin recargar.
+        assert names(reader) == {1: "x2"}
+        for name in ("y", "z"):
+            await writer.insert({"name": name})
+            await writer.compact()
+        await writer.delete(1)
+        # Se saltó una generación: la lectura no espera a recargar la instantánea...
+        assert names(reader) == {1: "x2"}
+        assert reader.stale
+        # ...que se recarga en segundo plano, fuera del event loop.
+        await reader._catching_up
+        assert names(reader) == {2: "y", 3: "z"}
+        assert not reader.stale
+        return loaded_in
+
+    loaded_in = []
+    original_read = Repository._read
+
+    def read(repository):
+        loaded_in.append(threading.current_thread() is threading.main_thread())
+        return original_read(repository)
+
+    monkeypatch.setattr(Repository, "_read", read)
+    assert asyncio.run(scenario())[-1] is False
+
+
+# ------------------------ CONSULTAS ------------------------
+
+class Unit(BaseModel):
+    id: int
+    team: str
+    level: int
+
+
+def make_units(count: int = 40) -> Repository:
+    # Niveles con muchos empates (0..3); uno de cada diez en el equipo rojo.
+    repository = Repository(Unit, indexes=("team",), sorted_indexes=("level",))
+    repository.load()
+    rows = [{"team": "red" if row_id % 10 == 1 else "blue", "level": row_id % 4} for row_id in range(1, count + 1)]
+    asyncio.run(repository.insert_many(rows))
+    return repository
+
+
+def walk(repository: Repository, limit: int, cursor=None, **query) -> List[int]:
+    seen = []
+    while True:
+        page, cursor = repository.query(limit=limit, cursor=cursor, **query)
+        seen += [row.id for row in page]
+        if cursor is None:
+            return seen
+
+
+def expected(repository: Repository, descending: bool = False, team=None, levels=(None, None)) -> List[int]:
+    low, high = levels
+    rows = [
+        row for row in repository.all()
+        if (team is None or row.team == team)
+        and (low is None or row.level >= low) and (high is None or row.level <= high)
+    ]
+    return [row.id for row in sorted(rows, key=lambda row: (row.level, row.id), reverse=descending)]
+
+
+@pytest.mark.parametrize("descending", [False, True])
+@pytest.mark.parametrize("limit", [1, 3, 7, 10])
+def test_query_pages_across_equal_sort_values(descending, limit):
+    repository = make_units()
+    # Páginas que cortan en medio de un grupo de niveles iguales: ni huecos ni repetidos.
+    assert walk(repository, limit, sort="level", descending=descending) == expected(repository, descending)
+
+
+@pytest.mark.parametrize("descending", [False, True])
+@pytest.mark.parametrize("team", ["red", "blue"])
+def test_query_intersects_hash_and_range_filters(descending, team):
+    # Los pocos rojos se ordenan aparte; para los azules se recorre el índice ordenado.
+    repository = make_units(400)
+    query = {"equals": {"team": team}, "ranges": {"level": (1, 2)}}
+    want = expected(repository, descending, team, (1, 2))
+    assert len(want) >= 20
+    assert walk(repository, 4, sort="level", descending=descending, **query) == want
+    assert walk(repository, 4, sort="id", descending=descending, **query) == sorted(want, reverse=descending)
+    assert repository.query(equals={"team": "green"}, ranges={"level": (0, 3)}) == ([], None)
+
+
+def test_query_cursor_survives_deleting_its_last_row():
+    repository = make_units()
+    page, cursor = repository.query(sort="level", limit=5)
+    # La fila donde quedó el cursor y la siguiente desaparecen antes de pedir la página 2.
+    following = expected(repository)[5:]
+    asyncio.run(repository.delete_many([page[-1].id, following[0]]))
+    rest = walk(repository, 5, sort="level", cursor=cursor)
+    assert rest == following[1:]
+
+
+@pytest.mark.parametrize("tamper", [
+    lambda cursor: cursor[:-3] + "!!!",
+    lambda cursor: cursor[:-2],
+    lambda cursor: base64.urlsafe_b64encode(b'["level", false, 1]').decode(),
+    lambda cursor: base64.urlsafe_b64encode(b'["level", false, "high", 3]').decode(),
+    lambda cursor: base64.urlsafe_b64encode(b'["level", false, 1, "3"]').decode(),
+])
+def test_query_rejects_tampered_cursor(tamper):
+    repository = make_units()
+    _, cursor = repository.query(sort="level", limit=5)
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        repository.query(sort="level", limit=5, cursor=tamper(cursor))
+
+
+def test_query_rejects_cursor_from_another_sort():
+    repository = make_units()
+    _, cursor = repository.query(sort="level", limit=5)
+    with pytest.raises(ValueError, match="does not match"):
+        repository.query(sort="level", descending=True, cursor=cursor)
+    with pytest.raises(ValueError, match="does not match"):
+        repository.query(sort="id", cursor=cursor)
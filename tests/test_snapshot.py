@@ -0,0 +1,115 @@
+import asyncio
+import os
+import struct
+import subprocess
+import sys
+
+import pytest
+from pydantic import BaseModel
+
+from benchmarks.datasets import write_dataset
+from operations.operations_player import read_players_from_csv
+from operations.repository import Repository
+from operations.snapshot import HEADER, SnapshotReader, SnapshotRows, read_snapshot, table_files, write_snapshot
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Sample(BaseModel):
+    id: int
+    price: float
+    ratio: float
+    big: float
+    label: str
+
+
+def snapshot_tool(*args: str) -> str:
+    result = subprocess.run(
+        [sys.executable, "-m", "operations.snapshot", *args],
+        cwd=ROOT, env=os.environ, capture_output=True, text=True, check=True,
+    )
+    return result.stdout
+
+
+# ------------------------ FORMATO ------------------------
+
+def test_cli_import_info_export_round_trip(tmp_path):
+    write_dataset(str(tmp_path), 50, 0)
+    source, snapshot, exported = (str(tmp_path / name) for name in ("players.csv", "players.snap", "out.csv"))
+    assert "50 filas" in snapshot_tool("import", "players", source, snapshot)
+    info = snapshot_tool("info", snapshot, "--id", "7")
+    assert "50 filas" in info and "'id': 7" in info
+    snapshot_tool("export", "players", snapshot, exported)
+
+    original = [row.model_dump() for row in read_players_from_csv(source)]
+    assert [row.model_dump() for row in read_players_from_csv(exported)] == original
+    assert os.path.getsize(snapshot) < os.path.getsize(source)
+
+
+def test_floats_use_the_narrowest_exact_encoding(tmp_path):
+    rows = [
+        Sample(id=row_id, price=row_id * 1.25, ratio=1 / row_id, big=2.0 ** (60 + row_id), label="x")
+        for row_id in (3, 1, 2)
+    ]
+    path = str(tmp_path / "sample.snap")
+    write_snapshot(rows, path, Sample)
+    with SnapshotReader(path, Sample) as reader:
+        codes = {name: (code, scale) for name, code, scale in reader.fields}
+        assert codes["price"] == ("h", 100)
+        assert codes["ratio"] == ("d", 0)
+        assert codes["big"] == ("f", 0)
+        # Escritos en orden de id: el id se busca en su propia columna.
+        assert list(reader.ids()) == [1, 2, 3]
+        assert reader.get(2) == rows[2]
+        assert reader.get(4) is None
+    assert read_snapshot(path, Sample) == sorted(rows, key=lambda row: row.id)
+
+
+@pytest.mark.parametrize("damage, message", [
+    (lambda data: data[:10], "not a snapshot"),
+    (lambda data: b"XXXX" + data[4:], "not a snapshot"),
+    (lambda data: data[:4] + struct.pack("<H", 99) + data[6:], "Unsupported snapshot version 99"),
+    (lambda data: data[:HEADER.size] + b"{oops" + data[HEADER.size + 5:], "corrupt snapshot schema"),
+    (lambda data: data[:len(data) // 2], "truncated or corrupt"),
+    (lambda data: data[:-3], "truncated or corrupt"),
+])
+def test_damaged_snapshots_are_rejected(tmp_path, damage, message):
+    rows = [Sample(id=row_id, price=1.5, ratio=0.1, big=1.0, label=f"label{row_id}") for row_id in range(1, 40)]
+    path = tmp_path / "sample.snap"
+    write_snapshot(rows, str(path), Sample)
+    path.write_bytes(damage(path.read_bytes()))
+    with pytest.raises(ValueError, match=message):
+        SnapshotReader(str(path), Sample)
+
+
+# ------------------------ REPOSITORIO ------------------------
+
+def test_repository_reads_binary_rows_from_the_snapshot(tmp_path):
+    def make_repository() -> Repository:
+        files = table_files(Sample, str(tmp_path / "sample.csv"), str(tmp_path / "sample.snap"),
+                            lambda path: [], lambda rows, path: None, "binary")
+        return Repository(Sample, **files, log_path=str(tmp_path / "sample.log"),
+                          indexes=("label",), sorted_indexes=("price",))
+
+    write_snapshot([Sample(id=row_id, price=row_id / 2, ratio=0.5, big=1.0, label="a") for row_id in range(1, 6)],
+                   str(tmp_path / "sample.snap"), Sample)
+
+    async def scenario(repository):
+        repository.load()
+        assert isinstance(repository.rows, SnapshotRows)
+        await repository.update(2, {"label": "b"})
+        await repository.delete(3)
+        await repository.insert({"price": 9.0, "ratio": 0.5, "big": 1.0, "label": "b"})
+        assert [row.id for row in repository.find("label", "b")] == [2, 6]
+        assert [row.id for row in repository.query(ranges={"price": (1.0, 9.0)})[0]] == [2, 4, 5, 6]
+        await repository.compact()
+        # Tras compactar, las filas vuelven al mmap: nada pendiente en memoria.
+        assert not repository.rows.changed and not repository.rows.added
+        return {row.id: (row.label, row.price) for row in repository.all()}
+
+    expected = {1: ("a", 0.5), 2: ("b", 1.0), 4: ("a", 2.0), 5: ("a", 2.5), 6: ("b", 9.0)}
+    assert asyncio.run(scenario(make_repository())) == expected
+    reloaded = make_repository()
+    reloaded.load()
+    assert {row.id: (row.label, row.price) for row in reloaded.all()} == expected
+    assert reloaded.find("label", "a")[0].id == 1
@@ -0,0 +1,45 @@
+from types import SimpleNamespace
+
+import pytest
+
+from models import EnemyWithID
+from operations.simulation import SpawnPlan
+from operations.stats import EnemyStats, spawns_per_minute
+
+np = pytest.importorskip("numpy")
+
+
+def enemy(row_id, type, spawn, probability):
+    return EnemyWithID(id=row_id, name=f"e{row_id}", speed=1, jump=1, hit_speed=1, health=100,
+                       type=type, spawn=spawn, probability_spawn=probability)
+
+
+ENEMIES = [enemy(1, "goblin", 3.0, 0.5), enemy(2, "goblin", 30.0, 0.5), enemy(3, "orc", 2.0, 1.5)]
+
+
+def test_spawn_rate_reads_spawn_as_interval():
+    # Cada 3 s con 50 %: 10 por minuto. Espaciar las tiradas baja la tasa.
+    assert spawns_per_minute(ENEMIES[0]) == pytest.approx(10.0)
+    assert spawns_per_minute(ENEMIES[1]) == pytest.approx(1.0)
+    # Probabilidad por encima de 1: aparece en todas las tiradas, como en la simulación.
+    assert spawns_per_minute(ENEMIES[2]) == pytest.approx(30.0)
+
+
+def test_dashboard_rate_matches_simulation_plan():
+    stats = EnemyStats()
+    stats.on_reset(ENEMIES)
+    types = np.array(["goblin", "orc"])
+    table = SimpleNamespace(
+        size=len(ENEMIES),
+        columns={
+            "id": np.array([row.id for row in ENEMIES], dtype=float),
+            "spawn": np.array([row.spawn for row in ENEMIES]),
+            "probability_spawn": np.array([row.probability_spawn for row in ENEMIES]),
+        },
+        codes={"type": np.searchsorted(types, [row.type for row in ENEMIES])},
+        labels={"type": types},
+    )
+    summary = stats.snapshot()
+    assert summary["spawns_per_minute"] == pytest.approx(SpawnPlan(table).expected_per_minute())
+    assert summary["types"][0] == {"type": "goblin", "count": 2, "spawns_per_minute": 11.0}
+    assert summary["types"][1]["spawns_per_minute"] == pytest.approx(SpawnPlan(table, ["orc"]).expected_per_minute())
@@ -0,0 +1,30 @@
+import pytest
+
+from utils import uploads
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def test_thumbnails_shrink_from_largest_to_smallest(tmp_path, monkeypatch):
+    monkeypatch.setattr(uploads, "THUMBNAIL_DIR", str(tmp_path / "thumbs"))
+    monkeypatch.setattr(uploads, "ready_thumbnails", set())
+    source = tmp_path / "sprite.png"
+    Image.new("P", (300, 200), 3).save(source)
+    opened = []
+    real_open = Image.open
+    monkeypatch.setattr(Image, "open", lambda *args, **kwargs: opened.append(args) or real_open(*args, **kwargs))
+
+    uploads.make_thumbnails(str(source))
+
+    assert len(opened) == 1
+    sizes = {}
+    for size in uploads.THUMBNAIL_SIZES:
+        with real_open(tmp_path / "thumbs" / uploads.thumbnail_name("sprite.png", size)) as thumb:
+            assert thumb.mode == "RGBA"
+            sizes[size] = thumb.size
+    assert sizes == {150: (150, 100), 64: (64, 43)}
+    assert uploads.ready_thumbnails == {"sprite_64.png", "sprite_150.png"}
+
+    # Si ya existen, no se vuelve a abrir el original.
+    uploads.make_thumbnails(str(source))
+    assert len(opened) == 1
@@ -0,0 +1,206 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import stat
+import threading
+from typing import Dict, Optional, Tuple
+
+import anyio
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse
+from starlette.types import Scope
+
+from utils.metrics import timed
+
+try:
+    import brotli
+except ImportError:  # Sin brotli solo se generan variantes gzip.
+    brotli = None
+
+STATIC_DIR = "static"
+STATIC_URL = "/static"
+ASSET_CACHE_DIR = os.getenv("ASSET_CACHE_DIR", ".asset_cache")
+FINGERPRINT_DIRS = ("css", "uploads")
+COMPRESSIBLE = {".css", ".js", ".svg", ".html", ".json", ".txt", ".map"}
+MIN_COMPRESS_BYTES = 256
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+# nombre.<12 hex>.ext -> nombre.ext
+FINGERPRINTED = re.compile(r"^(?P<stem>.+)\.(?P<digest>[0-9a-f]{12})(?P<ext>\.[^./]+)$")
+
+
+# ------------------------ MANIFIESTO ------------------------
+
+class AssetManifest:
+    """Huella (sha256 truncado) de cada archivo estático y sus variantes comprimidas.
+
+    La huella se recalcula solo si cambian el mtime o el tamaño del archivo,
+    así un archivo editado en caliente recibe una URL nueva.
+    """
+
+    def __init__(self, directory: str = STATIC_DIR, url_prefix: str = STATIC_URL, cache_dir: str = ASSET_CACHE_DIR):
+        self.directory = directory
+        self.url_prefix = url_prefix
+        self.cache_dir = cache_dir
+        self.entries: Dict[str, Tuple[int, int, str]] = {}
+        self.lock = threading.Lock()
+
+    def _relative(self, path: str) -> str:
+        if path.startswith(self.url_prefix + "/"):
+            path = path[len(self.url_prefix) + 1:]
+        return path.lstrip("/")
+
+    def fingerprint(self, path: str) -> Optional[str]:
+        relative = self._relative(path)
+        if os.path.normpath(relative).startswith(".."):
+            return None
+        full_path = os.path.join(self.directory, relative)
+        try:
+            stat_result = os.stat(full_path)
+        except OSError:
+            return None
+        if not stat.S_ISREG(stat_result.st_mode):
+            return None
+        entry = self.entries.get(relative)
+        if entry is not None and entry[:2] == (stat_result.st_mtime_ns, stat_result.st_size):
+            return entry[2]
+        digest = hashlib.sha256()
+        with open(full_path, mode="rb") as f:
+            for chunk in iter(lambda: f.read(64 * 1024), b""):
+                digest.update(chunk)
+        fingerprint = digest.hexdigest()[:12]
+        with self.lock:
+            self.entries[relative] = (stat_result.st_mtime_ns, stat_result.st_size, fingerprint)
+        return fingerprint
+
+    def url(self, path: str) -> str:
+        """URL con huella de ``path`` (``css/x.css`` o ``/static/css/x.css``)."""
+        if path.startswith(("http://", "https://", "//")):
+            return path
+        relative = self._relative(path)
+        fingerprint = self.fingerprint(relative)
+        if fingerprint is None:
+            return f"{self.url_prefix}/{relative}"
+        stem, ext = os.path.splitext(relative)
+        return f"{self.url_prefix}/{stem}.{fingerprint}{ext}"
+
+    def resolve(self, path: str) -> Tuple[str, bool]:
+        """Ruta real pedida y si puede servirse como inmutable (huella vigente)."""
+        match = FINGERPRINTED.match(path)
+        if match is None:
+            return path, False
+        original = match.group("stem") + match.group("ext")
+        current = self.fingerprint(original)
+        if current == match.group("digest"):
+            return original, True
+        if current is not None and self.fingerprint(path) is None:
+            # Huella antigua (HTML de antes de un despliegue): se sirve el archivo
+            # actual, revalidado, en lugar de un 404.
+            return original, False
+        return path, False
+
+    # ------------------------ VARIANTES COMPRIMIDAS ------------------------
+
+    def variant_path(self, relative: str, encoding: str) -> Optional[str]:
+        fingerprint = self.fingerprint(relative)
+        if fingerprint is None:
+            return None
+        suffix = "br" if encoding == "br" else "gz"
+        return os.path.join(self.cache_dir, f"{relative}.{fingerprint}.{suffix}")
+
+    def compressible(self, relative: str) -> bool:
+        return os.path.splitext(relative)[1].lower() in COMPRESSIBLE
+
+    def variant(self, relative: str, accept_encoding: str) -> Optional[Tuple[str, str]]:
+        if not self.compressible(relative):
+            return None
+        accepted = {token.split(";")[0].strip().lower() for token in accept_encoding.split(",")}
+        for encoding in ("br", "gzip"):
+            if encoding in accepted:
+                path = self.variant_path(relative, encoding)
+                if path is not None and os.path.exists(path):
+                    return encoding, path
+        return None
+
+    def _compress(self, relative: str) -> None:
+        full_path = os.path.join(self.directory, relative)
+        if os.path.getsize(full_path) < MIN_COMPRESS_BYTES:
+            return
+        with open(full_path, mode="rb") as f:
+            data = f.read()
+        encoders = [("gzip", lambda raw: gzip.compress(raw, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            encoders.append(("br", lambda raw: brotli.compress(raw, quality=11)))
+        for encoding, encode in encoders:
+            target = self.variant_path(relative, encoding)
+            if target is None or os.path.exists(target):
+                continue
+            compressed = encode(data)
+            if len(compressed) >= len(data):
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            tmp_path = f"{target}.{os.getpid()}.tmp"
+            with open(tmp_path, mode="wb") as f:
+                f.write(compressed)
+            os.replace(tmp_path, target)
+
+    @timed("assets.build")
+    def build(self) -> None:
+        """Calcula huellas de FINGERPRINT_DIRS y genera las variantes gzip/br."""
+        for directory in FINGERPRINT_DIRS:
+            root = os.path.join(self.directory, directory)
+            for current, _, files in os.walk(root):
+                for name in files:
+                    relative = os.path.relpath(os.path.join(current, name), self.directory).replace(os.sep, "/")
+                    if self.fingerprint(relative) is not None and self.compressible(relative):
+                        self._compress(relative)
+
+
+assets = AssetManifest()
+
+
+# ------------------------ SERVIDOR ------------------------
+
+class AssetStaticFiles(StaticFiles):
+    """``StaticFiles`` que entiende URLs con huella y sirve variantes precomprimidas.
+
+    Las URLs con huella vigente se sirven con ``Cache-Control: immutable``;
+    las demás se revalidan (ETag/Last-Modified de ``StaticFiles``).
+    """
+
+    def __init__(self, *args, manifest: AssetManifest = assets, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.manifest = manifest
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        path, immutable = await anyio.to_thread.run_sync(self.manifest.resolve, path)
+        request_headers = Headers(scope=scope)
+        response = None
+        if scope["method"] in ("GET", "HEAD"):
+            full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path)
+            if stat_result is not None and stat.S_ISREG(stat_result.st_mode):
+                relative = os.path.relpath(full_path, self.directory).replace(os.sep, "/")
+                found = await anyio.to_thread.run_sync(
+                    self.manifest.variant, relative, request_headers.get("accept-encoding", "")
+                )
+                if found is not None:
+                    encoding, variant = found
+                    response = FileResponse(
+                        variant,
+                        stat_result=os.stat(variant),
+                        media_type=mimetypes.guess_type(full_path)[0] or "text/plain",
+                        headers={"content-encoding": encoding},
+                    )
+                    if self.is_not_modified(response.headers, request_headers):
+                        response = NotModifiedResponse(response.headers)
+        if response is None:
+            response = await super().get_response(path, scope)
+        if self.manifest.compressible(path):
+            response.headers["vary"] = "Accept-Encoding"
+        response.headers["cache-control"] = IMMUTABLE if immutable else REVALIDATE
+        return response
@@ -0,0 +1,52 @@
+import json
+from typing import Any, Dict, List
+
+from fastapi import HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from pydantic import TypeAdapter, ValidationError
+
+
+# ------------------------ CUERPOS MASIVOS ------------------------
+
+async def read_bulk_body(request: Request) -> List[Any]:
+    """Lee un arreglo JSON o un cuerpo NDJSON (un objeto por línea)."""
+    body = await request.body()
+    content_type = request.headers.get("content-type", "")
+    try:
+        if "ndjson" in content_type:
+            items = [json.loads(line) for line in body.splitlines() if line.strip()]
+        else:
+            items = json.loads(body) if body.strip() else []
+    except json.JSONDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON body: {e}")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array or an NDJSON body")
+    return items
+
+
+def validate_items(adapter: TypeAdapter, items: List[Any]) -> Any:
+    try:
+        return adapter.validate_python(items)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+
+
+def split_patches(items: List[Any]) -> Dict[int, dict]:
+    updates: Dict[int, dict] = {}
+    for position, item in enumerate(items):
+        if not isinstance(item, dict) or not isinstance(item.get("id"), int):
+            raise HTTPException(status_code=400, detail=f"Item {position} must be an object with an integer 'id'")
+        data = dict(item)
+        row_id = data.pop("id")
+        # bool es subclase de int: true/false no son ids válidos.
+        if isinstance(row_id, bool):
+            raise HTTPException(status_code=422, detail=f"Item {position} has a boolean 'id': {json.dumps(row_id)}")
+        # Un id repetido pisaría en silencio el parche anterior.
+        if row_id in updates:
+            raise HTTPException(status_code=422, detail=f"Item {position} repeats id {row_id}")
+        updates[row_id] = data
+    return updates
+
+
+def validated_ids(items: List[Any]) -> List[int]:
+    return validate_items(TypeAdapter(List[int]), items)
@@ -0,0 +1,161 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from fastapi import Request
+from fastapi.routing import APIRoute
+from starlette.responses import Response
+
+from operations.repository import ChangeListener
+from utils.metrics import CACHE_REQUESTS
+
+CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_ENTRIES", "512"))
+CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_BYTES", str(64 * 1024 * 1024)))
+
+
+# ------------------------ VERSIONES POR TABLA ------------------------
+
+class TableVersion(ChangeListener):
+    """Contador que sube con cada alta, edición o baja de la tabla observada."""
+
+    def __init__(self):
+        self.value = 0
+
+    def on_change(self, before, after) -> None:
+        self.value += 1
+
+    def on_reset(self, rows) -> None:
+        self.value += 1
+
+
+# ------------------------ CACHE DE RESPUESTAS ------------------------
+
+class CachedResponse:
+    __slots__ = ("body", "status_code", "raw_headers", "etag")
+
+    def __init__(self, body: bytes, status_code: int, raw_headers: list, etag: str):
+        self.body = body
+        self.status_code = status_code
+        self.raw_headers = raw_headers
+        self.etag = etag
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match usa comparación débil: se ignora el prefijo W/.
+    return any(candidate.strip().removeprefix("W/") == etag for candidate in header.split(","))
+
+
+class ResponseCache:
+    """LRU en proceso de respuestas GET con ETag fuerte (hash del cuerpo).
+
+    La clave incluye ruta, query, ``Accept`` y la versión de cada tabla de la
+    que depende la ruta; una escritura sube la versión y las entradas viejas
+    dejan de coincidir hasta que el LRU las expulsa.
+    """
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, max_bytes: int = CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries: "OrderedDict[tuple, CachedResponse]" = OrderedDict()
+        self.size = 0
+        self.versions: Dict[str, TableVersion] = {}
+        # Con varios workers: traen los cambios de otros procesos antes de mirar la versión.
+        self.pollers: Dict[str, Callable[[], None]] = {}
+        self.lock = threading.Lock()
+
+    def table(self, name: str, poll: Optional[Callable[[], None]] = None) -> TableVersion:
+        if poll is not None:
+            self.pollers[name] = poll
+        return self.versions.setdefault(name, TableVersion())
+
+    def _key(self, request: Request, tables: Tuple[str, ...]) -> tuple:
+        for name in tables:
+            poll = self.pollers.get(name)
+            if poll is not None:
+                poll()
+        versions = tuple(self.table(name).value for name in tables)
+        return request.url.path, request.url.query, request.headers.get("accept", ""), versions
+
+    def get(self, key: tuple) -> Optional[CachedResponse]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def put(self, key: tuple, entry: CachedResponse) -> None:
+        if len(entry.body) > self.max_bytes:
+            return
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous.body)
+            self.entries[key] = entry
+            self.size += len(entry.body)
+            while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted.body)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    async def serve(self, request: Request, tables: Tuple[str, ...], handler: Callable) -> Response:
+        key = self._key(request, tables)
+        entry = self.get(key)
+        if entry is None:
+            response = await handler(request)
+            # Las respuestas en flujo (NDJSON/CSV) y los errores no se guardan.
+            if response.status_code != 200 or not hasattr(response, "body"):
+                CACHE_REQUESTS.inc(result="bypass")
+                return response
+            etag = '"' + hashlib.sha256(response.body).hexdigest()[:32] + '"'
+            raw_headers = [(name, value) for name, value in response.raw_headers if name != b"etag"]
+            raw_headers += [(b"etag", etag.encode("latin-1")), (b"cache-control", b"no-cache")]
+            entry = CachedResponse(response.body, response.status_code, raw_headers, etag)
+            self.put(key, entry)
+            result = "miss"
+        else:
+            result = "hit"
+        if etag_matches(request.headers.get("if-none-match"), entry.etag):
+            CACHE_REQUESTS.inc(result="not_modified")
+            return Response(status_code=304, headers={"etag": entry.etag, "cache-control": "no-cache"})
+        CACHE_REQUESTS.inc(result=result)
+        response = Response(entry.body, status_code=entry.status_code)
+        response.raw_headers = list(entry.raw_headers)
+        return response
+
+
+response_cache = ResponseCache()
+
+
+def cached(*tables: str) -> Callable:
+    """Marca un endpoint GET como cacheable; se invalida con las tablas dadas."""
+
+    def decorator(endpoint: Callable) -> Callable:
+        endpoint.cache_tables = tables
+        return endpoint
+
+    return decorator
+
+
+class CachedRoute(APIRoute):
+    """``APIRoute`` que sirve desde ``response_cache`` los endpoints marcados con ``@cached``."""
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        tables = getattr(self.endpoint, "cache_tables", None)
+        if not tables or "GET" not in self.methods:
+            return handler
+
+        async def cached_handler(request: Request) -> Response:
+            return await response_cache.serve(request, tables, handler)
+
+        return cached_handler
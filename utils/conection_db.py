@@ -1,30 +1,246 @@
+import asyncio
 import os
-from dotenv import load_dotenv
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine
-from sqlalchemy.orm import sessionmaker
-from sqlmodel import SQLModel
-from sqlmodel.ext.asyncio.session import AsyncSession
-from sqlalchemy.orm import declarative_base
-Base = declarative_base()
+import time
 
+# SQLAlchemy, SQLModel, asyncpg y dotenv se importan en el primer uso: la app
+# puede arrancar (y servir las rutas CSV) sin tocar la base de datos.
+# ``engine``, ``async_session`` y ``Base`` se crean al accederlos (ver __getattr__).
 
-load_dotenv()
+_engine = None
+_async_session = None
+_base = None
+_tables_ready = False
+_init_lock = None
 
-DB_USER = os.getenv("CLEVER_USER")
-DB_PASSWORD = os.getenv("CLEVER_PASSWORD")
-DB_HOST = os.getenv("CLEVER_HOST")
-DB_PORT = os.getenv("CLEVER_PORT")
-DB_NAME = os.getenv("CLEVER_DATABASE")
 
-CLEVER_DB = f"postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-engine: AsyncEngine = create_async_engine(CLEVER_DB, echo=True)
-async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+def _flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+
+def database_url() -> str:
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    # DATABASE_URL permite apuntar a otra base, p. ej. sqlite+aiosqlite:///Data/game.db en local.
+    url = os.getenv("DATABASE_URL")
+    if url:
+        return url
+    user, password = os.getenv("CLEVER_USER"), os.getenv("CLEVER_PASSWORD")
+    host, port, name = os.getenv("CLEVER_HOST"), os.getenv("CLEVER_PORT"), os.getenv("CLEVER_DATABASE")
+    return f"postgresql+asyncpg://{user}:{password}@{host}:{port}/{name}"
+
+
+# ------------------------ METRICAS DEL POOL ------------------------
+
+class PoolStats:
+    """Latencia de cada checkout y, aparte, las esperas por pool agotado."""
+
+    def __init__(self):
+        self.connections_opened = 0
+        self.checkouts = 0
+        self.checkout_count = 0
+        self.checkout_seconds_total = 0.0
+        self.checkout_seconds_max = 0.0
+        self.waits = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.timeouts = 0
+
+    def record_checkout(self, seconds: float, waited: bool):
+        self.checkout_count += 1
+        self.checkout_seconds_total += seconds
+        self.checkout_seconds_max = max(self.checkout_seconds_max, seconds)
+        if waited:
+            self.waits += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+
+pool_stats = PoolStats()
+
+
+def instrumented_pool_class():
+    from sqlalchemy.exc import TimeoutError as PoolTimeout
+    from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+    class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+        """Pool por defecto de los drivers async que además mide la espera por conexión."""
+
+        pending = 0
+
+        def _do_get(self):
+            # Solo cuenta como espera si no queda conexión libre ni hueco de overflow que
+            # no esté ya reservado por otro checkout en curso (la cola async cede el bucle
+            # antes de entregar la conexión): entonces se bloquea hasta que devuelvan una.
+            free = self.checkedin() + max(self._max_overflow - self._overflow, 0)
+            exhausted = self._max_overflow > -1 and free <= self.pending
+            self.pending += 1
+            start = time.perf_counter()
+            try:
+                return super()._do_get()
+            except PoolTimeout:
+                pool_stats.timeouts += 1
+                raise
+            finally:
+                self.pending -= 1
+                pool_stats.record_checkout(time.perf_counter() - start, exhausted)
+
+    return InstrumentedQueuePool
+
+
+def engine_options(url: str) -> dict:
+    # Ajustes del pool (variables de entorno DB_*). El log de SQL queda apagado por defecto.
+    options = {"echo": _flag("DB_ECHO", "false"), "query_cache_size": int(os.getenv("DB_QUERY_CACHE_SIZE", "1000"))}
+    if url.startswith("sqlite") and (":memory:" in url or url.rstrip("/").endswith(":")):
+        # SQLite en memoria usa un StaticPool: no admite ajustes de tamaño.
+        return options
+    options.update(
+        poolclass=instrumented_pool_class(),
+        pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+        max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        pool_recycle=int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        pool_pre_ping=_flag("DB_POOL_PRE_PING", "true"),
+    )
+    if url.startswith("postgresql+asyncpg"):
+        # Caché de sentencias preparadas por conexión del driver asyncpg.
+        options["connect_args"] = {"prepared_statement_cache_size": int(os.getenv("DB_STATEMENT_CACHE_SIZE", "500"))}
+    return options
+
+
+# ------------------------ INICIALIZACION PEREZOSA ------------------------
+
+def get_engine():
+    global _engine, _async_session
+    if _engine is None:
+        from sqlalchemy import event
+        from sqlalchemy.ext.asyncio import create_async_engine
+        from sqlalchemy.orm import sessionmaker
+        from sqlmodel.ext.asyncio.session import AsyncSession
+
+        url = database_url()
+        engine = create_async_engine(url, **engine_options(url))
+
+        @event.listens_for(engine.sync_engine, "connect")
+        def _on_connect(dbapi_connection, connection_record):
+            pool_stats.connections_opened += 1
+
+        @event.listens_for(engine.sync_engine, "checkout")
+        def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+            pool_stats.checkouts += 1
+
+        _async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        _engine = engine
+    return _engine
+
+
+def get_session_factory():
+    get_engine()
+    return _async_session
+
+
+def __getattr__(name: str):
+    global _base
+    if name == "engine":
+        return get_engine()
+    if name == "async_session":
+        return get_session_factory()
+    if name == "Base":
+        if _base is None:
+            from sqlalchemy.orm import declarative_base
+            _base = declarative_base()
+        return _base
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def pool_metrics() -> dict:
+    metrics = {
+        "initialized": _engine is not None,
+        "connections_opened": pool_stats.connections_opened,
+        "checkouts": pool_stats.checkouts,
+        "checkout_seconds_max": round(pool_stats.checkout_seconds_max, 6),
+        "checkout_seconds_avg": round(pool_stats.checkout_seconds_total / pool_stats.checkout_count, 6)
+        if pool_stats.checkout_count else 0.0,
+        "wait_count": pool_stats.waits,
+        "wait_seconds_total": round(pool_stats.wait_seconds_total, 6),
+        "wait_seconds_max": round(pool_stats.wait_seconds_max, 6),
+        "wait_seconds_avg": round(pool_stats.wait_seconds_total / pool_stats.waits, 6) if pool_stats.waits else 0.0,
+        "timeouts": pool_stats.timeouts,
+    }
+    if _engine is None:
+        return metrics
+    from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+    pool = _engine.pool
+    metrics["pool_class"] = type(pool).__name__
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        metrics.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+            max_overflow=pool._max_overflow,
+            timeout=pool._timeout,
+        )
+    return metrics
+
+# ------------------------ ESQUEMA ------------------------
+
+def create_tables(connection, tables=None) -> None:
+    """``create_all`` y migración aditiva de las tablas que ya existían (vía ``run_sync``).
+
+    ``create_all`` no toca tablas existentes: una base creada con un modelo
+    anterior (``players`` con solo id, name, health y armor) fallaría al
+    consultar las columnas nuevas. Se añaden con su valor por defecto y
+    después los índices que falten.
+    """
+    from sqlalchemy import inspect, literal
+    from sqlmodel import SQLModel
+
+    metadata = SQLModel.metadata
+    tables = list(tables) if tables is not None else list(metadata.sorted_tables)
+    metadata.create_all(connection, tables=tables)
+    inspector = inspect(connection)
+    dialect = connection.dialect
+    preparer = dialect.identifier_preparer
+    for table in tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name, schema=table.schema)}
+        missing = [column for column in table.columns if column.name not in existing]
+        for column in missing:
+            ddl = (
+                f"ALTER TABLE {preparer.format_table(table)} "
+                f"ADD COLUMN {preparer.format_column(column)} {column.type.compile(dialect=dialect)}"
+            )
+            default = column.default.arg if column.default is not None and column.default.is_scalar else None
+            if default is not None:
+                value = literal(default, column.type).compile(dialect=dialect, compile_kwargs={"literal_binds": True})
+                ddl += f" DEFAULT {value}"
+                if not column.nullable:
+                    ddl += " NOT NULL"
+            connection.exec_driver_sql(ddl)
+        if missing:
+            for index in table.indexes:
+                index.create(connection, checkfirst=True)
+
 
 async def init_db():
-    async with engine.begin() as conn:
-        await conn.run_sync(SQLModel.metadata.create_all)
+    global _tables_ready, _init_lock
+    if _tables_ready:
+        return
+    if _init_lock is None:
+        _init_lock = asyncio.Lock()
+    async with _init_lock:
+        if _tables_ready:
+            return
+        import modelos.enemy_sql  # noqa: F401  (registra las tablas en SQLModel.metadata)
+        import modelos.player_sql  # noqa: F401
+
+        async with get_engine().begin() as conn:
+            await conn.run_sync(create_tables)
+        _tables_ready = True
 
 async def get_session():
-    async with async_session() as session:
+    # Primer uso de la base: crea el motor y las tablas.
+    await init_db()
+    async with get_session_factory()() as session:
         yield session
-
@@ -0,0 +1,225 @@
+import asyncio
+import contextlib
+import json
+import os
+import secrets
+import threading
+from collections import deque
+from contextvars import ContextVar
+from typing import AsyncIterator, Collection, Deque, Iterator, List, Optional, Tuple
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+from operations.repository import ChangeListener
+from utils.metrics import FEED_EVENTS, FEED_RESYNCS
+
+FEED_BACKLOG = int(os.getenv("CHANGE_FEED_BACKLOG", "10000"))
+FEED_BATCH = int(os.getenv("CHANGE_FEED_BATCH", "256"))
+FEED_KEEPALIVE = float(os.getenv("CHANGE_FEED_KEEPALIVE", "15"))
+
+# Motivo del cambio en curso (p. ej. "restore"); lo fijan las operaciones y lo
+# lee el feed, que se notifica de forma síncrona dentro de la misma tarea.
+change_reason: ContextVar[Optional[str]] = ContextVar("change_reason", default=None)
+
+
+@contextlib.contextmanager
+def tag_changes(name: str) -> Iterator[None]:
+    token = change_reason.set(name)
+    try:
+        yield
+    finally:
+        change_reason.reset(token)
+
+
+# ------------------------ FEED ------------------------
+
+class ChangeFeed:
+    """Feed de cambios de todas las tablas con número de secuencia creciente.
+
+    Los deltas se guardan serializados en un búfer circular de
+    ``FEED_BACKLOG`` eventos compartido por todos los clientes: cada cliente
+    solo guarda su cursor (el último ``seq`` recibido) y lee al ritmo que le
+    permite su conexión. Un cliente lento no frena las escrituras ni hace
+    crecer la memoria; si su cursor sale del búfer recibe ``resync`` y debe
+    volver a pedir la tabla completa.
+
+    Los 21 bits altos de la secuencia son una época aleatoria de cada
+    proceso: un cursor de antes de un reinicio o de otro worker no se
+    confunde con uno propio y recibe ``resync``. Con 53 bits en total sigue
+    siendo un entero exacto en JavaScript.
+    """
+
+    def __init__(self, backlog: int = FEED_BACKLOG):
+        self.events: Deque[Tuple[int, str, str]] = deque(maxlen=backlog)
+        self.epoch = secrets.randbits(21)
+        self.seq = self.epoch << 32
+        self.lock = threading.Lock()
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.changed = None
+
+    def table(self, name: str) -> "TableFeed":
+        return TableFeed(self, name)
+
+    def publish(self, table: str, op: str, row_id: Optional[int] = None, data: Optional[dict] = None) -> None:
+        with self.lock:
+            self.seq += 1
+            event = {"seq": self.seq, "table": table, "op": op}
+            if row_id is not None:
+                event["id"] = row_id
+            if data is not None:
+                event["data"] = data
+            self.events.append((self.seq, table, json.dumps(event, separators=(",", ":"))))
+        FEED_EVENTS.inc(table=table, op=op)
+        self._wake()
+
+    def _wake(self) -> None:
+        loop = self.loop
+        if loop is None or self.changed is None:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._set_changed()
+        else:
+            # Cambios publicados desde un hilo (p. ej. la carga inicial en to_thread).
+            loop.call_soon_threadsafe(self._set_changed)
+
+    def _set_changed(self) -> None:
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+    async def wait(self, after: int, timeout: float) -> bool:
+        """Espera a que haya eventos posteriores a ``after``; False si vence ``timeout``."""
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop:
+            self.loop, self.changed = loop, asyncio.Event()
+        changed = self.changed
+        if self.seq > after:
+            return True
+        try:
+            await asyncio.wait_for(changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def cursor(self, after: Optional[int]) -> Optional[int]:
+        """Cursor inicial: ``None`` empieza en el presente; uno inválido devuelve ``None``."""
+        if after is None:
+            return self.seq
+        with self.lock:
+            oldest = self.events[0][0] if self.events else self.seq + 1
+            if after >> 32 != self.epoch or after > self.seq or after < oldest - 1:
+                return None
+        return after
+
+    def read(self, after: int, tables: Optional[Collection[str]] = None,
+             limit: int = FEED_BATCH) -> Tuple[List[Tuple[int, str]], int, bool]:
+        """Eventos posteriores a ``after`` -> ([(seq, JSON)], nuevo cursor, resync)."""
+        with self.lock:
+            if not self.events or after >= self.seq:
+                return [], after, False
+            oldest = self.events[0][0]
+            if after < oldest - 1:
+                return [], self.seq, True
+            # Las secuencias del búfer son consecutivas: la posición se calcula directamente.
+            start = after - oldest + 1
+            batch = [self.events[position] for position in range(start, min(start + limit, len(self.events)))]
+        cursor = batch[-1][0]
+        return [(seq, payload) for seq, table, payload in batch if tables is None or table in tables], cursor, False
+
+
+class TableFeed(ChangeListener):
+    """Traduce los cambios de una tabla a deltas compactos del feed."""
+
+    def __init__(self, feed: ChangeFeed, name: str):
+        self.feed = feed
+        self.name = name
+
+    def on_change(self, before, after) -> None:
+        if before is None:
+            self.feed.publish(self.name, change_reason.get() or "create", after.id, after.dict())
+        elif after is None:
+            self.feed.publish(self.name, "delete", before.id)
+        else:
+            # Solo los campos que cambian.
+            changes = {
+                name: value for name, value in after.dict().items() if getattr(before, name) != value
+            }
+            if changes:
+                self.feed.publish(self.name, "update", after.id, changes)
+
+    def on_reset(self, rows) -> None:
+        # Tabla vaciada o recargada entera: los clientes vuelven a pedirla.
+        self.feed.publish(self.name, "reset" if rows else "clear")
+
+
+change_feed = ChangeFeed()
+
+
+# ------------------------ TRANSPORTES ------------------------
+
+def sse_event(seq: int, payload: str) -> str:
+    return f"id: {seq}\nevent: change\ndata: {payload}\n\n"
+
+
+def sse_resync(seq: int) -> str:
+    FEED_RESYNCS.inc(transport="sse")
+    return f"id: {seq}\nevent: resync\ndata: {json.dumps({'seq': seq})}\n\n"
+
+
+async def sse_stream(feed: ChangeFeed, after: Optional[int], tables: Optional[Collection[str]]) -> AsyncIterator[str]:
+    # Cada ``yield`` espera a que el cliente acepte los datos (control de flujo
+    # del servidor), así que un cliente lento solo se queda atrás en el búfer.
+    cursor = feed.cursor(after)
+    if cursor is None:
+        cursor = feed.seq
+        yield sse_resync(cursor)
+    yield f"retry: 2000\nid: {cursor}\nevent: ready\ndata: {json.dumps({'seq': cursor})}\n\n"
+    while True:
+        events, cursor, resync = feed.read(cursor, tables)
+        if resync:
+            yield sse_resync(cursor)
+        elif events:
+            yield "".join(sse_event(seq, payload) for seq, payload in events)
+        elif not await feed.wait(cursor, FEED_KEEPALIVE):
+            yield ": keepalive\n\n"
+
+
+async def websocket_stream(websocket: WebSocket, feed: ChangeFeed, after: Optional[int],
+                           tables: Optional[Collection[str]]) -> None:
+    """Un mensaje de texto por evento; ``{"op":"resync"}`` si el cliente se quedó atrás."""
+    await websocket.accept()
+    # Lo que envíe el cliente se ignora: la tarea solo detecta el cierre mientras se espera al feed.
+    closed = asyncio.ensure_future(websocket.receive())
+    try:
+        cursor = feed.cursor(after)
+        if cursor is None:
+            cursor = feed.seq
+            FEED_RESYNCS.inc(transport="websocket")
+            await websocket.send_text(json.dumps({"op": "resync", "seq": cursor}))
+        await websocket.send_text(json.dumps({"op": "ready", "seq": cursor}))
+        while True:
+            if closed.done():
+                if closed.result()["type"] == "websocket.disconnect":
+                    break
+                closed = asyncio.ensure_future(websocket.receive())
+            events, cursor, resync = feed.read(cursor, tables)
+            if resync:
+                FEED_RESYNCS.inc(transport="websocket")
+                await websocket.send_text(json.dumps({"op": "resync", "seq": cursor}))
+            for _, payload in events:
+                await websocket.send_text(payload)
+            if events or resync:
+                continue
+            waiting = asyncio.ensure_future(feed.wait(cursor, FEED_KEEPALIVE))
+            await asyncio.wait({waiting, closed}, return_when=asyncio.FIRST_COMPLETED)
+            if not waiting.done():
+                waiting.cancel()
+            elif not waiting.result():
+                await websocket.send_text(json.dumps({"op": "keepalive", "seq": cursor}))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        closed.cancel()
@@ -0,0 +1,101 @@
+import asyncio
+import contextlib
+import os
+from typing import AsyncIterator, Callable, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin modo multiproceso
+    fcntl = None
+
+
+# ------------------------ ESCRITURA ATOMICA ------------------------
+
+def replace_atomically(path: str, write: Callable[[str], None]) -> None:
+    """Escribe ``path`` a través de un temporal: write(tmp) + fsync + rename.
+
+    Un lector (o una caída) nunca ve un archivo a medio escribir: o queda la
+    versión anterior completa o la nueva.
+    """
+    # Temporal por proceso: con varios workers dos escrituras nunca comparten temporal.
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    write(tmp_path)
+    with open(tmp_path, mode="rb+") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    directory = os.path.dirname(os.path.abspath(path))
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+# ------------------------ BLOQUEO ENTRE PROCESOS ------------------------
+
+class FileLock:
+    """Cerrojo ``flock`` sobre ``path`` compartido por los workers de uvicorn.
+
+    Dentro de un proceso el acceso ya está serializado (``asyncio.Lock`` o
+    ``RLock``): se toma primero el cerrojo del proceso y luego este, siempre
+    en ese orden. El cerrojo se libera solo si el proceso muere.
+    """
+
+    def __init__(self, path: str):
+        if fcntl is None:
+            raise RuntimeError("Multi-worker mode needs POSIX file locks (fcntl)")
+        self.path = path
+        self.fd: Optional[int] = None
+
+    def _fileno(self) -> int:
+        if self.fd is None:
+            self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        return self.fd
+
+    @contextlib.contextmanager
+    def held(self, exclusive: bool = True) -> Iterator[None]:
+        fd = self._fileno()
+        fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+
+    @contextlib.contextmanager
+    def attempt(self, exclusive: bool = True) -> Iterator[bool]:
+        """Como ``held`` pero sin esperar: produce False si otro proceso lo tiene."""
+        fd = self._fileno()
+        try:
+            fcntl.flock(fd, (fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH) | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+
+    @contextlib.asynccontextmanager
+    async def hold(self, exclusive: bool = True) -> AsyncIterator[None]:
+        # Sin contención se toma en el event loop; si otro worker lo tiene se espera en un hilo.
+        fd = self._fileno()
+        mode = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+        try:
+            fcntl.flock(fd, mode | fcntl.LOCK_NB)
+        except BlockingIOError:
+            waiting = asyncio.ensure_future(asyncio.to_thread(fcntl.flock, fd, mode))
+            try:
+                await asyncio.shield(waiting)
+            except asyncio.CancelledError:
+                # El hilo acabará obteniéndolo: se suelta en cuanto lo haga.
+                waiting.add_done_callback(lambda _: fcntl.flock(fd, fcntl.LOCK_UN))
+                raise
+        try:
+            yield
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
@@ -0,0 +1,152 @@
+import functools
+import inspect
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from fastapi import Request
+from fastapi.templating import Jinja2Templates
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+# ------------------------ TIPOS DE METRICA ------------------------
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self.values: Dict[Labels, float] = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            for labels, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{format_labels(labels)} {value:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(sorted(buckets))
+        # Por cada combinación de etiquetas: conteos por cubeta, suma y total.
+        self.series: Dict[Labels, List[float]] = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = [0.0] * (len(self.buckets) + 2)
+            for position, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[position] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            for labels, series in sorted(self.series.items()):
+                for position, bound in enumerate(self.buckets):
+                    lines.append(f"{self.name}_bucket{format_labels(labels + (('le', f'{bound:g}'),))} {series[position]:g}")
+                lines.append(f"{self.name}_bucket{format_labels(labels + (('le', '+Inf'),))} {series[-1]:g}")
+                lines.append(f"{self.name}_sum{format_labels(labels)} {series[-2]:.6f}")
+                lines.append(f"{self.name}_count{format_labels(labels)} {series[-1]:g}")
+        return lines
+
+
+def escape_label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{escape_label(value)}"' for key, value in labels) + "}"
+
+
+# ------------------------ REGISTRO ------------------------
+
+REQUESTS_TOTAL = Counter("http_requests_total", "Peticiones HTTP por ruta, método y código.")
+REQUEST_SECONDS = Histogram("http_request_duration_seconds", "Latencia de las peticiones HTTP por ruta.")
+STORAGE_SECONDS = Histogram("storage_operation_duration_seconds", "Duración de las funciones de almacenamiento.")
+TEMPLATE_SECONDS = Histogram("template_render_duration_seconds", "Tiempo de render de plantillas Jinja.")
+CACHE_REQUESTS = Counter("response_cache_requests_total", "Peticiones a rutas cacheadas por resultado (hit, miss, not_modified, bypass).")
+FEED_EVENTS = Counter("change_feed_events_total", "Eventos publicados en el feed de cambios por tabla y operación.")
+FEED_RESYNCS = Counter("change_feed_resyncs_total", "Clientes del feed que se quedaron atrás y deben recargar la tabla.")
+
+REGISTRY = [REQUESTS_TOTAL, REQUEST_SECONDS, STORAGE_SECONDS, TEMPLATE_SECONDS, CACHE_REQUESTS, FEED_EVENTS, FEED_RESYNCS]
+
+
+def render_metrics() -> str:
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ------------------------ INSTRUMENTACION ------------------------
+
+def timed(function_name: str) -> Callable:
+    """Mide cada llamada en ``storage_operation_duration_seconds{function=...}``."""
+
+    def decorator(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    STORAGE_SECONDS.observe(time.perf_counter() - start, function=function_name)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                STORAGE_SECONDS.observe(time.perf_counter() - start, function=function_name)
+        return wrapper
+
+    return decorator
+
+
+async def metrics_middleware(request: Request, call_next):
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        path = getattr(route, "path", "unmatched")
+        REQUEST_SECONDS.observe(time.perf_counter() - start, method=request.method, route=path)
+        REQUESTS_TOTAL.inc(method=request.method, route=path, status=str(status_code))
+
+
+class InstrumentedTemplates(Jinja2Templates):
+    """``Jinja2Templates`` que registra el tiempo de render por plantilla."""
+
+    def TemplateResponse(self, *args, **kwargs):
+        name = kwargs.get("name") or next((arg for arg in args if isinstance(arg, str)), "unknown")
+        start = time.perf_counter()
+        try:
+            return super().TemplateResponse(*args, **kwargs)
+        finally:
+            TEMPLATE_SECONDS.observe(time.perf_counter() - start, template=name)
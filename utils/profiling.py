@@ -0,0 +1,57 @@
+import contextlib
+import sys
+import time
+from typing import Dict, Optional
+
+# Se importa lo primero en main.py: marca el inicio de la carga de la app.
+IMPORT_START = time.perf_counter()
+
+
+class StartupProfile:
+    """Tiempos del arranque: import de la app, fases de startup y primera petición."""
+
+    def __init__(self, start: float):
+        self.start = start
+        self.modules_before = set(sys.modules)
+        self.app_imported: Optional[float] = None
+        self.startup_done: Optional[float] = None
+        self.first_request: Optional[float] = None
+        self.phases: Dict[str, float] = {}
+
+    def mark_imported(self) -> None:
+        self.app_imported = time.perf_counter()
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - start
+
+    def mark_started(self) -> None:
+        self.startup_done = time.perf_counter()
+
+    async def first_request_middleware(self, request, call_next):
+        response = await call_next(request)
+        if self.first_request is None:
+            self.first_request = time.perf_counter()
+        return response
+
+    def _since_start(self, moment: Optional[float]) -> Optional[float]:
+        return round(moment - self.start, 4) if moment is not None else None
+
+    def report(self) -> dict:
+        loaded = set(sys.modules) - self.modules_before
+        heavy = ("sqlalchemy", "sqlmodel", "asyncpg", "aiosqlite", "numpy", "PIL", "dotenv")
+        return {
+            "import_seconds": self._since_start(self.app_imported),
+            "startup_seconds": self._since_start(self.startup_done),
+            "first_request_seconds": self._since_start(self.first_request),
+            "phases": {name: round(seconds, 4) for name, seconds in self.phases.items()},
+            "modules_loaded": len(loaded),
+            "deferred_loaded": {name: name in sys.modules for name in heavy},
+        }
+
+
+startup_profile = StartupProfile(IMPORT_START)
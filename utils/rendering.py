@@ -0,0 +1,168 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from fastapi.responses import HTMLResponse, StreamingResponse
+from fastapi.templating import Jinja2Templates
+from markupsafe import Markup
+
+from utils.assets import AssetManifest
+from utils.metrics import TEMPLATE_SECONDS, timed
+
+ROW_CACHE_SIZE = int(os.getenv("ROW_CACHE_SIZE", "50000"))
+STREAM_THRESHOLD = int(os.getenv("TEMPLATE_STREAM_THRESHOLD", "1000"))
+STREAM_CHUNK_BYTES = 16 * 1024
+# Las páginas y fragmentos ya se cachean; recargar plantillas del disco solo sirve en desarrollo.
+TEMPLATES_AUTO_RELOAD = os.getenv("TEMPLATES_AUTO_RELOAD", "false").lower() in ("1", "true", "yes")
+# Cada cuánto se comprueba si cambió la huella de los assets incrustados en páginas y fragmentos.
+ASSET_CHECK_SECONDS = float(os.getenv("ASSET_CHECK_SECONDS", "1"))
+
+
+def buffered(parts: Iterable[str], size: int = STREAM_CHUNK_BYTES) -> Iterator[str]:
+    """Agrupa los trozos diminutos de ``Template.generate`` en bloques de ~16 KiB."""
+    buffer: List[str] = []
+    length = 0
+    for part in parts:
+        buffer.append(part)
+        length += len(part)
+        if length >= size:
+            yield "".join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+
+class PageRenderer:
+    """Capa de render sobre ``Jinja2Templates``.
+
+    - Páginas estáticas: se renderizan una vez (al arrancar o en la primera
+      visita) y luego se sirven los bytes.
+    - Fragmentos (navbar, footer): ``{{ fragment("navbar.html") }}`` se
+      renderiza una sola vez por proceso.
+    - Filas de tabla: cacheadas (LRU) por plantilla y valores de la entidad,
+      así editar una entidad solo vuelve a renderizar su fila.
+    - Tablas grandes: salida en flujo con ``Template.generate``.
+
+    Con ``manifest``, ``static_url`` anota las URLs con huella que quedan en
+    páginas y fragmentos cacheados; si un asset cambia (nueva huella) se
+    descartan y se vuelven a renderizar.
+    """
+
+    def __init__(
+        self,
+        templates: Jinja2Templates,
+        row_cache_size: int = ROW_CACHE_SIZE,
+        manifest: Optional[AssetManifest] = None,
+    ):
+        self.templates = templates
+        self.env = templates.env
+        self.env.auto_reload = TEMPLATES_AUTO_RELOAD
+        self.static_pages: Dict[str, Tuple[str, dict]] = {}
+        self.rendered_pages: Dict[str, bytes] = {}
+        self.fragments: Dict[str, Markup] = {}
+        self.row_cache: "OrderedDict[tuple, Markup]" = OrderedDict()
+        self.row_cache_size = row_cache_size
+        self.lock = threading.Lock()
+        self.manifest = manifest
+        self.asset_urls: Dict[str, str] = {}
+        self.assets_checked = 0.0
+        self.local = threading.local()
+        self.env.globals["fragment"] = self.fragment
+        if manifest is not None:
+            self.env.globals["static_url"] = self.static_url
+
+    def _render(self, name: str, context: dict) -> str:
+        # Solo renderiza salida que se cachea: mientras dura, static_url anota sus assets.
+        start = time.perf_counter()
+        depth = getattr(self.local, "depth", 0)
+        self.local.depth = depth + 1
+        try:
+            return self.env.get_template(name).render(context)
+        finally:
+            self.local.depth = depth
+            TEMPLATE_SECONDS.observe(time.perf_counter() - start, template=name)
+
+    # ------------------------ ASSETS ------------------------
+
+    def static_url(self, path: str) -> str:
+        url = self.manifest.url(path)
+        if getattr(self.local, "depth", 0):
+            self.asset_urls.setdefault(path, url)
+        return url
+
+    def _check_assets(self) -> None:
+        if self.manifest is None:
+            return
+        now = time.monotonic()
+        if now - self.assets_checked < ASSET_CHECK_SECONDS:
+            return
+        self.assets_checked = now
+        if any(self.manifest.url(path) != url for path, url in list(self.asset_urls.items())):
+            self.asset_urls.clear()
+            self.fragments.clear()
+            self.rendered_pages = {}
+
+    # ------------------------ PAGINAS ESTATICAS ------------------------
+
+    def static_page(self, key: str, name: str, context: dict = None) -> None:
+        self.static_pages[key] = (name, context or {})
+
+    def page(self, key: str) -> HTMLResponse:
+        self._check_assets()
+        body = self.rendered_pages.get(key)
+        if body is None:
+            name, context = self.static_pages[key]
+            body = self.rendered_pages[key] = self._render(name, context).encode("utf-8")
+        return HTMLResponse(body)
+
+    @timed("templates.prerender")
+    def prerender(self) -> None:
+        """Compila todas las plantillas y renderiza las páginas estáticas."""
+        for name in self.env.list_templates(extensions=["html"]):
+            self.env.get_template(name)
+        self.fragments.clear()
+        self.asset_urls.clear()
+        self.rendered_pages = {
+            key: self._render(name, context).encode("utf-8")
+            for key, (name, context) in self.static_pages.items()
+        }
+
+    # ------------------------ FRAGMENTOS ------------------------
+
+    def fragment(self, name: str) -> Markup:
+        self._check_assets()
+        markup = self.fragments.get(name)
+        if markup is None:
+            markup = self.fragments[name] = Markup(self._render(name, {}))
+        return markup
+
+    def rows(self, name: str, columns: Sequence[str], items: Iterable[Dict[str, Any]]) -> List[Markup]:
+        """HTML de cada fila (``name`` recibe ``columns`` y ``row``), reutilizando las ya vistas."""
+        template = self.env.get_template(name)
+        columns = tuple(columns)
+        rendered = []
+        for item in items:
+            key = (name, columns, tuple(item[column] for column in columns))
+            with self.lock:
+                markup = self.row_cache.get(key)
+                if markup is not None:
+                    self.row_cache.move_to_end(key)
+            if markup is None:
+                markup = Markup(template.render(columns=columns, row=item))
+                with self.lock:
+                    self.row_cache[key] = markup
+                    if len(self.row_cache) > self.row_cache_size:
+                        self.row_cache.popitem(last=False)
+            rendered.append(markup)
+        return rendered
+
+    # ------------------------ RESPUESTAS ------------------------
+
+    def response(self, name: str, context: dict, rows: int = 0):
+        """``TemplateResponse`` normal o, si hay más de STREAM_THRESHOLD filas, en flujo."""
+        if rows <= STREAM_THRESHOLD:
+            return self.templates.TemplateResponse(name, context)
+        template = self.env.get_template(name)
+        return StreamingResponse(buffered(template.generate(context)), media_type="text/html; charset=utf-8")
@@ -0,0 +1,54 @@
+"""Arranque con varios workers de uvicorn.
+
+``uvicorn --workers N`` crea el socket compartido con ``proto=0`` y asyncio
+solo activa ``TCP_NODELAY`` en sockets ``IPPROTO_TCP``: cada respuesta
+(cabeceras y cuerpo en dos envíos) espera al ACK retardado del cliente,
+unos 40 ms por petición. Aquí el socket se crea como TCP explícito y los
+workers heredan NODELAY en cada conexión aceptada.
+
+Uso: python -m utils.server --host 0.0.0.0 --port 10000 --workers 2
+"""
+import argparse
+import logging
+import os
+import socket
+
+import uvicorn
+from uvicorn.supervisors import Multiprocess
+
+logger = logging.getLogger("uvicorn.error")
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM, socket.IPPROTO_TCP)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.bind((host, port))
+    sock.set_inheritable(True)
+    return sock
+
+
+def run(app: str, host: str, port: int, workers: int, log_level: str = "info") -> None:
+    if workers <= 1:
+        uvicorn.run(app, host=host, port=port, log_level=log_level)
+        return
+    config = uvicorn.Config(app, host=host, port=port, workers=workers, log_level=log_level)
+    sock = bind_socket(host, port)
+    logger.info("Uvicorn running on http://%s:%d with %d workers", host, port, workers)
+    Multiprocess(config, target=uvicorn.Server(config).run, sockets=[sock]).run()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app", default="main:app")
+    parser.add_argument("--host", default=os.getenv("HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "1")))
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+    run(args.app, args.host, args.port, args.workers, args.log_level)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import csv
+import io
+import json
+from typing import AsyncIterable, AsyncIterator, Iterable, Iterator, List, Optional, Union
+
+from fastapi import HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+CSV_MEDIA_TYPE = "text/csv"
+CHUNK_ROWS = 256
+
+
+# ------------------------ NEGOCIACION DE FORMATO ------------------------
+
+def stream_format(request: Request, format: Optional[str] = None) -> Optional[str]:
+    """Devuelve ``"ndjson"``/``"csv"`` si el cliente pidió exportación en flujo."""
+    if format is not None:
+        if format not in ("ndjson", "csv", "json"):
+            raise HTTPException(status_code=400, detail="format must be one of: json, ndjson, csv")
+        return None if format == "json" else format
+    if NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+        return "ndjson"
+    return None
+
+
+# ------------------------ GENERADORES ------------------------
+
+def ndjson_line(row: BaseModel) -> str:
+    return json.dumps(row.dict(), separators=(",", ":")) + "\n"
+
+
+class CSVChunker:
+    def __init__(self, fields: List[str]):
+        self.buffer = io.StringIO()
+        self.writer = csv.DictWriter(self.buffer, fieldnames=fields)
+        self.writer.writeheader()
+
+    def add(self, row: BaseModel) -> None:
+        self.writer.writerow(row.dict())
+
+    def drain(self) -> str:
+        chunk = self.buffer.getvalue()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return chunk
+
+
+def iter_ndjson(rows: Iterable[BaseModel]) -> Iterator[str]:
+    chunk = []
+    for row in rows:
+        chunk.append(ndjson_line(row))
+        if len(chunk) >= CHUNK_ROWS:
+            yield "".join(chunk)
+            chunk = []
+    if chunk:
+        yield "".join(chunk)
+
+
+async def aiter_ndjson(rows: AsyncIterable[BaseModel]) -> AsyncIterator[str]:
+    chunk = []
+    async for row in rows:
+        chunk.append(ndjson_line(row))
+        if len(chunk) >= CHUNK_ROWS:
+            yield "".join(chunk)
+            chunk = []
+    if chunk:
+        yield "".join(chunk)
+
+
+def iter_csv(rows: Iterable[BaseModel], fields: List[str]) -> Iterator[str]:
+    chunker = CSVChunker(fields)
+    for position, row in enumerate(rows, start=1):
+        chunker.add(row)
+        if position % CHUNK_ROWS == 0:
+            yield chunker.drain()
+    yield chunker.drain()
+
+
+async def aiter_csv(rows: AsyncIterable[BaseModel], fields: List[str]) -> AsyncIterator[str]:
+    chunker = CSVChunker(fields)
+    position = 0
+    async for row in rows:
+        chunker.add(row)
+        position += 1
+        if position % CHUNK_ROWS == 0:
+            yield chunker.drain()
+    yield chunker.drain()
+
+
+def stream_rows(
+    rows: Union[Iterable[BaseModel], AsyncIterable[BaseModel]], fields: List[str], kind: str, filename: str
+) -> StreamingResponse:
+    # Los iterables síncronos (lectura de CSV) los recorre Starlette en un hilo.
+    is_async = hasattr(rows, "__aiter__")
+    if kind == "csv":
+        return StreamingResponse(
+            aiter_csv(rows, fields) if is_async else iter_csv(rows, fields),
+            media_type=CSV_MEDIA_TYPE,
+            headers={"Content-Disposition": f'attachment; filename="{filename}.csv"'},
+        )
+    return StreamingResponse(aiter_ndjson(rows) if is_async else iter_ndjson(rows), media_type=NDJSON_MEDIA_TYPE)
@@ -0,0 +1,198 @@
+import asyncio
+import hashlib
+import importlib.util
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Callable, Optional, Set, Tuple
+
+from fastapi import HTTPException, Request, UploadFile
+from fastapi.routing import APIRoute
+from starlette.responses import Response
+
+from utils.metrics import timed
+
+# Pillow es opcional y se importa al generar la primera miniatura; sin él se
+# sirven las imágenes originales.
+PILLOW_AVAILABLE = importlib.util.find_spec("PIL") is not None
+
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", os.path.join("static", "uploads"))
+UPLOAD_URL = "/static/uploads"
+THUMBNAIL_DIR = os.path.join(UPLOAD_DIR, "thumbs")
+THUMBNAIL_URL = f"{UPLOAD_URL}/thumbs"
+THUMBNAIL_SIZES = (64, 150)
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(5 * 1024 * 1024)))
+# Campos de texto y cabeceras multipart que acompañan a la imagen en el formulario.
+FORM_OVERHEAD_BYTES = 64 * 1024
+CHUNK_SIZE = 64 * 1024
+
+# Firma de los primeros bytes -> extensión; no se confía en el nombre ni en
+# el Content-Type que manda el cliente.
+SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"GIF87a", ".gif"),
+    (b"GIF89a", ".gif"),
+)
+
+thumbnail_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="thumbnails")
+ready_thumbnails: Set[str] = set()
+
+
+def sniff_extension(head: bytes) -> Optional[str]:
+    for signature, extension in SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp"
+    return None
+
+
+# ------------------------ LIMITE DEL CUERPO ------------------------
+
+def limit_body(max_bytes: int) -> Callable:
+    """Marca un endpoint de subida: su cuerpo se corta con 413 al pasar de ``max_bytes``."""
+    def decorator(endpoint: Callable) -> Callable:
+        endpoint.max_body_bytes = max_bytes
+        return endpoint
+    return decorator
+
+
+def body_too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"Request body exceeds {max_bytes} bytes")
+
+
+class BodyLimitRoute(APIRoute):
+    """``APIRoute`` que aplica ``@limit_body`` antes de analizar el formulario.
+
+    El parser multipart de Starlette vuelca las partes de archivo a un
+    temporal sin límite: se rechaza por ``Content-Length`` y, si no viene o
+    miente, se cuentan los bytes a medida que llegan.
+    """
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        max_bytes = getattr(self.endpoint, "max_body_bytes", None)
+        if max_bytes is None:
+            return handler
+
+        async def limited_handler(request: Request) -> Response:
+            length = request.headers.get("content-length", "")
+            if length.isdigit() and int(length) > max_bytes:
+                raise body_too_large(max_bytes)
+            received = 0
+
+            async def receive() -> dict:
+                nonlocal received
+                message = await request.receive()
+                if message["type"] == "http.request":
+                    received += len(message.get("body", b""))
+                    if received > max_bytes:
+                        raise body_too_large(max_bytes)
+                return message
+
+            return await handler(Request(request.scope, receive))
+
+        return limited_handler
+
+
+# ------------------------ ESCRITURA ------------------------
+
+@timed("uploads.copy")
+def copy_to_temp(source: BinaryIO, max_bytes: int) -> Tuple[str, str, bytes]:
+    """Copia ``source`` por bloques a un temporal en UPLOAD_DIR y devuelve (ruta, sha256, cabecera)."""
+    digest = hashlib.sha256()
+    head = b""
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=UPLOAD_DIR, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as target:
+            while True:
+                chunk = source.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(status_code=413, detail=f"Image exceeds {max_bytes} bytes")
+                if len(head) < 16:
+                    head += chunk[:16 - len(head)]
+                digest.update(chunk)
+                target.write(chunk)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return tmp_path, digest.hexdigest(), head
+
+
+async def store_upload(upload: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES) -> str:
+    """Guarda la imagen con nombre por contenido y devuelve su URL pública.
+
+    Dos subidas con los mismos bytes comparten archivo; las miniaturas se
+    generan en segundo plano.
+    """
+    if upload.size is not None and upload.size > max_bytes:
+        raise HTTPException(status_code=413, detail=f"Image exceeds {max_bytes} bytes")
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    tmp_path, digest, head = await asyncio.to_thread(copy_to_temp, upload.file, max_bytes)
+    extension = sniff_extension(head)
+    if extension is None:
+        await asyncio.to_thread(os.remove, tmp_path)
+        raise HTTPException(status_code=415, detail="Image must be PNG, JPEG, GIF or WebP")
+    name = f"{digest[:32]}{extension}"
+    path = os.path.join(UPLOAD_DIR, name)
+    if os.path.exists(path):
+        await asyncio.to_thread(os.remove, tmp_path)
+    else:
+        await asyncio.to_thread(os.replace, tmp_path, path)
+    schedule_thumbnails(path)
+    return f"{UPLOAD_URL}/{name}"
+
+
+# ------------------------ MINIATURAS ------------------------
+
+def thumbnail_name(name: str, size: int) -> str:
+    return f"{os.path.splitext(name)[0]}_{size}.png"
+
+
+@timed("uploads.thumbnails")
+def make_thumbnails(path: str) -> None:
+    from PIL import Image
+
+    name = os.path.basename(path)
+    os.makedirs(THUMBNAIL_DIR, exist_ok=True)
+    names = {size: thumbnail_name(name, size) for size in THUMBNAIL_SIZES}
+    missing = [size for size in names if not os.path.exists(os.path.join(THUMBNAIL_DIR, names[size]))]
+    if missing:
+        with Image.open(path) as original:
+            image = original.convert("RGBA")
+        # De mayor a menor: cada miniatura se reduce desde la anterior, no desde el original.
+        # NEAREST conserva el pixel art de los sprites.
+        for size in sorted(missing, reverse=True):
+            image.thumbnail((size, size), Image.NEAREST)
+            image.save(os.path.join(THUMBNAIL_DIR, names[size]), format="PNG", optimize=True)
+    ready_thumbnails.update(names.values())
+
+
+def schedule_thumbnails(path: str) -> None:
+    if not PILLOW_AVAILABLE:
+        return
+    future = thumbnail_pool.submit(make_thumbnails, path)
+    future.add_done_callback(_report_thumbnail_error)
+
+
+def _report_thumbnail_error(future) -> None:
+    error = future.exception()
+    if error is not None:
+        print(f"Error generating thumbnails: {error}")
+
+
+def thumbnail_url(image: Optional[str], size: int = 150) -> Optional[str]:
+    """URL de la miniatura de ``image`` si ya existe; si no, la imagen original."""
+    if not image or not image.startswith(f"{UPLOAD_URL}/"):
+        return image
+    name = thumbnail_name(image.rsplit("/", 1)[-1], size)
+    if name not in ready_thumbnails:
+        if not os.path.exists(os.path.join(THUMBNAIL_DIR, name)):
+            return image
+        ready_thumbnails.add(name)
+    return f"{THUMBNAIL_URL}/{name}"